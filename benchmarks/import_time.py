@@ -0,0 +1,103 @@
+# =============================================================================
+# TIEMPO DE IMPORTACIÓN EN FRÍO
+# =============================================================================
+#
+# Mide, en procesos nuevos, cuánto tarda cada importación del conversor y qué
+# dependencias pesadas (pandas, numpy, openpyxl) deja cargadas. Con --script
+# se mide además la importación de un archivo suelto, por ejemplo el main.py
+# anterior al paquete, para comparar antes y después.
+#
+# Uso:
+#   python benchmarks/import_time.py --repeat 7 --output import.json
+#   git show <commit>:main.py > /tmp/main_anterior.py
+#   python benchmarks/import_time.py --script /tmp/main_anterior.py
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl')
+
+# Importaciones medidas: nombre -> código que se ejecuta en el proceso nuevo
+TARGETS = {
+    'paquete': "import gestor_examenes",
+    'api': "from gestor_examenes import process_excel_file",
+    'cli': "import gestor_examenes.cli",
+    'lector_pandas': "import gestor_examenes.reader",
+    'lector_streaming': "import gestor_examenes.streaming",
+    'lector_xml': "import gestor_examenes.xlsx_reader",
+    'escritor_openpyxl': "import gestor_examenes.writers",
+    'escritor_pandas': "import gestor_examenes.pandas_writer",
+}
+
+# El proceso nuevo mide su propia importación e informa el resultado en JSON
+PROBE = """
+import io, json, sys, time, contextlib
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    {code}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+SCRIPT_CODE = """
+import importlib.util
+spec = importlib.util.spec_from_file_location('script_medido', {path!r})
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+"""
+
+def measure_import(code, repeat):
+    """Importa `code` en `repeat` procesos nuevos; devuelve (mediana_segundos, módulos_pesados)"""
+    probe = PROBE.format(code=code.strip().replace('\n', '\n    '), heavy=HEAVY_MODULES)
+    samples = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', probe], cwd=REPO_DIR, check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result['seconds'])
+        loaded = result['loaded']
+    return statistics.median(samples), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación en frío del conversor")
+    parser.add_argument('--repeat', type=int, default=5, help="procesos nuevos por medición (se informa la mediana)")
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument('--script', action='append', default=[],
+                        help="archivo .py suelto a medir además de los módulos (se puede repetir)")
+    parser.add_argument('--output', default=None, help="archivo JSON de resultados")
+    args = parser.parse_args()
+    
+    measurements = [(name, TARGETS[name]) for name in args.targets]
+    measurements += [(path, SCRIPT_CODE.format(path=os.path.abspath(path))) for path in args.script]
+    
+    results = []
+    for name, code in measurements:
+        seconds, loaded = measure_import(code, args.repeat)
+        results.append({'target': name, 'seconds': round(seconds, 4), 'loaded': loaded})
+        cargados = ", ".join(loaded) if loaded else "ninguna"
+        print(f"   {name}: {seconds * 1000:.1f} ms (dependencias pesadas: {cargados})")
+    
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"[OK] Resultados guardados en: {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
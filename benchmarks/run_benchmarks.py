@@ -0,0 +1,212 @@
+# =============================================================================
+# BENCHMARKS DEL CONVERSOR
+# =============================================================================
+#
+# Mide tiempo y pico de memoria de cada etapa (lecturas, datos de empresa,
+# consolidación, orden de exámenes y escritores) sobre libros sintéticos.
+# El resultado se guarda en JSON para compararlo contra una corrida anterior.
+#
+# Uso:
+#   python benchmarks/run_benchmarks.py --sizes 1000 100000 1000000 --output bench.json
+#   python benchmarks/run_benchmarks.py --sizes 1000 --baseline bench.json --tolerance 0.25
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import pandas as pd
+
+import gestor_examenes as conversor
+from synthetic_workbook import write_synthetic_workbook
+
+ALL_STAGES = ['read', 'read_xml', 'read_streaming', 'read_spilled', 'company', 'cuil_validation', 'patients',
+              'exam_order', 'writer_openpyxl_streaming', 'writer_sharded', 'writer_openpyxl', 'writer_pandas',
+              'writer_csv', 'writer_csv_long']
+
+# Diferencias absolutas por debajo de estas no cuentan como regresión (ruido de medición)
+MIN_ABSOLUTE_DELTA = {'seconds': 0.01, 'peak_mib': 1.0}
+
+# Particiones de la etapa read_spilled (consolidación con memoria acotada, hasta el PatientStore)
+SPILLED_PARTITIONS = 16
+
+# Etapa writer_sharded: la matriz en SHARD_PARTS archivos escritos en paralelo
+SHARD_PARTS = 8
+
+# El escritor openpyxl completo guarda todo el libro en memoria: solo se mide hasta este tamaño
+FULL_WRITER_MAX_ROWS = 100_000
+
+def measure(fn, with_memory):
+    """Ejecuta fn y devuelve (resultado, segundos, pico_MiB). La memoria se mide en una segunda corrida."""
+    gc.collect()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    seconds = time.perf_counter() - start
+    
+    peak_mib = None
+    if with_memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = fn()
+            peak_mib = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak_mib
+
+def run_size(rows, stages, data_dir, with_memory, exams_per_patient, duplicate_ratio):
+    input_file = os.path.join(data_dir, f"sintetico_{rows}.xlsx")
+    if not os.path.exists(input_file):
+        print(f"Generando libro sintético de {rows} filas...")
+        write_synthetic_workbook(input_file, rows=rows, exams_per_patient=exams_per_patient,
+                                 duplicate_ratio=duplicate_ratio)
+    output_file = os.path.join(data_dir, f"salida_{rows}.xlsx")
+    
+    results = []
+    
+    def record(stage, fn):
+        result, seconds, peak_mib = measure(fn, with_memory)
+        entry = {'rows': rows, 'stage': stage, 'seconds': round(seconds, 4),
+                 'peak_mib': round(peak_mib, 2) if peak_mib is not None else None}
+        results.append(entry)
+        memoria = f", pico {entry['peak_mib']} MiB" if peak_mib is not None else ""
+        print(f"   {stage:<28} {seconds:9.3f} s{memoria}")
+        return result
+    
+    # Las etapas posteriores usan los datos de la lectura aunque no se midan
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_with_header, df_no_header = conversor.load_excel_once(input_file)
+    if 'read' in stages:
+        df_with_header, df_no_header = record('read', lambda: conversor.load_excel_once(input_file))
+    if 'read_xml' in stages:
+        record('read_xml', lambda: conversor.read_sheet_columns(input_file))
+    if 'read_streaming' in stages:
+        record('read_streaming', lambda: conversor.process_excel_streaming(input_file))
+    if 'read_spilled' in stages:
+        record('read_spilled', lambda: conversor.read_input_spilled(input_file, partitions=SPILLED_PARTITIONS))
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        company_data = conversor.extract_company_data_fixed_positions(df_with_header)
+        patient_info, patient_numbers = conversor.process_all_patients(df_no_header)
+    if 'company' in stages:
+        record('company', lambda: conversor.extract_company_data_fixed_positions(df_with_header))
+    if 'cuil_validation' in stages:
+        # Validación vectorizada de la columna CUIL (parte de la consolidación)
+        cuils = df_no_header.iloc[1:, 2].astype(str).str.strip().tolist()
+        record('cuil_validation', lambda: conversor.validate_cuils(cuils))
+        del cuils
+    if 'patients' in stages:
+        patient_info, patient_numbers = record('patients', lambda: conversor.process_all_patients(df_no_header))
+    del df_with_header, df_no_header
+    
+    store = conversor.PatientStore.from_patient_info(patient_info, patient_numbers)
+    exam_count = store.exam_count()
+    
+    exams_list = conversor.order_exams(store.exams)
+    if 'exam_order' in stages:
+        exams_list = record('exam_order', lambda: conversor.order_exams(store.exams))
+    
+    writer_args = (input_file, output_file, company_data, store, exams_list, exam_count)
+    if 'writer_openpyxl_streaming' in stages:
+        record('writer_openpyxl_streaming', lambda: conversor.process_excel_file_with_openpyxl_streaming(*writer_args))
+    if 'writer_sharded' in stages:
+        layout = conversor.ShardLayout(max(1, -(-len(store) // SHARD_PARTS)), target='archivos', jobs=os.cpu_count() or 1)
+        column_widths = conversor.compute_column_widths(exams_list, len(store), exam_count)
+        record('writer_sharded', lambda: conversor.write_sharded_output(output_file, company_data, store, exams_list,
+                                                                        exam_count, layout, column_widths))
+    if 'writer_openpyxl' in stages:
+        if rows <= FULL_WRITER_MAX_ROWS:
+            record('writer_openpyxl', lambda: conversor.process_excel_file_with_openpyxl(*writer_args))
+        else:
+            print(f"   {'writer_openpyxl':<28} omitido (más de {FULL_WRITER_MAX_ROWS} filas)")
+    if 'writer_pandas' in stages:
+        record('writer_pandas', lambda: conversor.process_excel_file_with_pandas(*writer_args))
+    if 'writer_csv' in stages:
+        record('writer_csv', lambda: conversor.write_table_outputs(['csv'], *writer_args[1:]))
+    if 'writer_csv_long' in stages:
+        record('writer_csv_long', lambda: conversor.write_table_outputs(['csv-long'], *writer_args[1:]))
+    
+    return results
+
+def compare_with_baseline(results, baseline_path, tolerance):
+    """Devuelve las etapas que empeoraron más que `tolerance` (fracción) respecto del baseline"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['rows'], r['stage']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['rows'], result['stage']))
+        if not previous:
+            continue
+        for metric in ('seconds', 'peak_mib'):
+            before, after = previous.get(metric), result.get(metric)
+            if (before and after and after > before * (1 + tolerance)
+                    and after - before > MIN_ABSOLUTE_DELTA[metric]):
+                regressions.append({'rows': result['rows'], 'stage': result['stage'], 'metric': metric,
+                                    'baseline': before, 'current': after})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks por etapa del conversor")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100_000, 1_000_000],
+                        help="cantidades de filas a medir")
+    parser.add_argument('--stages', nargs='+', default=ALL_STAGES, choices=ALL_STAGES)
+    parser.add_argument('--data-dir', default=None,
+                        help="carpeta para los libros sintéticos (se reutilizan entre corridas)")
+    parser.add_argument('--exams-per-patient', type=int, default=4)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05)
+    parser.add_argument('--no-memory', action='store_true', help="no medir memoria (más rápido)")
+    parser.add_argument('--output', default=None, help="archivo JSON de resultados")
+    parser.add_argument('--baseline', default=None, help="JSON de una corrida anterior para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="empeoramiento admitido respecto del baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+    
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="bench_examenes_")
+    os.makedirs(data_dir, exist_ok=True)
+    
+    results = []
+    for rows in args.sizes:
+        print(f"\n{rows} filas:")
+        results += run_size(rows, args.stages, data_dir, not args.no_memory,
+                            args.exams_per_patient, args.duplicate_ratio)
+    
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'results': results
+    }
+    
+    if args.baseline:
+        report['regressions'] = compare_with_baseline(results, args.baseline, args.tolerance)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[OK] Resultados guardados en {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+    
+    if report.get('regressions'):
+        print("\n[ERROR] Regresiones respecto del baseline:")
+        for r in report['regressions']:
+            print(f"   {r['rows']} filas / {r['stage']} / {r['metric']}: {r['baseline']} -> {r['current']}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
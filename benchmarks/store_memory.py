@@ -0,0 +1,167 @@
+# =============================================================================
+# MEMORIA DEL ALMACÉN DE PACIENTES
+# =============================================================================
+#
+# Mide la memoria sobre un libro sintético de N filas, con el mismo camino de
+# lectura y escritura que usa el programa:
+# - retenido: lo que queda vivo después de leer y consolidar, con las
+#   estructuras anteriores (patient_info, patient_numbers,
+#   final_employees_data y la matriz paciente x examen) y con lo que devuelve
+#   read_input_store (solo el PatientStore de gestor_examenes/store.py)
+# - pico de escritura: el máximo desde el fin de la lectura, escribiendo con
+#   write_output_file mientras se conservan los diccionarios de la
+#   consolidación y con write_store_output desde el almacén de
+#   read_input_store, como hace process_excel_file
+# - pico del proceso completo: process_excel_file tal como lo ejecuta el
+#   programa (suele dominarlo la lectura)
+# El libro se genera antes de medir y los módulos se importan con un libro
+# chico; los nombres y CUILs leídos cuentan en todos los casos.
+#
+# Uso:
+#   python benchmarks/store_memory.py --rows 1000000 --output store_memory.json
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from gestor_examenes.catalog import default_exam_catalog
+from gestor_examenes.pipeline import (process_excel_file, read_input_file, read_input_store, write_output_file,
+                                      write_store_output)
+from synthetic_workbook import write_synthetic_workbook
+
+def legacy_exam_matrix(patient_info):
+    """
+    Matriz booleana paciente x examen que armaban los escritores antes del
+    almacén: (examen -> columna, CUIL -> fila, matriz)
+    """
+    canonical = default_exam_catalog().canonical
+    index = {}
+    rows = {}
+    row_ids = []
+    col_ids = []
+    for row, (cuil, info) in enumerate(patient_info.items()):
+        rows[cuil] = row
+        for exam in info['estudios']:
+            name = canonical(exam) if exam else ''
+            if name:
+                row_ids.append(row)
+                col_ids.append(index.setdefault(name, len(index)))
+    
+    matrix = np.zeros((len(rows), len(index)), dtype=bool)
+    matrix[row_ids, col_ids] = True
+    return index, rows, matrix
+
+def legacy_structures(path):
+    """Lo que mantenía vivo la escritura antes del almacén compacto"""
+    _, patient_info, patient_numbers = read_input_file(path)
+    final_employees_data = {cuil: {'name': patient_info[cuil]['nombre'], 'cuil': cuil,
+                                   'exams': patient_info[cuil]['estudios']}
+                            for cuil in patient_numbers}
+    exam_matrix = legacy_exam_matrix(patient_info)
+    return patient_info, patient_numbers, final_employees_data, exam_matrix
+
+def store_structures(path):
+    """Lo que queda vivo durante la escritura: el almacén que devuelve read_input_store"""
+    return read_input_store(path)
+
+def write_keeping_dicts(path, output_file):
+    """Escritura con la consolidación viva (el pico se mide desde el fin de la lectura)"""
+    company_data, patient_info, patient_numbers = read_input_file(path)
+    tracemalloc.reset_peak()
+    return write_output_file(path, output_file, company_data, patient_info, patient_numbers)
+
+def write_from_store(path, output_file):
+    """Escritura de process_excel_file: solo el almacén (el pico se mide desde el fin de la lectura)"""
+    company_data, store = read_input_store(path)
+    tracemalloc.reset_peak()
+    return write_store_output(path, output_file, company_data, store)
+
+def write_pipeline(path, output_file):
+    """El proceso de un archivo tal como lo ejecuta el programa"""
+    return process_excel_file(path, output_file)
+
+def retained(build, *args):
+    """(resultado, MiB retenidos, pico MiB, segundos) de build(*args)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = build(*args)
+        seconds = time.perf_counter() - start
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current / 2 ** 20, peak / 2 ** 20, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria del almacén de pacientes frente a las estructuras anteriores")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000], help="cantidades de filas a medir")
+    parser.add_argument('--exams-per-patient', type=int, default=4)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05)
+    parser.add_argument('--output', default=None, help="archivo JSON de resultados")
+    args = parser.parse_args()
+    
+    results = []
+    data_dir = tempfile.mkdtemp(prefix="bench_almacen_")
+    try:
+        # Las importaciones de los lectores y escritores no cuentan en la medición
+        warmup = write_synthetic_workbook(os.path.join(data_dir, "calentamiento.xlsx"), 100)
+        with contextlib.redirect_stdout(io.StringIO()):
+            legacy_structures(warmup)
+            write_pipeline(warmup, os.path.join(data_dir, "calentamiento_salida.xlsx"))
+        for rows in args.rows:
+            print(f"\n{rows} filas:")
+            path = write_synthetic_workbook(os.path.join(data_dir, f"sintetico_{rows}.xlsx"), rows,
+                                            exams_per_patient=args.exams_per_patient,
+                                            duplicate_ratio=args.duplicate_ratio)
+            output_file = os.path.join(data_dir, f"salida_{rows}.xlsx")
+            for name, build, build_args in (('estructuras_anteriores', legacy_structures, (path,)),
+                                            ('almacen', store_structures, (path,)),
+                                            ('escritura_con_diccionarios', write_keeping_dicts, (path, output_file)),
+                                            ('escritura_desde_almacen', write_from_store, (path, output_file)),
+                                            ('proceso_completo', write_pipeline, (path, output_file))):
+                result, retained_mib, peak_mib, seconds = retained(build, *build_args)
+                del result
+                results.append({'rows': rows, 'structure': name, 'retained_mib': round(retained_mib, 2),
+                                'peak_mib': round(peak_mib, 2), 'seconds': round(seconds, 3)})
+                print(f"   {name:<30} retenido {retained_mib:9.2f} MiB, pico {peak_mib:9.2f} MiB, {seconds:7.2f} s")
+            legacy, store, with_dicts, from_store, _ = results[-5:]
+            if store['retained_mib']:
+                print(f"   {'reducción del retenido':<30} {legacy['retained_mib'] / store['retained_mib']:.1f}x")
+            if from_store['peak_mib']:
+                print(f"   {'reducción del pico al escribir':<30} {with_dicts['peak_mib'] / from_store['peak_mib']:.2f}x")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[OK] Resultados guardados en {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# =============================================================================
+# GENERADOR DE LIBROS SINTÉTICOS DE EXÁMENES OCUPACIONALES
+# =============================================================================
+#
+# Genera un .xlsx con el mismo diseño de columnas que las exportaciones reales:
+# encabezado en la fila 1, datos de empresa en B/G/H/I/J/L/O/Q, CUIL en C,
+# descripción del examen en E y apellido y nombre en P.
+#
+# Uso:
+#   python benchmarks/synthetic_workbook.py salida.xlsx --rows 100000 --patients 20000
+
+import argparse
+import random
+
+from openpyxl import Workbook
+
+HEADER = [
+    'DATO SIN USO', 'CUIT', 'CUIL', 'Examen', 'Desc_Examen', 'FECHA DERIVACION',
+    'CONTRATO', 'RAZON SOCIAL', 'MAIL', 'DOMICILIO', 'LOCALIDAD', 'PROVINCIA', 'CP',
+    'COLUMNA SIN USO', 'TELEFONO', 'Nombre_Apellido', 'LOCALIDAD', 'PROVINCIA',
+    'ORIENTACION DE HC', 'FRECUENCIA'
+]
+
+BASE_EXAMS = [
+    "EXAMEN CLINICO",
+    "AUDIOMETRIA",
+    "ESPIROMETRIA",
+    "CUESTIONARIO OSTEOARTICULAR COLUMNA LUMBOSACRA",
+    "CUESTIONARIO DE SEGMENTOS COMPROMETIDOS",
+    "RX DE TORAX",
+    "LABORATORIO BASICO",
+    "ELECTROCARDIOGRAMA",
+    "AGUDEZA VISUAL",
+    "PSICOTECNICO",
+]
+
+SURNAMES = ['GONZALEZ', 'RODRIGUEZ', 'GOMEZ', 'FERNANDEZ', 'LOPEZ', 'DIAZ', 'MARTINEZ',
+            'PEREZ', 'GARCIA', 'SANCHEZ', 'ROMERO', 'SOSA', 'ÁLVAREZ', 'NÚÑEZ', 'MUÑOZ']
+NAMES = ['JUAN', 'MARIA', 'CARLOS', 'ANA', 'JOSE', 'LUCIA', 'JORGE', 'SOFIA', 'ÑUSTA', 'MARTÍN']
+
+CUIL_WEIGHTS = [5, 4, 3, 2, 7, 6, 5, 4, 3, 2]
+
+def cuil_with_check_digit(prefix, dni):
+    """CUIL de 11 dígitos con dígito verificador módulo 11 válido"""
+    base = f"{prefix}{dni:08d}"
+    remainder = 11 - sum(int(d) * w for d, w in zip(base, CUIL_WEIGHTS)) % 11
+    if remainder == 11:
+        remainder = 0
+    elif remainder == 10:
+        # Con verificador 10 el CUIL se emite con prefijo 23 (verificador 9 o 4)
+        return cuil_with_check_digit(23, dni)
+    return f"{base}{remainder}"
+
+def exam_catalog(size):
+    """Catálogo de `size` nombres de examen (los reales primero)"""
+    catalog = list(BASE_EXAMS[:size])
+    catalog += [f"ESTUDIO COMPLEMENTARIO {i:03d}" for i in range(size - len(catalog))]
+    return catalog
+
+def generate_rows(rows, patients, exams_per_patient, duplicate_ratio, exam_catalog_size=40, seed=0):
+    """
+    Genera las filas de datos (sin encabezado). Cada paciente recibe
+    `exams_per_patient` exámenes distintos; una fracción `duplicate_ratio` de
+    las filas repite un par (paciente, examen) ya emitido.
+    """
+    rng = random.Random(seed)
+    catalog = exam_catalog(max(exam_catalog_size, exams_per_patient))
+    exams_per_patient = min(exams_per_patient, len(catalog))
+    
+    people = []
+    for i in range(patients):
+        prefix = rng.choice([20, 27])
+        name = f"{rng.choice(SURNAMES)} {rng.choice(SURNAMES)}, {rng.choice(NAMES)} {i}"
+        people.append((cuil_with_check_digit(prefix, 10_000_000 + i), name))
+    
+    company = {1: '30712345678', 6: 'CONTRATO 001', 7: 'SA SINTETICA', 8: 'contacto@sintetica.com',
+               9: 'Calle Falsa 123', 11: 'BUENOS AIRES', 14: '1144445555', 16: 'CABA'}
+    
+    emitted = []
+    patient_idx = 0
+    exam_slot = 0
+    patient_exams = rng.sample(catalog, exams_per_patient) if patients else []
+    
+    for _ in range(rows):
+        exhausted = patient_idx >= patients
+        if emitted and (exhausted or rng.random() < duplicate_ratio):
+            person, exam = emitted[rng.randrange(len(emitted))]
+        else:
+            person, exam = people[patient_idx], patient_exams[exam_slot]
+            emitted.append((person, exam))
+            exam_slot += 1
+            if exam_slot == exams_per_patient:
+                patient_idx += 1
+                exam_slot = 0
+                if patient_idx < patients:
+                    patient_exams = rng.sample(catalog, exams_per_patient)
+        
+        row = [None] * len(HEADER)
+        for col, value in company.items():
+            row[col] = value
+        row[2] = person[0]
+        row[3] = f"EX{catalog.index(exam):03d}"
+        row[4] = exam
+        row[15] = person[1]
+        yield row
+
+def write_synthetic_workbook(path, rows=1000, patients=None, exams_per_patient=4,
+                             duplicate_ratio=0.05, exam_catalog_size=40, seed=0):
+    """Escribe el libro sintético en `path` (openpyxl en modo solo escritura)"""
+    if patients is None:
+        patients = max(1, rows // exams_per_patient)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADER)
+    for row in generate_rows(rows, patients, exams_per_patient, duplicate_ratio, exam_catalog_size, seed):
+        ws.append(row)
+    wb.save(path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un libro sintético de exámenes ocupacionales")
+    parser.add_argument('output', help="archivo .xlsx de salida")
+    parser.add_argument('--rows', type=int, default=1000, help="cantidad de filas de datos")
+    parser.add_argument('--patients', type=int, default=None,
+                        help="cantidad de pacientes (por defecto: filas / exámenes por paciente)")
+    parser.add_argument('--exams-per-patient', type=int, default=4)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05,
+                        help="fracción de filas que repiten un par paciente/examen")
+    parser.add_argument('--exam-catalog-size', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    write_synthetic_workbook(args.output, args.rows, args.patients, args.exams_per_patient,
+                             args.duplicate_ratio, args.exam_catalog_size, args.seed)
+    print(f"[OK] Libro sintético generado: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# =============================================================================
+# GESTOR DE EXÁMENES OCUPACIONALES
+# =============================================================================
+#
+# Uso como biblioteca:
+#
+#   from gestor_examenes import process_excel_file
+#   ok, last_row = process_excel_file("entrada.xlsx", "output_sorted_entrada.xlsx")
+#
+# Importar el paquete no carga pandas, numpy ni openpyxl ni tiene efectos
+# secundarios (no cambia el directorio de trabajo ni escribe en la consola):
+# cada nombre se importa desde su módulo recién cuando se usa, y los módulos
+# cargan sus dependencias según el lector y el escritor que se elijan.
+
+import importlib
+
+# Nombre público -> módulo que lo define
+_EXPORTS = {
+    # Procesamiento de un archivo
+    'process_excel_file': 'pipeline',
+    'read_input_file': 'pipeline',
+    'read_input_store': 'pipeline',
+    'write_output_file': 'pipeline',
+    'write_store_output': 'pipeline',
+    'choose_read_mode': 'pipeline',
+    'STREAMING_THRESHOLD_BYTES': 'pipeline',
+    'OPENPYXL_AVAILABLE': 'pipeline',
+    # Procesamiento en memoria y modo servidor
+    'process_excel_buffer': 'buffers',
+    'process_excel_bytes': 'buffers',
+    'ExamServer': 'server',
+    'serve': 'server',
+    # Registro y métricas
+    'RunMetrics': 'metrics',
+    'configure_logging': 'metrics',
+    # Lectura y consolidación
+    'COMPANY_DATA_COLUMNS': 'reader',
+    'load_excel_once': 'reader',
+    'extract_company_data_fixed_positions': 'reader',
+    'consolidate_patient_columns': 'reader',
+    'process_all_patients': 'reader',
+    'assign_patient_numbers': 'reader',
+    'collation_key': 'reader',
+    'consolidate_patient_rows': 'streaming',
+    'validate_cuils': 'quality',
+    'DataQualityReport': 'quality',
+    'process_excel_streaming': 'streaming',
+    'read_rows_streaming': 'streaming',
+    'read_input_spilled': 'spill',
+    'partition_count': 'spill',
+    'DEFAULT_MEMORY_CAP_BYTES': 'spill',
+    'read_sheet_columns': 'xlsx_reader',
+    'process_excel_xml': 'xlsx_reader',
+    'UnsupportedSheetError': 'xlsx_reader',
+    # Exámenes y anchos de columna
+    'PREFERRED_EXAM_ORDER': 'catalog',
+    'ExamCatalog': 'catalog',
+    'load_exam_catalog': 'catalog',
+    'EXAM_CATALOG_FILENAME': 'catalog',
+    'order_exams': 'exams',
+    'PatientStore': 'store',
+    'PatientRecord': 'store',
+    'compute_column_widths': 'widths',
+    # Escritores
+    'process_excel_file_with_openpyxl': 'writers',
+    'process_excel_file_with_openpyxl_streaming': 'writers',
+    'write_matrix_sheet': 'writers',
+    'process_excel_file_with_pandas': 'pandas_writer',
+    'ShardLayout': 'shards',
+    'write_sharded_output': 'shards',
+    'shard_path': 'shards',
+    'OUTPUT_FORMATS': 'pipeline',
+    'DEFAULT_OUTPUT_FORMATS': 'pipeline',
+    'write_table_outputs': 'table_writers',
+    # Matriz maestra de varios archivos
+    'MASTER_OUTPUT_NAME': 'merge',
+    'merge_excel_files': 'merge',
+    'merge_patients': 'merge',
+    'merge_company_data': 'merge',
+    # Actualización incremental de una salida
+    'update_output_file': 'update',
+    'read_output_matrix': 'update',
+    # Registro histórico (SQLite)
+    'PatientRegistry': 'registry',
+    'open_registry': 'registry',
+    'REGISTRY_FILENAME': 'batch',
+    # Caché de lectura
+    'ParseCache': 'cache',
+    'PARSE_CACHE_VERSION': 'cache',
+    # Lotes, vigilancia y línea de comandos
+    'PROCESSING_VERSION': 'batch',
+    'output_file_name': 'batch',
+    'file_content_hash': 'batch',
+    'load_manifest': 'batch',
+    'save_manifest': 'batch',
+    'is_up_to_date': 'batch',
+    'list_input_files': 'batch',
+    'process_file_job': 'batch',
+    'run_batch': 'batch',
+    'watch_folder': 'watch',
+    'main': 'cli',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
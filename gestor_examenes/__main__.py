@@ -0,0 +1,4 @@
+# Permite ejecutar el conversor con `python -m gestor_examenes`
+from .cli import main
+
+main()
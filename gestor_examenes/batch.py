@@ -0,0 +1,251 @@
+# =============================================================================
+# PROCESAMIENTO POR LOTES
+# =============================================================================
+
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from .catalog import default_exam_catalog
+from .metrics import log, ConsoleFormatter, RunMetrics
+from .pipeline import DEFAULT_OUTPUT_FORMATS, output_path, process_excel_file
+
+# Versión de la lógica de procesamiento: al cambiarla se regeneran todas las salidas
+PROCESSING_VERSION = "4"
+
+# Manifiesto con el estado de cada archivo procesado, dentro de la carpeta de entrada
+MANIFEST_FILENAME = ".manifest_examenes.json"
+
+# Caché de lectura (ver cache.py), dentro de la carpeta de entrada
+CACHE_DIRNAME = ".cache_examenes"
+
+# Registro histórico de pacientes y estudios (ver registry.py), dentro de la carpeta de entrada
+REGISTRY_FILENAME = ".registro_examenes.sqlite"
+
+def output_file_name(archivo):
+    """Nombre del archivo de salida para un archivo de entrada"""
+    nombre_sin_extension = os.path.splitext(archivo)[0]
+    return f"output_sorted_{nombre_sin_extension}.xlsx"
+
+def file_content_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 del contenido del archivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(carpeta):
+    """Lee el manifiesto de la carpeta; si no existe o es inválido empieza vacío"""
+    path = os.path.join(carpeta, MANIFEST_FILENAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get('archivos'), dict):
+            return manifest
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError) as e:
+        log.warning(f"Manifiesto inválido, se regenera: {e}")
+    return {'archivos': {}}
+
+def save_manifest(carpeta, manifest):
+    """Guarda el manifiesto de forma atómica (archivo temporal + reemplazo)"""
+    path = os.path.join(carpeta, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def is_up_to_date(carpeta, archivo, entry, output_formats=DEFAULT_OUTPUT_FORMATS, exam_catalog=None, shards=None):
+    """
+    True si el archivo no cambió desde que se generó su salida (en los mismos
+    formatos, con el mismo catálogo de exámenes y la misma división en partes)
+    y esa salida sigue existiendo. Si tamaño y fecha coinciden no se
+    lee el archivo; si solo cambió la fecha se compara el hash del contenido
+    (y se actualiza la fecha).
+    """
+    if not entry or entry.get('version') != PROCESSING_VERSION:
+        return False
+    if entry.get('formatos', ['xlsx']) != list(output_formats):
+        return False
+    default_fingerprint = default_exam_catalog().fingerprint()
+    if entry.get('catalogo', default_fingerprint) != (exam_catalog or default_exam_catalog()).fingerprint():
+        return False
+    if entry.get('division') != (shards.fingerprint() if shards is not None else None):
+        return False
+    if not os.path.exists(os.path.join(carpeta, entry.get('output', ''))):
+        return False
+    
+    stat = os.stat(os.path.join(carpeta, archivo))
+    if stat.st_size != entry.get('size'):
+        return False
+    if stat.st_mtime_ns == entry.get('mtime_ns'):
+        return True
+    if file_content_hash(os.path.join(carpeta, archivo)) == entry.get('sha256'):
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+    return False
+
+def is_input_file(archivo):
+    """Archivos .xlsx/.xls a procesar: se excluyen temporales de Excel (~$) y salidas"""
+    return (archivo.endswith(('.xlsx', '.xls'))
+            and not archivo.startswith('~$')
+            and not archivo.startswith('output_'))
+
+def list_input_files(carpeta):
+    """Archivos de entrada de la carpeta: primero los .xlsx y luego los .xls"""
+    archivos = [archivo for archivo in os.listdir(carpeta) if is_input_file(archivo)]
+    return ([archivo for archivo in archivos if archivo.endswith('.xlsx')] +
+            [archivo for archivo in archivos if archivo.endswith('.xls')])
+
+@contextlib.contextmanager
+def capture_log(buffer, level):
+    """
+    Redirige el registro del conversor (y cualquier salida suelta) a `buffer`
+    mientras dura el bloque, con el nivel indicado.
+    """
+    handler = logging.StreamHandler(buffer)
+    handler.setFormatter(ConsoleFormatter("%(message)s"))
+    previous = (log.handlers[:], log.level, log.propagate)
+    log.handlers[:] = [handler]
+    log.setLevel(level)
+    log.propagate = False
+    try:
+        with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+            yield
+    finally:
+        log.handlers[:], log.level, log.propagate = previous
+
+def save_run_metrics(path, data):
+    """Guarda las métricas de la corrida como JSON"""
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        log.info(f"[OK] Métricas guardadas en: {path}")
+    except OSError as e:
+        log.warning(f"No se pudieron guardar las métricas: {e}")
+
+def write_captured_output(salida):
+    """Muestra de una sola vez la salida capturada de un archivo"""
+    if salida:
+        sys.stdout.write(salida)
+        sys.stdout.flush()
+
+def process_file_job(carpeta, archivo, log_level=logging.INFO, track_memory=False,
+                     cache_dir=None, cache_max_bytes=None, output_formats=DEFAULT_OUTPUT_FORMATS,
+                     registry_path=None, exam_catalog=None, quality_report=False, memory_cap=None,
+                     partition_jobs=1, shards=None):
+    """
+    Procesa un archivo de la carpeta capturando toda su salida, para mostrarla
+    agrupada cuando se procesan varios en paralelo. Con cache_dir, la lectura
+    se toma de (o se guarda en) la caché de lectura de esa carpeta.
+    output_formats: salidas a generar (ver process_excel_file); el manifiesto
+    guarda la del primer formato para detectar si se borró.
+    registry_path: base SQLite donde se registran los pacientes y estudios leídos
+    exam_catalog: orden y sinónimos de los exámenes (ver process_excel_file)
+    quality_report: guardar el reporte de calidad en CSV (ver process_excel_file)
+    memory_cap y partition_jobs: consolidación con memoria acotada (ver process_excel_file)
+    shards: división de la matriz en partes (ver process_excel_file)
+    Devuelve (archivo, ok, salida, entrada_de_manifiesto, métricas).
+    """
+    buffer = io.StringIO()
+    ok = False
+    entry = None
+    metrics = RunMetrics(track_memory)
+    registry = None
+    with capture_log(buffer, log_level):
+        try:
+            start_time = time.time()
+            input_file = os.path.join(carpeta, archivo)
+            output_file = os.path.join(carpeta, output_file_name(archivo))
+            output_name = os.path.basename(output_path(output_file, output_formats[0]))
+            
+            # Estado del archivo antes de procesarlo: si cambia durante el
+            # proceso, la próxima corrida lo detecta y lo vuelve a procesar
+            stat = os.stat(input_file)
+            entry = {
+                'sha256': file_content_hash(input_file),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'output': output_name,
+                'formatos': list(output_formats),
+                'catalogo': (exam_catalog or default_exam_catalog()).fingerprint(),
+                'version': PROCESSING_VERSION
+            }
+            if shards is not None:
+                entry['division'] = shards.fingerprint()
+            
+            cache = None
+            if cache_dir:
+                from .cache import ParseCache, DEFAULT_CACHE_MAX_BYTES
+                cache = ParseCache(cache_dir, cache_max_bytes or DEFAULT_CACHE_MAX_BYTES)
+            if registry_path:
+                from .registry import open_registry
+                registry = open_registry(registry_path)
+            
+            # Procesar el archivo (los anchos de columna se calculan al escribir)
+            result = process_excel_file(input_file, output_file, metrics=metrics, cache=cache,
+                                        content_hash=entry['sha256'], output_formats=output_formats,
+                                        registry=registry, exam_catalog=exam_catalog,
+                                        quality_report=quality_report, memory_cap=memory_cap,
+                                        partition_jobs=partition_jobs, shards=shards)
+            if result and result[0]:
+                ok = True
+                elapsed_time = time.time() - start_time
+                log.info("Archivo procesado exitosamente!")
+                log.info(f"Tiempo: {elapsed_time:.2f} segundos")
+            else:
+                log.error("Error al procesar el archivo")
+        except Exception as e:
+            log.exception(f"Error inesperado procesando {archivo}: {e}")
+        finally:
+            if registry is not None:
+                registry.close()
+    
+    run_metrics = metrics.as_dict()
+    run_metrics['ok'] = ok
+    run_metrics['segundos_total'] = round(time.time() - start_time, 4)
+    return archivo, ok, buffer.getvalue(), entry if ok else None, run_metrics
+
+def run_batch(carpeta, archivos, jobs, log_level=logging.INFO, track_memory=False,
+              cache_dir=None, cache_max_bytes=None, output_formats=DEFAULT_OUTPUT_FORMATS, registry_path=None,
+              exam_catalog=None, quality_report=False, memory_cap=None, partition_jobs=1, shards=None):
+    """
+    Procesa los archivos con un pool de `jobs` procesos y devuelve los
+    resultados a medida que terminan. Un fallo en un archivo se informa como
+    error de ese archivo sin detener el resto.
+    """
+    job_args = (log_level, track_memory, cache_dir, cache_max_bytes, output_formats, registry_path, exam_catalog,
+                quality_report, memory_cap, partition_jobs, shards)
+    if jobs <= 1:
+        for archivo in archivos:
+            yield process_file_job(carpeta, archivo, *job_args)
+        return
+    
+    # Si un proceso muere (no una excepción de Python), el pool queda roto y
+    # todos los archivos en curso fallan: esos se reintentan de a uno, en un
+    # pool propio, para aislar al archivo que provoca la caída
+    interrupted = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(process_file_job, carpeta, archivo, *job_args): archivo for archivo in archivos}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool:
+                interrupted.append(futures[future])
+    
+    for archivo in interrupted:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            try:
+                yield executor.submit(process_file_job, carpeta, archivo, *job_args).result()
+            except BrokenProcessPool as e:
+                salida = f"[ERROR] El proceso que trabajaba en {archivo} terminó inesperadamente: {e}\n"
+                yield archivo, False, salida, None, {'ok': False}
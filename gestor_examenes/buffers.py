@@ -0,0 +1,63 @@
+# =============================================================================
+# PROCESAMIENTO EN MEMORIA (bytes o buffers)
+# =============================================================================
+#
+# Mismo proceso que process_excel_file sin archivos intermedios: la entrada es
+# el contenido del libro (bytes o un buffer binario) y la salida .xlsx se
+# escribe en un buffer del llamador o se devuelve como bytes. Lo usa el modo
+# servidor (server.py) y sirve para integrar el conversor en otro servicio.
+
+import io
+
+from .metrics import log, RunMetrics
+from .pipeline import STREAMING_THRESHOLD_BYTES, read_input_store, source_name, write_store_output
+
+def _readable_buffer(source):
+    """
+    Buffer con seek para los lectores (el .xlsx es un ZIP y se lee desde el
+    final): los bytes se envuelven sin copiarlos y los streams sin seek se
+    leen completos una vez.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if getattr(source, 'seekable', lambda: False)():
+        source.seek(0)
+        return source
+    return io.BytesIO(source.read())
+
+def process_excel_buffer(source, sink, read_mode='auto', streaming_threshold=STREAMING_THRESHOLD_BYTES,
+                         write_mode='streaming', metrics=None, exam_catalog=None):
+    """
+    Procesa un libro en memoria y escribe la salida .xlsx en sink.
+    source: bytes, bytearray, memoryview o buffer binario legible
+    sink: buffer binario escribible (no hace falta que tenga seek: el ZIP se
+    escribe en orden)
+    read_mode, streaming_threshold, write_mode, metrics y exam_catalog: ver
+    process_excel_file
+    Devuelve (True, última_fila_de_empleados) o False, como process_excel_file.
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    
+    try:
+        input_buffer = _readable_buffer(source)
+        name = source_name(input_buffer)
+        log.info(f"Procesando archivo: {name}")
+        company_data, store = read_input_store(input_buffer, read_mode, streaming_threshold, metrics,
+                                               exam_catalog=exam_catalog)
+        return write_store_output(name, sink, company_data, store, write_mode, metrics, exam_catalog=exam_catalog)
+    
+    except Exception as e:
+        log.exception(f"Error al procesar el archivo: {str(e)}")
+        return False
+
+def process_excel_bytes(data, read_mode='auto', streaming_threshold=STREAMING_THRESHOLD_BYTES,
+                        write_mode='streaming', metrics=None, exam_catalog=None):
+    """
+    Procesa un libro en memoria y devuelve el .xlsx de salida como bytes, o
+    None si no se pudo procesar. data: ver source en process_excel_buffer.
+    """
+    sink = io.BytesIO()
+    result = process_excel_buffer(data, sink, read_mode, streaming_threshold, write_mode, metrics, exam_catalog)
+    if not (result and result[0]):
+        return None
+    return sink.getvalue()
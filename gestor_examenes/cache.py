@@ -0,0 +1,233 @@
+# =============================================================================
+# CACHÉ DE LECTURA
+# =============================================================================
+#
+# Guarda, por hash del contenido del archivo de entrada, lo que el proceso usa
+# de la hoja: los datos de empresa y las columnas CUIL, nombre y descripción
+# ya convertidas a texto. Una corrida posterior sobre el mismo archivo (por
+# ejemplo, después de cambiar el orden de exámenes o el formato de salida) no
+# vuelve a leer el XML del .xlsx.
+#
+# Cada entrada es una carpeta <sha256>/ con un meta.json y, por columna, tres
+# arreglos .npy que se abren con memory-map: los códigos de cada fila (int32)
+# y el diccionario de valores únicos (bytes UTF-8 concatenados + offsets).
+
+import json
+import os
+import shutil
+import time
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from .metrics import log
+
+# Versión del formato y de la lectura: al cambiarla se descartan las entradas anteriores
+PARSE_CACHE_VERSION = "2"
+
+# Tamaño máximo de la caché; al superarlo se borran las entradas usadas hace más tiempo
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Columnas guardadas, en el orden en que las reciben las funciones de consolidación
+CACHED_COLUMNS = ('cuil', 'nombre', 'descripcion')
+
+# Filas por bloque al recorrer las columnas fila a fila
+ROW_CHUNK = 65536
+
+# Columna codificada con diccionario: códigos por fila y valores únicos
+EncodedColumn = namedtuple('EncodedColumn', ['codes', 'values'])
+
+class ParsedInput(namedtuple('ParsedInput', ['company_data', 'total_rows', 'columns'])):
+    """
+    Resultado de la lectura guardado en la caché: datos de empresa, cantidad
+    de filas de datos y las columnas de pacientes (nombre -> EncodedColumn).
+    """
+    
+    __slots__ = ()
+    
+    def column_arrays(self):
+        """Columnas CUIL, nombre y descripción como arreglos de texto"""
+        arrays = []
+        for name in CACHED_COLUMNS:
+            column = self.columns[name]
+            values = np.empty(len(column.values), dtype=object)
+            values[:] = column.values
+            arrays.append(values[np.asarray(column.codes)])
+        return arrays
+    
+    def iter_rows(self):
+        """Filas (cuil, nombre, descripcion) de a bloques, sin decodificar todo a la vez"""
+        columns = [self.columns[name] for name in CACHED_COLUMNS]
+        total = len(columns[0].codes)
+        for start in range(0, total, ROW_CHUNK):
+            chunks = [[column.values[code] for code in column.codes[start:start + ROW_CHUNK].tolist()]
+                      for column in columns]
+            yield from zip(*chunks)
+
+class ColumnRecorder:
+    """
+    Acumula las columnas de pacientes a medida que las lee el lector (pandas o
+    streaming) para guardarlas después en la caché. El lector fija total_rows
+    al terminar bien; mientras sea None la lectura no se guarda.
+    """
+    
+    def __init__(self):
+        self.company_data = None
+        self.total_rows = None
+        self._codes = {name: array('i') for name in CACHED_COLUMNS}
+        self._index = {name: {} for name in CACHED_COLUMNS}
+    
+    def append(self, cuil, nombre, descripcion):
+        for name, value in zip(CACHED_COLUMNS, (cuil, nombre, descripcion)):
+            index = self._index[name]
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(index)
+            self._codes[name].append(code)
+    
+    def extend(self, cuils, nombres, descripciones):
+        for name, column in zip(CACHED_COLUMNS, (cuils, nombres, descripciones)):
+            index = self._index[name]
+            codes = self._codes[name]
+            for value in column:
+                code = index.get(value)
+                if code is None:
+                    code = index[value] = len(index)
+                codes.append(code)
+    
+    def result(self):
+        """ParsedInput con las filas hasta la última con datos (como read_excel)"""
+        columns = {}
+        for name in CACHED_COLUMNS:
+            codes = np.frombuffer(self._codes[name], dtype=np.intc).astype(np.int32)[:self.total_rows]
+            columns[name] = EncodedColumn(codes, list(self._index[name]))
+        return ParsedInput(self.company_data, self.total_rows, columns)
+
+def _encode_values(values):
+    """Valores únicos -> (bytes UTF-8 concatenados, offsets)"""
+    encoded = [value.encode('utf-8', 'surrogatepass') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return data, offsets
+
+def _decode_values(data, offsets):
+    buffer = data.tobytes()
+    bounds = offsets.tolist()
+    return [buffer[start:end].decode('utf-8', 'surrogatepass')
+            for start, end in zip(bounds[:-1], bounds[1:])]
+
+def _entry_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+class ParseCache:
+    """
+    Caché en disco de lecturas, indexada por el SHA-256 del archivo de
+    entrada y limitada a max_bytes (se descartan las entradas menos usadas).
+    """
+    
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+    
+    def _entry_path(self, digest):
+        return os.path.join(self.directory, digest)
+    
+    def load(self, digest):
+        """ParsedInput guardado para ese hash, o None si no está o no sirve"""
+        path = self._entry_path(digest)
+        meta_path = os.path.join(path, 'meta.json')
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning(f"Entrada de caché inválida, se descarta: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        
+        if meta.get('version') != PARSE_CACHE_VERSION:
+            log.debug(f"Entrada de caché de otra versión ({meta.get('version')}), se descarta")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        
+        try:
+            columns = {}
+            for name in CACHED_COLUMNS:
+                codes = np.load(os.path.join(path, f'{name}.codes.npy'), mmap_mode='r')
+                data = np.load(os.path.join(path, f'{name}.values.npy'), mmap_mode='r')
+                offsets = np.load(os.path.join(path, f'{name}.offsets.npy'))
+                columns[name] = EncodedColumn(codes, _decode_values(data, offsets))
+        except (OSError, ValueError) as e:
+            log.warning(f"Entrada de caché inválida, se descarta: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        
+        # La fecha de meta.json marca el último uso (para el descarte por tamaño)
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return ParsedInput(meta['company_data'], meta['total_rows'], columns)
+    
+    def store(self, digest, parsed):
+        """Guarda la lectura de forma atómica (carpeta temporal + renombre) y aplica el límite de tamaño"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._entry_path(digest)
+        tmp_path = os.path.join(self.directory, f"tmp-{digest}-{os.getpid()}")
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            for name in CACHED_COLUMNS:
+                column = parsed.columns[name]
+                data, offsets = _encode_values(column.values)
+                np.save(os.path.join(tmp_path, f'{name}.codes.npy'), np.asarray(column.codes, dtype=np.int32))
+                np.save(os.path.join(tmp_path, f'{name}.values.npy'), data)
+                np.save(os.path.join(tmp_path, f'{name}.offsets.npy'), offsets)
+            meta = {
+                'version': PARSE_CACHE_VERSION,
+                'company_data': parsed.company_data,
+                'total_rows': parsed.total_rows,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            
+            if _entry_size(tmp_path) > self.max_bytes:
+                log.debug("La lectura supera el tamaño máximo de la caché, no se guarda")
+                return False
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning(f"No se pudo guardar la lectura en la caché: {e}")
+            return False
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        
+        self.evict()
+        return True
+    
+    def evict(self):
+        """Borra las entradas usadas hace más tiempo hasta quedar dentro de max_bytes"""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.is_dir() or entry.name.startswith('tmp-'):
+                        continue
+                    try:
+                        last_used = os.stat(os.path.join(entry.path, 'meta.json')).st_mtime
+                        entries.append((last_used, _entry_size(entry.path), entry.path))
+                    except OSError:
+                        continue
+        except FileNotFoundError:
+            return
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            log.debug(f"Caché: entrada descartada por tamaño ({os.path.basename(path)})")
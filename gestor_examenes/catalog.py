@@ -0,0 +1,142 @@
+# =============================================================================
+# CATÁLOGO DE EXÁMENES
+# =============================================================================
+#
+# Nombre canónico de cada descripción de estudio y orden de las columnas de
+# examen, configurables sin tocar el código con un archivo JSON:
+#
+#   {
+#     "orden": ["EXAMEN CLINICO", "AUDIOMETRIA", "RX"],
+#     "sinonimos": {"RX TORAX": "RX DE TORAX", "AUDIOMETRÍA": "AUDIOMETRIA"}
+#   }
+#
+# - orden: los exámenes que contienen cada nombre (sin distinguir mayúsculas)
+#   van primero, en ese orden; el resto, alfabéticamente
+# - sinonimos: descripción -> nombre canónico; las claves se comparan sin
+#   distinguir mayúsculas ni espacios repetidos. Las descripciones que no son
+#   un sinónimo quedan como están (solo sin espacios en los extremos)
+#
+# Los nombres del orden se compilan en una sola expresión regular, y cada
+# descripción distinta se normaliza una sola vez (queda en un diccionario).
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+
+# Orden preferido de los exámenes en la matriz
+PREFERRED_EXAM_ORDER = [
+    "EXAMEN CLINICO",
+    "AUDIOMETRIA",
+    "ESPIROMETRIA",
+    "CUESTIONARIO OSTEOARTICULAR COLUMNA LUMBOSACRA",
+    "CUESTIONARIO DE SEGMENTOS COMPROMETIDOS",
+    "RX",
+    "RX DE TORAX"
+]
+
+# Catálogo que se toma de la carpeta de entrada si existe
+EXAM_CATALOG_FILENAME = "catalogo_examenes.json"
+
+def _synonym_key(name):
+    """Clave de comparación de nombres: sin mayúsculas ni espacios repetidos"""
+    return ' '.join(name.split()).casefold()
+
+def _compile_preferred_order(preferred_order):
+    """
+    Una sola expresión para todo el orden preferido: en cada alternativa, una
+    búsqueda anticipada del nombre y un grupo vacío que indica su posición.
+    Las alternativas se prueban en orden, así que gana el primer nombre del
+    orden contenido en el examen (como la búsqueda nombre por nombre).
+    """
+    if not preferred_order:
+        return None
+    alternatives = '|'.join(f'(?=.*?{re.escape(name)})()' for name in preferred_order)
+    return re.compile(f'^(?:{alternatives})', re.IGNORECASE | re.DOTALL)
+
+class ExamCatalog:
+    """
+    Orden preferido y sinónimos de los exámenes.
+    canonical() da el nombre canónico de una descripción y order() ordena
+    los exámenes para las columnas de la matriz.
+    """
+    
+    def __init__(self, preferred_order=PREFERRED_EXAM_ORDER, synonyms=None):
+        self.preferred_order = [name.strip() for name in preferred_order if name and name.strip()]
+        self.synonyms = dict(synonyms or {})
+        
+        # Solo los sinónimos configurados cambian una descripción
+        self._names = {_synonym_key(alias): target.strip() for alias, target in self.synonyms.items()}
+        
+        self._matcher = _compile_preferred_order(self.preferred_order)
+        self._canonical = {}
+        self._rank = {}
+    
+    def __getstate__(self):
+        # Las cachés se vuelven a llenar en cada proceso
+        return {'preferred_order': self.preferred_order, 'synonyms': self.synonyms}
+    
+    def __setstate__(self, state):
+        self.__init__(state['preferred_order'], state['synonyms'])
+    
+    def fingerprint(self):
+        """Huella del orden y los sinónimos (cambia si cambia la salida que generan)"""
+        config = json.dumps([self.preferred_order, sorted(self.synonyms.items())], ensure_ascii=False)
+        return hashlib.sha256(config.encode('utf-8')).hexdigest()[:16]
+    
+    def canonical(self, description):
+        """Nombre canónico de una descripción de estudio ('' si está vacía)"""
+        name = self._canonical.get(description)
+        if name is None:
+            name = description.strip()
+            if self._names:
+                name = self._names.get(_synonym_key(name), name)
+            self._canonical[description] = name
+        return name
+    
+    def preferred_rank(self, exam):
+        """Posición del primer nombre del orden contenido en exam (o len del orden)"""
+        rank = self._rank.get(exam)
+        if rank is None:
+            match = self._matcher.match(exam) if self._matcher is not None else None
+            rank = match.lastindex - 1 if match else len(self.preferred_order)
+            self._rank[exam] = rank
+        return rank
+    
+    def order(self, exams):
+        """
+        Ordena los exámenes: primero los que contienen cada nombre del orden
+        preferido (en ese orden, alfabéticamente entre sí) y después el resto
+        alfabéticamente.
+        """
+        return sorted(exams, key=lambda exam: (self.preferred_rank(exam), exam))
+
+@lru_cache(maxsize=8)
+def catalog_for_order(preferred_order=tuple(PREFERRED_EXAM_ORDER)):
+    """Catálogo sin sinónimos para un orden preferido (compilado una vez por proceso)"""
+    return ExamCatalog(preferred_order)
+
+def default_exam_catalog():
+    """Catálogo por defecto: PREFERRED_EXAM_ORDER y sin sinónimos"""
+    return catalog_for_order()
+
+def load_exam_catalog(path):
+    """
+    Lee un catálogo de exámenes de un archivo JSON (ver el encabezado del
+    módulo). Lanza ValueError si el archivo no tiene el formato esperado.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            config = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: JSON inválido ({e})") from None
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: se esperaba un objeto con 'orden' y 'sinonimos'")
+    
+    preferred_order = config.get('orden', PREFERRED_EXAM_ORDER)
+    synonyms = config.get('sinonimos', {})
+    if not isinstance(preferred_order, list) or not all(isinstance(name, str) for name in preferred_order):
+        raise ValueError(f"{path}: 'orden' debe ser una lista de nombres de examen")
+    if not isinstance(synonyms, dict) or not all(isinstance(value, str) for value in synonyms.values()):
+        raise ValueError(f"{path}: 'sinonimos' debe asociar cada descripción a un nombre de examen")
+    return ExamCatalog(preferred_order, synonyms)
@@ -0,0 +1,446 @@
+# =============================================================================
+# LÍNEA DE COMANDOS
+# =============================================================================
+
+import argparse
+import logging
+import os
+import time
+
+from .metrics import log, configure_logging, RunMetrics
+from .batch import (CACHE_DIRNAME, REGISTRY_FILENAME, list_input_files, load_manifest, save_manifest, is_up_to_date,
+                    run_batch, save_run_metrics, write_captured_output)
+from .catalog import EXAM_CATALOG_FILENAME, load_exam_catalog
+from .pipeline import OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMATS, output_path, validate_output_formats
+from .merge import MASTER_OUTPUT_NAME, merge_excel_files
+from .shards import SHARD_BY, SHARD_TARGETS, ShardLayout
+from .server import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_UPLOAD_BYTES, serve
+from .watch import watch_folder
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Conversor de Excel de exámenes ocupacionales")
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help="cantidad de archivos a procesar en paralelo (por defecto: cantidad de CPUs)")
+    parser.add_argument('--force', action='store_true',
+                        help="reprocesar todos los archivos aunque no hayan cambiado")
+    parser.add_argument('--watch', action='store_true',
+                        help="vigilar la carpeta y procesar archivos nuevos o modificados (sin pausa final)")
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help="segundos entre revisiones de la carpeta en modo --watch")
+    parser.add_argument('--debounce', type=float, default=5.0,
+                        help="segundos sin cambios antes de procesar un archivo en modo --watch")
+    parser.add_argument('--serve', action='store_true',
+                        help="atender pedidos HTTP: POST /procesar con el libro en el cuerpo devuelve la salida .xlsx "
+                             "(sin archivos intermedios ni pausa final)")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"dirección del modo --serve (por defecto: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"puerto del modo --serve (por defecto: {DEFAULT_PORT})")
+    parser.add_argument('--max-upload-mb', type=int, default=DEFAULT_MAX_UPLOAD_BYTES // (1024 * 1024),
+                        help="tamaño máximo de un libro recibido en modo --serve, en MB")
+    parser.add_argument('--metrics', default=None, metavar='ARCHIVO',
+                        help="guardar tiempos y memoria por etapa y contadores de cada archivo en JSON "
+                             "(en modo --watch, una línea JSON por archivo)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="no usar la caché de lectura (siempre leer el .xlsx completo)")
+    parser.add_argument('--cache-dir', default=None, metavar='CARPETA',
+                        help=f"carpeta de la caché de lectura (por defecto: {CACHE_DIRNAME} dentro de la carpeta de entrada)")
+    parser.add_argument('--cache-max-mb', type=int, default=512,
+                        help="tamaño máximo de la caché de lectura en MB; se descartan las entradas usadas hace más tiempo")
+    parser.add_argument('--merge', nargs='?', const=MASTER_OUTPUT_NAME, default=None, metavar='SALIDA',
+                        help="consolidar todos los archivos de la carpeta en una sola matriz maestra "
+                             f"con el origen de cada estudio (por defecto: {MASTER_OUTPUT_NAME})")
+    parser.add_argument('--update', nargs='+', default=None, metavar='ARCHIVO',
+                        help="actualizar una salida existente (el primer archivo) con los pacientes y estudios "
+                             "de los archivos siguientes, sin regenerarla desde la entrada original")
+    parser.add_argument('--format', nargs='+', choices=OUTPUT_FORMATS, default=list(DEFAULT_OUTPUT_FORMATS),
+                        dest='formats', metavar='FORMATO',
+                        help="salidas a generar de una sola lectura: xlsx (matriz con formato), csv y parquet "
+                             "(matriz sin formato), csv-long y parquet-long (una fila por paciente y examen); "
+                             "parquet requiere pyarrow (por defecto: xlsx)")
+    parser.add_argument('--quality-report', action='store_true',
+                        help="guardar, junto a cada salida, un CSV con las filas descartadas u observadas "
+                             "(CUIL vacío o inválido, dígito verificador, CUIL con nombres distintos)")
+    parser.add_argument('--memory-cap-mb', type=int, default=None, metavar='MB',
+                        help="consolidar cada archivo (.xlsx) con la memoria acotada a MB: las filas se reparten "
+                             "por CUIL en particiones en disco que se consolidan por separado, con la misma salida "
+                             "(no usa la caché de lectura)")
+    parser.add_argument('--partition-jobs', type=int, default=1,
+                        help="con --memory-cap-mb, particiones a consolidar en paralelo por archivo (por defecto: 1)")
+    parser.add_argument('--shard-rows', type=int, default=None, metavar='N',
+                        help="dividir la matriz .xlsx en partes de N pacientes, cada una con el bloque de empresa "
+                             "y los encabezados, más una hoja \"Resumen\" con el índice y los totales por examen")
+    parser.add_argument('--shard-by', choices=SHARD_BY, default=None,
+                        help="dividir la matriz por cantidad de filas o por la inicial del nombre (con --shard-rows, "
+                             "el máximo de pacientes por parte; por defecto: filas)")
+    parser.add_argument('--shard-output', choices=SHARD_TARGETS, default='hojas',
+                        help="partes como hojas de la salida o como archivos aparte <salida>_parte_NN.xlsx "
+                             "(por defecto: hojas)")
+    parser.add_argument('--shard-jobs', type=int, default=1,
+                        help="con --shard-output archivos, partes a escribir en paralelo por salida (por defecto: 1)")
+    parser.add_argument('--exams-config', default=None, metavar='ARCHIVO',
+                        help="catálogo JSON con el orden preferido y los sinónimos de los exámenes "
+                             f"(por defecto: {EXAM_CATALOG_FILENAME} en la carpeta de entrada, si existe)")
+    parser.add_argument('--registry', nargs='?', const=REGISTRY_FILENAME, default=None, metavar='BASE',
+                        help="registrar los pacientes y estudios de cada archivo en una base SQLite "
+                             f"para consultas históricas (por defecto: {REGISTRY_FILENAME} en la carpeta de entrada)")
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument('--query-cuil', default=None, metavar='CUIL',
+                       help="consultar en el registro los estudios de un CUIL en todas las empresas (no procesa archivos)")
+    query.add_argument('--query-exam', default=None, metavar='EXAMEN',
+                       help="consultar en el registro los pacientes que tienen un examen")
+    query.add_argument('--query-missing', default=None, metavar='EXAMEN',
+                       help="consultar en el registro los pacientes que no tienen un examen")
+    parser.add_argument('--cuit', default=None,
+                        help="en las consultas, solo los archivos de la empresa con este CUIT")
+    parser.add_argument('--since', default=None, metavar='AAAA-MM-DD',
+                        help="en las consultas, solo los archivos con fecha desde este día")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('--quiet', '-q', action='store_true', help="mostrar solo avisos y errores")
+    verbosity.add_argument('--verbose', '-v', action='store_true', help="mostrar detalle de diagnóstico")
+    args = parser.parse_args(argv)
+    if args.merge and args.watch:
+        parser.error("--merge no se puede combinar con --watch")
+    if args.update is not None:
+        if args.merge or args.watch:
+            parser.error("--update no se puede combinar con --merge ni con --watch")
+        if len(args.update) < 2:
+            parser.error("--update necesita la salida a actualizar y al menos un archivo nuevo")
+    if args.serve and (args.merge or args.watch or args.update is not None):
+        parser.error("--serve no se puede combinar con --merge, --watch ni --update")
+    if args.memory_cap_mb is not None:
+        if args.memory_cap_mb < 1:
+            parser.error("--memory-cap-mb debe ser al menos 1")
+        if args.merge or args.update is not None or args.serve or args.registry:
+            parser.error("--memory-cap-mb no se puede combinar con --merge, --update, --serve ni --registry")
+    args.memory_cap = args.memory_cap_mb * 1024 * 1024 if args.memory_cap_mb is not None else None
+    args.shards = None
+    if args.shard_rows is not None or args.shard_by is not None:
+        if args.update is not None or args.serve:
+            parser.error("--shard-rows y --shard-by no se pueden combinar con --update ni --serve")
+        try:
+            args.shards = ShardLayout(args.shard_rows, args.shard_by or 'filas', args.shard_output, args.shard_jobs)
+        except ValueError as e:
+            parser.error(str(e))
+    args.query = args.query_cuil or args.query_exam or args.query_missing
+    if args.query and (args.merge or args.watch or args.update or args.serve):
+        parser.error("las consultas al registro no se pueden combinar con --merge, --watch, --update ni --serve")
+    if (args.cuit or args.since) and not args.query:
+        parser.error("--cuit y --since solo se usan con --query-cuil, --query-exam o --query-missing")
+    try:
+        args.formats = validate_output_formats(args.formats)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+def load_run_catalog(carpeta, exams_config):
+    """
+    Catálogo de exámenes de la corrida: el de --exams-config o, si existe, el
+    de la carpeta de entrada; None para usar el orden por defecto.
+    Lanza OSError o ValueError si el archivo no se puede leer.
+    """
+    path = os.path.join(carpeta, exams_config or EXAM_CATALOG_FILENAME)
+    if not exams_config and not os.path.exists(path):
+        return None
+    exam_catalog = load_exam_catalog(path)
+    log.info(f"Catálogo de exámenes: {path} ({len(exam_catalog.preferred_order)} en el orden preferido, "
+             f"{len(exam_catalog.synonyms)} sinónimos)")
+    return exam_catalog
+
+def open_run_registry(registry_path):
+    """Registro de la corrida si se pidió --registry (None si no o si no se pudo abrir)"""
+    if not registry_path:
+        return None
+    from .registry import open_registry
+    return open_registry(registry_path)
+
+def run_query(registry_path, args):
+    """Consulta el registro histórico (--query-cuil, --query-exam, --query-missing)"""
+    if not os.path.exists(registry_path):
+        log.error(f"No existe el registro {registry_path}: se crea al procesar con --registry")
+        return False
+    
+    from .registry import PatientRegistry
+    start_time = time.time()
+    with PatientRegistry(registry_path) as registry:
+        if args.query_cuil:
+            header = ['Examen', 'Empresa', 'CUIT', 'Archivo', 'Fecha']
+            rows = registry.exams_for_cuil(args.query_cuil, args.cuit, args.since)
+        elif args.query_exam:
+            header = ['CUIL', 'Empleado']
+            rows = registry.patients_with_exam(args.query_exam, args.cuit, args.since)
+        else:
+            header = ['CUIL', 'Empleado']
+            rows = registry.patients_missing_exam(args.query_missing, args.cuit, args.since)
+    
+    # Resultado separado por tabulaciones, para verlo o pasarlo a otra herramienta
+    print("\t".join(header))
+    for row in rows:
+        print("\t".join(row))
+    log.info(f"[OK] {len(rows)} resultados en {(time.time() - start_time) * 1000:.1f} ms")
+    return True
+
+def run_merge(carpeta, archivos, args, log_level, cache_dir, cache_max_bytes, registry_path, exam_catalog):
+    """Consolida los archivos de la carpeta en la matriz maestra (--merge)"""
+    output_file = os.path.join(carpeta, args.merge)
+    # Orden fijo: ante nombres distintos para un CUIL se usa el del primer archivo
+    archivos = sorted(archivo for archivo in archivos if archivo != os.path.basename(output_file))
+    jobs = max(1, min(args.jobs, len(archivos)))
+    metrics = RunMetrics(args.metrics is not None)
+    
+    log.info("\n" + "=" * 60)
+    log.info("CONSOLIDACIÓN DE ARCHIVOS EN MATRIZ MAESTRA")
+    log.info("=" * 60)
+    log.info(f"Procesos en paralelo: {jobs}")
+    
+    start_time = time.time()
+    registry = open_run_registry(registry_path)
+    try:
+        result = merge_excel_files([os.path.join(carpeta, archivo) for archivo in archivos], output_file,
+                                   jobs=jobs, metrics=metrics, log_level=log_level,
+                                   cache_dir=cache_dir, cache_max_bytes=cache_max_bytes,
+                                   output_formats=args.formats, registry=registry, exam_catalog=exam_catalog,
+                                   shards=args.shards)
+    finally:
+        if registry is not None:
+            registry.close()
+    ok = bool(result and result[0])
+    elapsed_time = time.time() - start_time
+    
+    log.info("\n" + "=" * 60)
+    if ok:
+        log.info(f"[OK] Matriz maestra generada: {output_path(output_file, args.formats[0])}")
+    else:
+        log.error("No se pudo generar la matriz maestra")
+    log.info(f"Tiempo total de procesamiento: {elapsed_time:.2f} segundos")
+    log.info("=" * 60)
+    
+    if args.metrics:
+        run_metrics = metrics.as_dict()
+        run_metrics['ok'] = ok
+        run_metrics['procesos'] = jobs
+        run_metrics['segundos_total'] = round(elapsed_time, 4)
+        save_run_metrics(args.metrics, {'consolidacion': run_metrics, 'archivos': archivos})
+
+def run_update(carpeta, args, cache_dir, cache_max_bytes, registry_path, exam_catalog):
+    """Actualiza una salida existente con archivos nuevos (--update)"""
+    from .update import update_output_file
+    
+    output_file, *input_files = [os.path.join(carpeta, archivo) for archivo in args.update]
+    metrics = RunMetrics(args.metrics is not None)
+    cache = None
+    if cache_dir:
+        from .cache import ParseCache
+        cache = ParseCache(cache_dir, cache_max_bytes)
+    
+    log.info("\n" + "=" * 60)
+    log.info("ACTUALIZACIÓN DE UNA SALIDA EXISTENTE")
+    log.info("=" * 60)
+    
+    start_time = time.time()
+    registry = open_run_registry(registry_path)
+    try:
+        result = update_output_file(output_file, input_files, metrics=metrics, cache=cache, registry=registry,
+                                    exam_catalog=exam_catalog)
+    finally:
+        if registry is not None:
+            registry.close()
+    ok = bool(result and result[0])
+    elapsed_time = time.time() - start_time
+    
+    log.info("\n" + "=" * 60)
+    if ok:
+        log.info(f"[OK] Salida actualizada: {output_file}")
+    else:
+        log.error("No se pudo actualizar la salida")
+    log.info(f"Tiempo total de procesamiento: {elapsed_time:.2f} segundos")
+    log.info("=" * 60)
+    
+    if args.metrics:
+        run_metrics = metrics.as_dict()
+        run_metrics['ok'] = ok
+        run_metrics['segundos_total'] = round(elapsed_time, 4)
+        save_run_metrics(args.metrics, {'actualizacion': run_metrics, 'archivos': args.update[1:]})
+
+def main(argv=None, carpeta=None):
+    """
+    Punto de entrada de la línea de comandos: procesa (o vigila) los archivos
+    de `carpeta`, por defecto el directorio actual.
+    """
+    args = parse_args(argv)
+    if args.quiet:
+        configure_logging(logging.WARNING)
+    elif args.verbose:
+        configure_logging(logging.DEBUG)
+    else:
+        configure_logging(logging.INFO)
+    log_level = log.level
+    track_memory = args.metrics is not None
+    
+    carpeta = os.path.abspath(carpeta or os.getcwd())
+    registry_path = args.registry
+    if args.query and not registry_path:
+        registry_path = REGISTRY_FILENAME
+    if registry_path:
+        registry_path = os.path.join(carpeta, registry_path)
+    
+    # Las consultas al registro no leen ningún archivo de la carpeta
+    if args.query:
+        run_query(registry_path, args)
+        return
+    
+    log.info("=" * 60)
+    log.info("CONVERSOR DE EXCEL AUTOMÁTICO - VERSIÓN ORDENADA A-Z")
+    log.info("=" * 60)
+    log.info("Procesamiento automático activado")
+    log.info("NUEVO: Pacientes ordenados alfabéticamente A-Z")
+    log.info("Cada paciente mantiene sus estudios correspondientes")
+    log.info("Extracción de datos de empresa con método fijo")
+    log.info("Verificación de pacientes por CUIL")
+    log.info("Formato profesional con openpyxl (si está disponible)")
+    log.info("Ancho de columnas calculado automáticamente")
+    log.info("=" * 60)
+    
+    # Mostrar el directorio actual
+    log.info(f"Directorio actual: {carpeta}")
+    
+    cache_dir = None if args.no_cache else os.path.abspath(args.cache_dir or os.path.join(carpeta, CACHE_DIRNAME))
+    cache_max_bytes = args.cache_max_mb * 1024 * 1024
+    
+    try:
+        exam_catalog = load_run_catalog(carpeta, args.exams_config)
+    except (OSError, ValueError) as e:
+        log.error(f"No se pudo leer el catálogo de exámenes: {e}")
+        if not (args.watch or args.serve):
+            input("\nPresiona Enter para cerrar el programa...")
+        return
+    
+    if args.serve:
+        serve(args.host, args.port, args.jobs, args.max_upload_mb * 1024 * 1024, log_level, exam_catalog)
+        return
+    
+    if args.update:
+        run_update(carpeta, args, cache_dir, cache_max_bytes, registry_path, exam_catalog)
+        input("\nPresiona Enter para cerrar el programa...")
+        return
+    
+    if args.watch:
+        watch_folder(carpeta, args.jobs, args.poll_interval, args.debounce, args.force,
+                     log_level, args.metrics, cache_dir, cache_max_bytes, args.formats, registry_path, exam_catalog,
+                     args.quality_report, args.memory_cap, args.partition_jobs, args.shards)
+        return
+    
+    # Buscar todos los archivos xlsx en la carpeta
+    try:
+        archivos_xlsx = list_input_files(carpeta)
+    except Exception as e:
+        log.error(f"Error listando archivos: {e}")
+        input("\nPresiona Enter para cerrar el programa...")
+        return
+    
+    if not archivos_xlsx:
+        log.error("No se encontraron archivos .xlsx o .xls para procesar en la carpeta.")
+        input("\nPresiona Enter para cerrar el programa...")
+        return
+    
+    log.info(f"Archivos encontrados: {len(archivos_xlsx)}")
+    for archivo in archivos_xlsx:
+        log.info(f"   > {archivo}")
+    
+    if args.merge:
+        run_merge(carpeta, archivos_xlsx, args, log_level, cache_dir, cache_max_bytes, registry_path, exam_catalog)
+        input("\nPresiona Enter para cerrar el programa...")
+        return
+    
+    start_time_total = time.time()
+    
+    # Omitir los archivos sin cambios desde la última corrida (salvo --force)
+    manifest = load_manifest(carpeta)
+    entries = manifest['archivos']
+    for archivo in list(entries):
+        if archivo not in archivos_xlsx:
+            del entries[archivo]
+    
+    if args.force:
+        pendientes = list(archivos_xlsx)
+    else:
+        pendientes = [archivo for archivo in archivos_xlsx
+                      if not is_up_to_date(carpeta, archivo, entries.get(archivo), args.formats, exam_catalog,
+                                                       args.shards)]
+        # Con --registry también se procesan los archivos sin cambios que
+        # todavía no están en el registro (o están con otro contenido)
+        registry = open_run_registry(registry_path)
+        if registry is not None:
+            with registry:
+                registrados = registry.recorded_files()
+            pendientes += [archivo for archivo in archivos_xlsx
+                           if archivo not in pendientes
+                           and registrados.get(archivo) != entries[archivo].get('sha256')]
+    archivos_omitidos = len(archivos_xlsx) - len(pendientes)
+    
+    log.info("\n" + "=" * 60)
+    log.info("INICIANDO PROCESAMIENTO AUTOMÁTICO")
+    log.info("=" * 60)
+    if archivos_omitidos:
+        log.info(f"Archivos sin cambios (omitidos): {archivos_omitidos}")
+    
+    archivos_procesados = 0
+    archivos_con_error = 0
+    
+    jobs = max(1, min(args.jobs, len(pendientes)))
+    if pendientes:
+        log.info(f"Procesos en paralelo: {jobs}")
+    
+    # Procesar cada archivo automáticamente; la salida de cada uno se muestra agrupada
+    metricas_por_archivo = {}
+    for archivo, ok, salida, entry, file_metrics in run_batch(carpeta, pendientes, jobs,
+                                                              log_level, track_memory,
+                                                              cache_dir, cache_max_bytes, args.formats,
+                                                              registry_path, exam_catalog, args.quality_report,
+                                                              args.memory_cap, args.partition_jobs, args.shards):
+        log.info(f"\nProcesando: {archivo}")
+        log.info("-" * 40)
+        write_captured_output(salida)
+        metricas_por_archivo[archivo] = file_metrics
+        if ok:
+            archivos_procesados += 1
+            entries[archivo] = entry
+        else:
+            archivos_con_error += 1
+            entries.pop(archivo, None)
+        save_manifest(carpeta, manifest)
+    save_manifest(carpeta, manifest)
+    
+    # Resumen final
+    elapsed_time_total = time.time() - start_time_total
+    log.info("\n" + "=" * 60)
+    log.info("RESUMEN FINAL")
+    log.info("=" * 60)
+    log.info(f"Total de archivos encontrados: {len(archivos_xlsx)}")
+    log.info(f"Archivos sin cambios (omitidos): {archivos_omitidos}")
+    log.info(f"Archivos procesados exitosamente: {archivos_procesados}")
+    log.info(f"Archivos con errores: {archivos_con_error}")
+    log.info(f"Tiempo total de procesamiento: {elapsed_time_total:.2f} segundos")
+    log.info("=" * 60)
+    
+    if args.metrics:
+        save_run_metrics(args.metrics, {
+            'resumen': {
+                'archivos_encontrados': len(archivos_xlsx),
+                'archivos_omitidos': archivos_omitidos,
+                'archivos_procesados': archivos_procesados,
+                'archivos_con_error': archivos_con_error,
+                'procesos': jobs,
+                'tiempo_total_segundos': round(elapsed_time_total, 4),
+            },
+            'archivos': metricas_por_archivo,
+        })
+    
+    if archivos_procesados > 0 or archivos_omitidos > 0:
+        log.info("Procesamiento automático completado!")
+        log.info("Los archivos de salida están en la misma carpeta con prefijo 'output_'")
+        log.info("Formato profesional aplicado")
+        log.info("PACIENTES ORDENADOS ALFABÉTICAMENTE A-Z")
+        log.info("Cada paciente mantiene sus estudios correspondientes")
+    
+    log.info("=" * 60)
+    
+    input("\nPresiona Enter para cerrar el programa...")
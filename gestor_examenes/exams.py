@@ -0,0 +1,15 @@
+# =============================================================================
+# ORDEN DE EXÁMENES
+# =============================================================================
+
+from .catalog import PREFERRED_EXAM_ORDER, catalog_for_order
+
+def order_exams(exams_set, preferred_order=PREFERRED_EXAM_ORDER, catalog=None):
+    """
+    Ordena los exámenes: primero los que contienen cada nombre de preferred_order
+    (en ese orden) y después el resto alfabéticamente.
+    catalog: ExamCatalog a usar en lugar de preferred_order (ver catalog.py)
+    """
+    if catalog is None:
+        catalog = catalog_for_order(tuple(preferred_order))
+    return catalog.order(set(exams_set))
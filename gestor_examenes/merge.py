@@ -0,0 +1,201 @@
+# =============================================================================
+# CONSOLIDACIÓN DE VARIOS ARCHIVOS (MATRIZ MAESTRA)
+# =============================================================================
+#
+# Une en una sola matriz los pacientes de varios archivos de entrada, por
+# ejemplo las exportaciones mensuales de distintos sitios de un contratista.
+# Cada archivo se lee y consolida por separado (en paralelo, un proceso por
+# archivo) y después se unen en orden en un único índice por CUIL: el nombre
+# es el primero no vacío, los estudios son la unión de todos los archivos y
+# el orden de columnas sigue las mismas reglas de order_exams. De cada
+# estudio se guarda el archivo y la empresa de donde salió, y se escribe en
+# la hoja "Origen" de la salida.
+
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .metrics import log, RunMetrics
+from .pipeline import DEFAULT_OUTPUT_FORMATS, read_input_file, validate_output_formats, write_store_output
+from .batch import capture_log, write_captured_output
+
+# Nombre por defecto de la matriz maestra (con prefijo output_ para que no se
+# tome como archivo de entrada en la próxima corrida)
+MASTER_OUTPUT_NAME = "output_master.xlsx"
+
+# Encabezados de la hoja "Origen"
+PROVENANCE_HEADERS = ['Id', 'Empleado', 'CUIL', 'Estudio', 'Archivo', 'Empresa', 'CUIT']
+
+# Separador de los datos de empresa cuando los archivos tienen valores distintos
+COMPANY_VALUE_SEPARATOR = " / "
+
+def read_file_job(input_file, read_mode='auto', log_level=logging.INFO, track_memory=False,
+                  cache_dir=None, cache_max_bytes=None):
+    """
+    Lee y consolida un archivo capturando su salida (para mostrarla agrupada).
+    Devuelve (input_file, (company_data, patient_info) o None si falló, salida, métricas).
+    """
+    buffer = io.StringIO()
+    metrics = RunMetrics(track_memory)
+    parsed = None
+    with capture_log(buffer, log_level):
+        try:
+            log.info(f"Leyendo: {input_file}")
+            cache = None
+            if cache_dir:
+                from .cache import ParseCache, DEFAULT_CACHE_MAX_BYTES
+                cache = ParseCache(cache_dir, cache_max_bytes or DEFAULT_CACHE_MAX_BYTES)
+            company_data, patient_info, _ = read_input_file(input_file, read_mode, metrics=metrics, cache=cache)
+            parsed = company_data, patient_info
+        except Exception as e:
+            log.exception(f"Error leyendo {input_file}: {e}")
+    return input_file, parsed, buffer.getvalue(), metrics.as_dict()
+
+def read_files(input_files, jobs=1, read_mode='auto', log_level=logging.INFO, track_memory=False,
+               cache_dir=None, cache_max_bytes=None):
+    """
+    Lee los archivos con un pool de `jobs` procesos y devuelve los resultados
+    de read_file_job en el orden de input_files (la unión depende del orden).
+    """
+    job_args = (read_mode, log_level, track_memory, cache_dir, cache_max_bytes)
+    if jobs <= 1:
+        for input_file in input_files:
+            yield read_file_job(input_file, *job_args)
+        return
+    
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(read_file_job, input_file, *job_args) for input_file in input_files]
+        for input_file, future in zip(input_files, futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool as e:
+                salida = f"[ERROR] El proceso que leía {input_file} terminó inesperadamente: {e}\n"
+                yield input_file, None, salida, {}
+
+def merge_patients(parsed_files):
+    """
+    Une los pacientes de varios archivos en un único índice por CUIL.
+    parsed_files: (archivo, company_data, patient_info) en el orden de los archivos
+    Devuelve (patient_info, provenance), con provenance
+    {(cuil, estudio): [(archivo, empresa, cuit), ...]} en orden de aparición.
+    """
+    patients = {}
+    provenance = {}
+    for archivo, company_data, patient_info in parsed_files:
+        source = (archivo, company_data['Empresa'], company_data['CUIT'])
+        for cuil, info in patient_info.items():
+            master = patients.get(cuil)
+            if master is None:
+                # Los estudios se acumulan en un dict para deduplicar sin perder el orden
+                master = patients[cuil] = {"nombre": info["nombre"], "estudios": {}}
+            elif not master["nombre"]:
+                master["nombre"] = info["nombre"]
+            estudios = master["estudios"]
+            for estudio in info["estudios"]:
+                estudios[estudio] = None
+                sources = provenance.get((cuil, estudio))
+                if sources is None:
+                    provenance[(cuil, estudio)] = [source]
+                elif source not in sources:
+                    sources.append(source)
+    
+    for info in patients.values():
+        info["estudios"] = list(info["estudios"])
+    return patients, provenance
+
+def merge_company_data(companies):
+    """Datos de empresa de la matriz maestra: por campo, los valores distintos no vacíos"""
+    merged = {}
+    for company_data in companies:
+        for field, value in company_data.items():
+            values = merged.setdefault(field, [])
+            if value and value not in values:
+                values.append(value)
+    return {field: COMPANY_VALUE_SEPARATOR.join(values) for field, values in merged.items()}
+
+def provenance_rows(provenance, store, exams_list, exam_catalog=None):
+    """
+    Filas de la hoja "Origen": una por estudio y archivo de origen, en el
+    orden de la matriz (pacientes por número y exámenes por columna).
+    store: PatientStore con los pacientes de la matriz (ver store.py)
+    exam_catalog: catálogo que da la columna de cada estudio (ver catalog.py)
+    """
+    from .catalog import default_exam_catalog
+    
+    canonical = (exam_catalog or default_exam_catalog()).canonical
+    exam_position = {exam: idx for idx, exam in enumerate(exams_list)}
+    by_patient = {}
+    for (cuil, estudio), sources in provenance.items():
+        by_patient.setdefault(cuil, []).append((estudio, sources))
+    
+    rows = [PROVENANCE_HEADERS]
+    for position, cuil in sorted((store.position(cuil), cuil) for cuil in by_patient):
+        nombre = store.records[position].nombre
+        studies = sorted(by_patient[cuil], key=lambda item: exam_position.get(canonical(item[0]), len(exam_position)))
+        for estudio, sources in studies:
+            for archivo, empresa, cuit in sources:
+                rows.append([position + 1, nombre, cuil, estudio, archivo, empresa, cuit])
+    return rows
+
+def merge_excel_files(input_files, output_file, jobs=1, read_mode='auto', write_mode='streaming',
+                      metrics=None, log_level=None, cache_dir=None, cache_max_bytes=None, output_formats=DEFAULT_OUTPUT_FORMATS,
+                      registry=None, exam_catalog=None, shards=None):
+    """
+    Genera una matriz maestra con los pacientes y estudios de todos los archivos.
+    Devuelve (True, última_fila_de_empleados) o False, como process_excel_file.
+    jobs: procesos para leer los archivos en paralelo
+    log_level: nivel del registro de cada lectura (por defecto, el del conversor)
+    output_formats: salidas a generar, como en process_excel_file (la hoja
+    "Origen" solo se agrega a la salida .xlsx)
+    registry: PatientRegistry opcional donde se registran los pacientes y estudios de cada archivo
+    exam_catalog: orden y sinónimos de los exámenes, como en process_excel_file
+    shards: división de la matriz en partes, como en process_excel_file
+    Los archivos que no se pueden leer se informan y se omiten.
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    log_level = log_level if log_level is not None else log.getEffectiveLevel()
+    log.info(f"Consolidando {len(input_files)} archivos en: {output_file}")
+    
+    try:
+        output_formats = validate_output_formats(output_formats)
+        parsed_files = []
+        total_rows = 0
+        with metrics.stage('lectura'):
+            for input_file, parsed, salida, file_metrics in read_files(input_files, jobs, read_mode, log_level,
+                                                                        metrics.track_memory, cache_dir, cache_max_bytes):
+                write_captured_output(salida)
+                if parsed is None:
+                    metrics.count('archivos_con_error', 1)
+                    continue
+                company_data, patient_info = parsed
+                parsed_files.append((os.path.basename(input_file), company_data, patient_info))
+                if registry is not None:
+                    registry.record_file(input_file, company_data, patient_info)
+                total_rows += file_metrics.get('contadores', {}).get('filas_leidas', 0)
+                metrics.count('archivos', 1)
+        
+        if not parsed_files:
+            log.error("No se pudo leer ningún archivo")
+            return False
+        
+        with metrics.stage('union'):
+            patient_info, provenance = merge_patients(parsed_files)
+            company_data = merge_company_data(company for _, company, _ in parsed_files)
+        metrics.count('filas_leidas', total_rows)
+        log.info(f"[OK] Pacientes únicos entre {len(parsed_files)} archivos: {len(patient_info)}")
+        
+        from .reader import assign_patient_numbers
+        from .store import PatientStore
+        patient_numbers = assign_patient_numbers(patient_info, total_rows)
+        with metrics.stage('matriz_examenes'):
+            store = PatientStore.from_patient_info(patient_info, patient_numbers, catalog=exam_catalog)
+        # Durante la escritura solo quedan el almacén y el origen de los estudios
+        del parsed_files, patient_info, patient_numbers
+        return write_store_output(input_files[0], output_file, company_data, store, write_mode, metrics,
+                                  provenance, output_formats, exam_catalog=exam_catalog, shards=shards)
+    
+    except Exception as e:
+        log.exception(f"Error al consolidar los archivos: {str(e)}")
+        return False
@@ -0,0 +1,86 @@
+# =============================================================================
+# REGISTRO Y MÉTRICAS
+# =============================================================================
+
+import contextlib
+import logging
+import sys
+import time
+import tracemalloc
+
+# Registro compartido por todos los módulos del conversor
+log = logging.getLogger("conversor")
+
+class ConsoleFormatter(logging.Formatter):
+    """Formato de consola: los avisos y errores llevan el prefijo [AVISO] / [ERROR]"""
+    
+    PREFIXES = {logging.WARNING: "[AVISO] ", logging.ERROR: "[ERROR] ", logging.CRITICAL: "[ERROR] "}
+    
+    def format(self, record):
+        return self.PREFIXES.get(record.levelno, "") + super().format(record)
+
+def configure_logging(level=logging.INFO):
+    """Configura el registro de consola del conversor"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(ConsoleFormatter("%(message)s"))
+    log.handlers[:] = [handler]
+    log.setLevel(level)
+    log.propagate = False
+
+class RunMetrics:
+    """
+    Métricas de una corrida: tiempo (y, con track_memory, pico de memoria
+    medido con tracemalloc) de cada etapa, más contadores de filas leídas,
+    filas descartadas por motivo, pacientes y exámenes, y el reporte de
+    calidad de datos (ver quality.py).
+    """
+    
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.stages = {}
+        self.counters = {}
+        self.skipped_rows = {}
+        self._quality = None
+    
+    @property
+    def quality(self):
+        """DataQualityReport de la corrida (se crea al primer uso)"""
+        if self._quality is None:
+            from .quality import DataQualityReport
+            self._quality = DataQualityReport()
+        return self._quality
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        started_tracing = False
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'seconds': round(time.perf_counter() - start, 4)}
+            if self.track_memory:
+                record['peak_mib'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+                if started_tracing:
+                    tracemalloc.stop()
+            self.stages[name] = record
+            log.debug(f"Etapa {name}: {record}")
+    
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+    
+    def skip(self, reason, value=1):
+        if value:
+            self.skipped_rows[reason] = self.skipped_rows.get(reason, 0) + value
+    
+    def as_dict(self):
+        counters = dict(self.counters)
+        counters['filas_descartadas'] = sum(self.skipped_rows.values())
+        result = {'etapas': self.stages, 'contadores': counters, 'filas_descartadas': self.skipped_rows}
+        if self._quality is not None:
+            result['calidad'] = self._quality.as_dict()
+        return result
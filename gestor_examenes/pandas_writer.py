@@ -0,0 +1,82 @@
+# =============================================================================
+# ESCRITOR CON PANDAS (formato básico)
+# =============================================================================
+
+import numpy as np
+import pandas as pd
+
+from .metrics import log
+from .pipeline import company_fields
+from .widths import compute_column_widths
+
+def _apply_column_widths_pandas(writer, column_widths):
+    """Aplica los anchos de columna según el motor que use pandas"""
+    worksheet = next(iter(writer.sheets.values()))
+    for idx, width in enumerate(column_widths):
+        if writer.engine == 'xlsxwriter':
+            worksheet.set_column(idx, idx, width)
+        elif writer.engine == 'openpyxl':
+            from openpyxl.utils import get_column_letter
+            worksheet.column_dimensions[get_column_letter(idx + 1)].width = width
+
+def process_excel_file_with_pandas(input_file, output_file, company_data, store, exams_list, exam_count, column_widths=None, provenance=None):
+    """
+    Crea el archivo Excel con formato básico usando solo pandas (fallback)
+    ORDENANDO ALFABÉTICAMENTE POR NOMBRE
+    provenance: filas opcionales (la primera es el encabezado) de la hoja "Origen"
+    """
+    try:
+        # Crear un nuevo DataFrame para el resultado
+        company_rows = []
+        for field, value in company_fields(company_data):
+            row = [''] * (3 + len(exams_list))
+            row[1] = field
+            row[2] = value
+            company_rows.append(row)
+        
+        # Agregar fila en blanco
+        company_rows.append([''] * (3 + len(exams_list)))
+        
+        # Crear encabezados
+        headers = ['Id', 'Empleado', 'CUIL'] + exams_list
+        
+        # Marcas "X" de todos los empleados en el orden de salida (el del
+        # almacén, ya ordenado alfabéticamente)
+        marks = np.where(store.marks(exams_list), 'X', '').tolist()
+        
+        # Crear filas de empleados
+        employee_rows = []
+        for (patient_number, name, cuil, _), row_marks in zip(store.rows(), marks):
+            row = [patient_number, name, cuil] + row_marks
+            employee_rows.append(row)
+        
+        # Agregar fila en blanco
+        employee_rows.append([''] * (3 + len(exams_list)))
+        
+        # Agregar recuento de exámenes
+        exam_rows = []
+        for exam, count in exam_count.items():
+            row = [''] * (3 + len(exams_list))
+            row[0] = count
+            row[1] = exam
+            exam_rows.append(row)
+        
+        # Combinar todas las filas
+        all_rows = company_rows + [headers] + employee_rows + exam_rows
+        
+        # Crear DataFrame final
+        result_df = pd.DataFrame(all_rows)
+        
+        # Guardar como Excel, con los anchos de columna calculados
+        if column_widths is None:
+            column_widths = compute_column_widths(exams_list, len(store), exam_count)
+        with pd.ExcelWriter(output_file) as writer:
+            result_df.to_excel(writer, index=False, header=False)
+            _apply_column_widths_pandas(writer, column_widths)
+            if provenance is not None:
+                pd.DataFrame(provenance[1:], columns=provenance[0]).to_excel(writer, sheet_name="Origen", index=False)
+        return True, len(employee_rows)
+        
+    except Exception as e:
+        log.error(f"Error creando archivo con pandas: {e}")
+        return False, None
@@ -0,0 +1,387 @@
+# =============================================================================
+# PROCESAMIENTO DE UN ARCHIVO
+# =============================================================================
+
+import importlib.util
+import os
+
+from .metrics import log, RunMetrics
+
+# openpyxl se importa recién al usarlo; acá solo se verifica que esté instalado
+OPENPYXL_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
+
+# pyarrow es opcional: sin él no se pueden pedir las salidas Parquet
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Tamaño de archivo a partir del cual el modo 'auto' lee en streaming
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+# Formatos de salida: 'xlsx' es la matriz con formato de los escritores de Excel;
+# los demás son las salidas sin formato de table_writers.py
+OUTPUT_FORMATS = ('xlsx', 'csv', 'csv-long', 'parquet', 'parquet-long')
+DEFAULT_OUTPUT_FORMATS = ('xlsx',)
+
+# Sufijo y extensión del archivo principal de cada formato tabular
+_FORMAT_FILES = {
+    'csv': ('', '.csv'),
+    'csv-long': ('_largo', '.csv'),
+    'parquet': ('', '.parquet'),
+    'parquet-long': ('_largo', '.parquet'),
+}
+
+def validate_output_formats(formats):
+    """
+    Normaliza la lista de formatos (sin repetidos, en el orden dado) y rechaza
+    los desconocidos y los Parquet si pyarrow no está instalado
+    """
+    formats = list(dict.fromkeys(formats))
+    if not formats:
+        raise ValueError("Se debe indicar al menos un formato de salida")
+    for fmt in formats:
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato de salida desconocido: {fmt}")
+        if fmt.startswith('parquet') and not PYARROW_AVAILABLE:
+            raise ValueError(f"El formato '{fmt}' requiere pyarrow (pip install pyarrow)")
+    return formats
+
+def output_path(output_file, fmt):
+    """Ruta del archivo principal de un formato, a partir de la salida .xlsx"""
+    if fmt == 'xlsx':
+        return output_file
+    suffix, extension = _FORMAT_FILES[fmt]
+    return os.path.splitext(output_file)[0] + suffix + extension
+
+def company_fields(company_data):
+    """
+    Campos del bloque de empresa, (campo, valor), en el orden de la salida.
+    Los usan los escritores de Excel, el de pandas y los tabulares.
+    """
+    return [
+        ('Proceso', ''),
+        ('Empresa', company_data['Empresa']),
+        ('CUIT', company_data['CUIT']),
+        ('Contrato', company_data['Contrato']),
+        ('Domicilio', company_data['Domicilio']),
+        ('Localidad', company_data['Localidad']),
+        ('Provincia', company_data['Provincia']),
+        ('Telefono', company_data['Telefono']),
+        ('Contacto', ''),
+        ('Email', company_data['Email'])
+    ]
+
+def is_path(source):
+    """True si source es una ruta; False si es un buffer binario (ver buffers.py)"""
+    return isinstance(source, (str, os.PathLike))
+
+def source_name(source):
+    """Nombre para mostrar de una ruta o de un buffer"""
+    if is_path(source):
+        return os.fspath(source)
+    return getattr(source, 'name', None) or "<memoria>"
+
+def _source_size(source):
+    """Tamaño en bytes de una ruta o de un buffer con seek"""
+    if is_path(source):
+        return os.path.getsize(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+def _is_xlsx(source):
+    """Extensión .xlsx para una ruta; encabezado ZIP para un buffer"""
+    if is_path(source):
+        return os.fspath(source).lower().endswith('.xlsx')
+    position = source.tell()
+    source.seek(0)
+    signature = source.read(4)
+    source.seek(position)
+    return signature == b'PK\x03\x04'
+
+def choose_read_mode(input_file, read_mode='auto', streaming_threshold=STREAMING_THRESHOLD_BYTES):
+    """
+    Resuelve el modo de lectura: 'pandas', 'xml' (lectura directa de las
+    columnas usadas), 'streaming' o 'auto' (streaming cuando el archivo supera
+    streaming_threshold bytes, lectura directa en otro caso).
+    input_file: ruta o buffer binario con seek
+    """
+    if read_mode not in ('auto', 'pandas', 'xml', 'streaming'):
+        raise ValueError(f"Modo de lectura desconocido: {read_mode}")
+    
+    # El streaming y la lectura directa leen el XML del .xlsx (no archivos .xls)
+    can_stream = OPENPYXL_AVAILABLE and _is_xlsx(input_file)
+    
+    if read_mode in ('streaming', 'xml') and not can_stream:
+        log.warning(f"Lectura '{read_mode}' no disponible para este archivo, usando pandas")
+        return 'pandas'
+    if read_mode == 'auto':
+        if not can_stream:
+            return 'pandas'
+        if _source_size(input_file) > streaming_threshold:
+            return 'streaming'
+        return 'xml'
+    return read_mode
+
+def read_input_file(input_file, read_mode='auto', streaming_threshold=STREAMING_THRESHOLD_BYTES, metrics=None, cache=None, content_hash=None):
+    """
+    Lee un archivo de entrada (ruta o buffer binario con seek) y consolida sus
+    pacientes. Devuelve (company_data, patient_info, patient_numbers).
+    read_mode, streaming_threshold, metrics, cache y content_hash: ver process_excel_file
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    read_mode = choose_read_mode(input_file, read_mode, streaming_threshold)
+    
+    # Las dependencias pesadas (pandas, numpy, openpyxl) se cargan al
+    # usarse por primera vez, según el lector y el escritor elegidos
+    parsed = recorder = None
+    if cache is not None:
+        from .batch import file_content_hash
+        from .cache import ColumnRecorder
+        
+        content_hash = content_hash or file_content_hash(input_file)
+        with metrics.stage('lectura_cache'):
+            parsed = cache.load(content_hash)
+        if parsed is None:
+            recorder = ColumnRecorder()
+    
+    if parsed is not None:
+        # Lectura guardada: se consolida igual que con el lector correspondiente
+        log.info(f"Lectura tomada de la caché: {parsed.total_rows} filas")
+        metrics.count('lecturas_desde_cache', 1)
+        company_data = parsed.company_data
+        with metrics.stage('consolidacion'):
+            if read_mode == 'streaming':
+                from .streaming import consolidate_patient_rows
+                patient_info = consolidate_patient_rows(parsed.iter_rows(), metrics)
+            else:
+                from .reader import consolidate_patient_columns
+                patient_info = consolidate_patient_columns(*parsed.column_arrays(), metrics)
+        from .reader import assign_patient_numbers
+        patient_numbers = assign_patient_numbers(patient_info, parsed.total_rows)
+    elif read_mode == 'xml':
+        from .xlsx_reader import process_excel_xml, UnsupportedSheetError
+        
+        # Lectura directa del XML: solo se decodifican las columnas que se usan
+        log.info("Leyendo archivo Excel (lectura directa)...")
+        try:
+            company_data, patient_info, patient_numbers = process_excel_xml(input_file, metrics, recorder)
+        except UnsupportedSheetError as e:
+            log.warning(f"Lectura directa no disponible ({e}), usando pandas")
+            read_mode = 'pandas'
+    if parsed is None and read_mode == 'streaming':
+        from .streaming import process_excel_streaming
+        
+        # Lectura fila por fila: no se carga la hoja completa en memoria
+        log.info("Leyendo archivo Excel en streaming...")
+        company_data, patient_info, patient_numbers = process_excel_streaming(input_file, metrics, recorder)
+    elif parsed is None and read_mode == 'pandas':
+        from .reader import load_excel_once, extract_company_data_fixed_positions, process_all_patients
+        
+        # Leer el archivo una sola vez: vista con encabezado para datos de empresa
+        # y vista sin encabezado para el procesamiento de pacientes
+        log.info("Leyendo archivo Excel...")
+        with metrics.stage('lectura'):
+            df_with_header, df_no_header = load_excel_once(input_file)
+        
+        log.info(f"Archivo leído: {len(df_with_header)} filas, {len(df_with_header.columns)} columnas")
+        
+        # Extracción de datos de empresa
+        with metrics.stage('empresa'):
+            company_data = extract_company_data_fixed_positions(df_with_header)
+        
+        # Procesamiento de pacientes con ordenamiento alfabético
+        log.info("\nUsando lógica de fix_de_id.py con ordenamiento alfabético...")
+        with metrics.stage('consolidacion'):
+            patient_info, patient_numbers = process_all_patients(df_no_header, metrics, recorder)
+        del df_with_header, df_no_header
+    
+    if recorder is not None and recorder.total_rows is not None:
+        recorder.company_data = company_data
+        with metrics.stage('guardado_cache'):
+            cache.store(content_hash, recorder.result())
+    metrics.quality.log_summary()
+    return company_data, patient_info, patient_numbers
+
+def read_input_store(input_file, read_mode='auto', streaming_threshold=STREAMING_THRESHOLD_BYTES, metrics=None, cache=None, content_hash=None, exam_catalog=None, registry=None):
+    """
+    Lee y consolida como read_input_file y devuelve (company_data, store), con
+    store el PatientStore en el orden de salida. patient_info y
+    patient_numbers se liberan al volver: durante la escritura solo queda el
+    almacén compacto.
+    registry: PatientRegistry opcional donde se registran los pacientes y
+    estudios leídos (antes de liberar la consolidación)
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    company_data, patient_info, patient_numbers = read_input_file(
+        input_file, read_mode, streaming_threshold, metrics, cache, content_hash)
+    if registry is not None:
+        with metrics.stage('registro'):
+            registry.record_file(input_file, company_data, patient_info, content_hash)
+    
+    from .store import PatientStore
+    with metrics.stage('matriz_examenes'):
+        store = PatientStore.from_patient_info(patient_info, patient_numbers, catalog=exam_catalog)
+    return company_data, store
+
+def write_output_file(input_file, output_file, company_data, patient_info, patient_numbers, write_mode='streaming', metrics=None, provenance=None, output_formats=DEFAULT_OUTPUT_FORMATS, known_exams=(), exam_catalog=None, shards=None):
+    """
+    Arma el almacén de pacientes y escribe los archivos de salida (mientras
+    el llamador conserve patient_info, la consolidación y el almacén conviven
+    en memoria: el proceso de un archivo usa read_input_store y
+    write_store_output).
+    Devuelve (True, última_fila_de_empleados) o False si no se pudo escribir
+    (sin salida .xlsx, la última fila es None).
+    write_mode, metrics y output_formats: ver process_excel_file
+    provenance: {(cuil, estudio): [(archivo, empresa, cuit), ...]} opcional; se
+    agrega una hoja "Origen" con el archivo y la empresa de cada estudio
+    known_exams: exámenes que van primero en el bloque de totales, en ese orden
+    (al actualizar una salida existente se conserva su orden)
+    exam_catalog y shards: ver process_excel_file
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    output_formats = validate_output_formats(output_formats)
+    
+    from .store import PatientStore
+    
+    # Almacén compacto en el orden alfabético de patient_numbers (los
+    # escritores no vuelven a ordenar)
+    with metrics.stage('matriz_examenes'):
+        store = PatientStore.from_patient_info(patient_info, patient_numbers, known_exams, exam_catalog)
+    return write_store_output(input_file, output_file, company_data, store, write_mode, metrics, provenance,
+                              output_formats, exam_catalog, shards)
+
+def write_store_output(input_file, output_file, company_data, store, write_mode='streaming', metrics=None, provenance=None, output_formats=DEFAULT_OUTPUT_FORMATS, exam_catalog=None, shards=None):
+    """
+    Escribe los archivos de salida de un PatientStore ya armado en el orden de
+    salida (ver write_output_file). Devuelve lo mismo que write_output_file.
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    output_formats = validate_output_formats(output_formats)
+    
+    from .exams import order_exams
+    from .widths import compute_column_widths
+    
+    exam_count = store.exam_count()
+    metrics.count('pacientes', len(store))
+    metrics.count('examenes', len(store.exams))
+    metrics.count('estudios', store.study_count())
+    
+    log.info(f"\n[OK] Total de empleados extraídos: {len(store)}")
+    log.info("[OK] Método de extracción: process_all_patients con ordenamiento alfabético")
+    
+    # Ordenar exámenes: primero los preferidos, luego el resto alfabéticamente
+    with metrics.stage('orden_examenes'):
+        exams_list = order_exams(store.exams, catalog=exam_catalog)
+    
+    # Crear archivo con el mejor formato disponible
+    writer_args = (input_file, output_file, company_data, store, exams_list, exam_count)
+    result = (True, None)
+    if 'xlsx' in output_formats:
+        with metrics.stage('anchos'):
+            column_widths = compute_column_widths(exams_list, len(store), exam_count)
+        
+        with metrics.stage('escritura'):
+            provenance_sheet = None
+            if provenance is not None:
+                from .merge import provenance_rows
+                provenance_sheet = provenance_rows(provenance, store, exams_list, exam_catalog)
+            if shards is not None and not OPENPYXL_AVAILABLE:
+                log.warning("La división en partes requiere openpyxl: se escribe una sola hoja")
+            if OPENPYXL_AVAILABLE and shards is not None:
+                from .shards import write_sharded_output
+                log.info("Usando openpyxl (solo escritura) con la matriz dividida en partes...")
+                result = write_sharded_output(output_file, company_data, store, exams_list, exam_count, shards,
+                                              column_widths, provenance_sheet, metrics)
+            elif OPENPYXL_AVAILABLE and write_mode == 'streaming':
+                from .writers import process_excel_file_with_openpyxl_streaming
+                log.info("Usando openpyxl (solo escritura) para formato profesional...")
+                result = process_excel_file_with_openpyxl_streaming(*writer_args, column_widths=column_widths,
+                                                                    provenance=provenance_sheet)
+            elif OPENPYXL_AVAILABLE:
+                from .writers import process_excel_file_with_openpyxl
+                log.info("Usando openpyxl para formato profesional...")
+                result = process_excel_file_with_openpyxl(*writer_args, column_widths=column_widths,
+                                                          provenance=provenance_sheet)
+            else:
+                from .pandas_writer import process_excel_file_with_pandas
+                log.info("Usando pandas para formato básico...")
+                result = process_excel_file_with_pandas(*writer_args, column_widths=column_widths,
+                                                        provenance=provenance_sheet)
+        if result[0]:
+            log.info(f"[OK] Archivo guardado como: {source_name(output_file)}")
+    
+    # Salidas CSV/Parquet de la misma consolidación (sin formato ni anchos)
+    if result[0] and any(fmt != 'xlsx' for fmt in output_formats):
+        from .table_writers import write_table_outputs
+        with metrics.stage('escritura_tabular'):
+            written = write_table_outputs(output_formats, *writer_args[1:])
+        if written is None:
+            result = (False, None)
+    
+    if result[0]:
+        # Show summary
+        log.info("\nRESUMEN FINAL:")
+        log.info(f"   Empresa: {company_data['Empresa']}")
+        log.info(f"   Cantidad de empleados: {len(store)}")
+        log.info(f"   Cantidad de exámenes: {len(exams_list)}")
+        log.info("   Pacientes ordenados alfabéticamente (A-Z)")
+        log.info("   Cada paciente mantiene sus estudios correspondientes")
+        
+        return True, result[1]
+    else:
+        return False
+
+def process_excel_file(input_file, output_file, read_mode='auto', streaming_threshold=STREAMING_THRESHOLD_BYTES, write_mode='streaming', metrics=None, cache=None, content_hash=None, output_formats=DEFAULT_OUTPUT_FORMATS, registry=None, exam_catalog=None, quality_report=False, memory_cap=None, partition_jobs=1, shards=None):
+    """
+    Process the Excel file and generate a new formatted Excel file.
+    Ordena alfabéticamente por nombre
+    read_mode: 'pandas', 'xml', 'streaming' o 'auto' (streaming por encima de streaming_threshold bytes)
+    write_mode: 'streaming' (openpyxl solo escritura) o 'full' (libro completo en memoria)
+    metrics: RunMetrics opcional donde se registran tiempos por etapa y contadores
+    cache: ParseCache opcional; si ya tiene la lectura de este contenido no se lee el .xlsx
+    content_hash: SHA-256 del archivo si ya se calculó (evita leerlo dos veces)
+    output_formats: salidas a generar de una sola consolidación: 'xlsx' (matriz
+    con formato en output_file), 'csv', 'csv-long', 'parquet' y 'parquet-long'
+    (ver table_writers.py; se nombran a partir de output_file)
+    registry: PatientRegistry opcional donde se registran los pacientes y estudios leídos
+    exam_catalog: ExamCatalog con el orden preferido y los sinónimos de los
+    exámenes (ver catalog.py); por defecto, PREFERRED_EXAM_ORDER sin sinónimos
+    quality_report: si hay filas descartadas u observadas, guardar el reporte
+    de calidad completo en CSV junto a la salida (ver quality.py)
+    memory_cap: bytes de memoria para la consolidación; si se indica, el
+    archivo (.xlsx) se consolida por particiones de CUIL guardadas en disco
+    (ver spill.py), con la misma salida. No usa cache ni admite registry.
+    partition_jobs: procesos que consolidan particiones en paralelo
+    shards: ShardLayout opcional para dividir la matriz .xlsx en varias hojas
+    o archivos, con una hoja "Resumen" (ver shards.py)
+    """
+    log.info(f"Procesando archivo: {input_file}")
+    metrics = metrics if metrics is not None else RunMetrics()
+    
+    try:
+        # Verificar que el archivo existe
+        if not os.path.exists(input_file):
+            log.error(f"El archivo {input_file} no existe")
+            return False
+        # Los formatos se validan antes de leer el archivo
+        output_formats = validate_output_formats(output_formats)
+        
+        if memory_cap is not None:
+            from .spill import read_input_spilled
+            
+            if registry is not None:
+                raise ValueError("El registro histórico no se puede usar con la memoria acotada")
+            company_data, store = read_input_spilled(input_file, memory_cap, metrics, exam_catalog, partition_jobs)
+        else:
+            company_data, store = read_input_store(input_file, read_mode, streaming_threshold, metrics, cache,
+                                                   content_hash, exam_catalog, registry)
+        if quality_report and metrics.quality.counts():
+            from .quality import quality_report_path
+            path = metrics.quality.write_csv(quality_report_path(output_file))
+            log.info(f"[OK] Reporte de calidad guardado como: {path}")
+        return write_store_output(input_file, output_file, company_data, store, write_mode, metrics,
+                                  output_formats=output_formats, exam_catalog=exam_catalog, shards=shards)
+    
+    except Exception as e:
+        log.exception(f"Error al procesar el archivo: {str(e)}")
+        return False
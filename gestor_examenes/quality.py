@@ -0,0 +1,233 @@
+# =============================================================================
+# VALIDACIÓN DE CUIL Y CALIDAD DE DATOS
+# =============================================================================
+#
+# Antes de consolidar, la columna CUIL se valida de a bloques con NumPy (sin
+# recorrer las celdas en Python):
+# - formato: se quitan guiones, puntos, barras y espacios, y el ".0" de los
+#   CUIL leídos como número decimal ("20123456789.0"); si quedan 11 dígitos
+#   el CUIL se reemplaza por su forma normalizada, así el mismo paciente
+#   escrito de distintas formas queda en un solo registro
+# - dígito verificador (módulo 11): un CUIL con verificador inválido se
+#   informa pero no se descarta (puede ser un error de tipeo del paciente
+#   correcto, y sus estudios se siguen mostrando)
+# Se descartan las filas sin CUIL, los encabezados repetidos y los valores
+# que no son un CUIL. El reporte de calidad de cada corrida (RunMetrics.quality)
+# guarda las filas descartadas u observadas con su motivo y los CUIL que
+# aparecen con nombres distintos.
+
+import csv
+import os
+
+import numpy as np
+
+from .metrics import log
+
+# Primera fila de datos de la hoja (la 1 es el encabezado)
+FIRST_DATA_ROW = 2
+
+CUIL_DIGITS = 11
+CUIL_WEIGHTS = np.array([5, 4, 3, 2, 7, 6, 5, 4, 3, 2])
+
+# Textos más largos que esto no pueden ser un CUIL con separadores
+MAX_CUIL_TEXT = 20
+
+# Filas por bloque de validación (acota la memoria de la matriz de caracteres)
+VALIDATION_CHUNK_ROWS = 262_144
+
+# Motivo de cada fila: 0 es válida; los que empiezan en _DESCARTE se descartan
+VALIDO = 0
+DIGITO_VERIFICADOR_INVALIDO = 1
+_DESCARTE = 2
+CUIL_VACIO = 2
+ENCABEZADO_REPETIDO = 3
+CUIL_CORTO = 4
+CUIL_FORMATO_INVALIDO = 5
+
+REASONS = {
+    DIGITO_VERIFICADOR_INVALIDO: 'digito_verificador_invalido',
+    CUIL_VACIO: 'cuil_vacio',
+    ENCABEZADO_REPETIDO: 'encabezado_repetido',
+    CUIL_CORTO: 'cuil_corto',
+    CUIL_FORMATO_INVALIDO: 'cuil_formato_invalido',
+}
+
+# Motivo de los CUIL con más de un nombre (se informa, no se descarta)
+NOMBRES_DISTINTOS = 'nombres_distintos'
+
+# Filas del detalle que se incluyen en las métricas (el CSV las tiene todas)
+QUALITY_DETAIL_LIMIT = 100
+
+# Sufijo del reporte de calidad, junto a la salida de cada archivo
+QUALITY_REPORT_SUFFIX = "_calidad.csv"
+
+# Caracteres que se quitan del CUIL: guión, punto, barra y espacio
+_SEPARATORS = np.array([ord('-'), ord('.'), ord('/'), ord(' ')], dtype=np.uint32)
+_DOT = ord('.')
+_ZERO = ord('0')
+
+def _check_chunk(values):
+    """
+    Valida un bloque de CUIL (ndarray de texto ya sin espacios en los extremos).
+    Devuelve (normalizados, motivos), con normalizados un ndarray de objetos.
+    """
+    normalized = values.copy()
+    reasons = np.full(len(values), CUIL_FORMATO_INVALIDO, dtype=np.int8)
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    reasons[lengths == 0] = CUIL_VACIO
+    reasons[(lengths > 0) & (lengths <= 5)] = CUIL_CORTO
+    header = lengths == 4
+    if header.any():
+        header[header] = np.char.lower(values[header].astype(str)) == 'cuil'
+        reasons[header] = ENCABEZADO_REPETIDO
+    
+    candidates = np.flatnonzero((lengths >= CUIL_DIGITS) & (lengths <= MAX_CUIL_TEXT))
+    if not len(candidates):
+        return normalized, reasons
+    
+    # Matriz de códigos de carácter (una fila por CUIL, 0 de relleno hasta el más largo del bloque)
+    width = max(int(lengths[candidates].max()), CUIL_DIGITS + 2)
+    codes = values[candidates].astype(f'U{width}').view(np.uint32).reshape(len(candidates), width).copy()
+    digits = (codes >= _ZERO) & (codes <= _ZERO + 9)
+    plain = digits[:, :CUIL_DIGITS].all(axis=1)
+    
+    # "20123456789.0": número leído como decimal, se descarta la parte decimal
+    tail = codes[:, CUIL_DIGITS + 1:]
+    decimal = (plain & (codes[:, CUIL_DIGITS] == _DOT) & (codes[:, CUIL_DIGITS + 1] == _ZERO)
+               & ((tail == _ZERO) | (tail == 0)).all(axis=1))
+    codes[decimal, CUIL_DIGITS:] = 0
+    digits[decimal, CUIL_DIGITS:] = False
+    plain &= (codes[:, CUIL_DIGITS:] == 0).all(axis=1)
+    
+    separators = np.isin(codes, _SEPARATORS)
+    well_formed = plain | (((digits | separators | (codes == 0)).all(axis=1)
+                            & (digits.sum(axis=1) == CUIL_DIGITS)))
+    
+    # Los 11 dígitos de cada CUIL, en orden; solo los que tienen separadores
+    # se compactan (el caso común, 11 dígitos sin separadores, ya lo está)
+    cuil_codes = codes[:, :CUIL_DIGITS].copy()
+    separated = well_formed & ~plain
+    if separated.any():
+        order = np.argsort(~digits[separated], axis=1, kind='stable')[:, :CUIL_DIGITS]
+        cuil_codes[separated] = np.take_along_axis(codes[separated], order, axis=1)
+    changed = separated | decimal
+    if changed.any():
+        normalized[candidates[changed]] = cuil_codes[changed].view(f'U{CUIL_DIGITS}').ravel().astype(object)
+    rows = candidates[well_formed]
+    cuil_codes = cuil_codes[well_formed]
+    
+    # Dígito verificador: 11 - (suma ponderada módulo 11); 11 -> 0 y 10 no es válido
+    numbers = (cuil_codes - _ZERO).astype(np.int64)
+    check = 11 - (numbers[:, :10] @ CUIL_WEIGHTS) % 11
+    check[check == 11] = 0
+    reasons[rows] = np.where(check == numbers[:, 10], VALIDO, DIGITO_VERIFICADOR_INVALIDO)
+    return normalized, reasons
+
+def validate_cuils(cuils, metrics=None, first_row=FIRST_DATA_ROW):
+    """
+    Valida y normaliza una columna de CUIL (textos ya sin espacios en los
+    extremos; '' es una celda vacía). Devuelve (cuils normalizados como
+    ndarray de objetos, máscara de filas que se consolidan).
+    metrics: RunMetrics opcional; recibe las filas descartadas por motivo y,
+    en metrics.quality, el detalle de las filas descartadas u observadas
+    first_row: número de fila de la hoja del primer valor
+    """
+    values = np.empty(len(cuils), dtype=object)
+    values[:] = cuils
+    normalized = np.empty(len(values), dtype=object)
+    reasons = np.empty(len(values), dtype=np.int8)
+    for start in range(0, len(values), VALIDATION_CHUNK_ROWS):
+        stop = start + VALIDATION_CHUNK_ROWS
+        normalized[start:stop], reasons[start:stop] = _check_chunk(values[start:stop])
+    
+    if metrics is not None:
+        counts = np.bincount(reasons, minlength=len(REASONS) + 1)
+        for code, reason in REASONS.items():
+            if code >= _DESCARTE:
+                metrics.skip(reason, int(counts[code]))
+        metrics.quality.add_rows(first_row, values, reasons)
+    return normalized, reasons < _DESCARTE
+
+def quality_report_path(output_file):
+    """Ruta del reporte de calidad a partir de la salida .xlsx"""
+    return os.path.splitext(output_file)[0] + QUALITY_REPORT_SUFFIX
+
+def name_conflicts(cuils, nombres):
+    """
+    {cuil: [nombres]} de los CUIL que aparecen con más de un nombre no vacío
+    (en orden de aparición), a partir de las columnas ya filtradas.
+    """
+    import pandas as pd
+    
+    pairs = pd.DataFrame({'cuil': cuils, 'nombre': nombres})
+    pairs = pairs[pairs['nombre'] != ''].drop_duplicates()
+    repeated = pairs[pairs['cuil'].duplicated(keep=False)]
+    return repeated.groupby('cuil', sort=False)['nombre'].agg(list).to_dict()
+
+class DataQualityReport:
+    """
+    Reporte de calidad de una corrida: filas descartadas u observadas (fila
+    de la hoja, valor leído, motivo) y CUIL con más de un nombre.
+    """
+    
+    def __init__(self):
+        # Bloques (filas, valores, motivos) con las filas no válidas de cada validación
+        self._chunks = []
+        self._counts = {}
+        self.conflicts = {}
+    
+    def add_rows(self, first_row, values, reasons):
+        """Agrega las filas de un bloque validado con motivo distinto de VALIDO"""
+        flagged = np.flatnonzero(reasons)
+        if not len(flagged):
+            return
+        codes = reasons[flagged]
+        self._chunks.append((flagged + first_row, values[flagged], codes))
+        for code, count in enumerate(np.bincount(codes).tolist()):
+            if count:
+                reason = REASONS[code]
+                self._counts[reason] = self._counts.get(reason, 0) + count
+    
+    def add_conflicts(self, conflicts):
+        for cuil, nombres in conflicts.items():
+            known = self.conflicts.setdefault(cuil, [])
+            known.extend(nombre for nombre in nombres if nombre not in known)
+    
+    def counts(self):
+        """{motivo: filas}, más los CUIL con nombres distintos"""
+        counts = dict(self._counts)
+        if self.conflicts:
+            counts[NOMBRES_DISTINTOS] = len(self.conflicts)
+        return counts
+    
+    def entries(self):
+        """Filas del reporte: (fila, cuil, motivo, detalle)"""
+        for filas, valores, codes in self._chunks:
+            for fila, valor, code in zip(filas.tolist(), valores.tolist(), codes.tolist()):
+                yield fila, valor, REASONS[code], ''
+        for cuil, nombres in self.conflicts.items():
+            yield '', cuil, NOMBRES_DISTINTOS, ' | '.join(nombres)
+    
+    def log_summary(self):
+        """Resume en el registro las observaciones de la lectura"""
+        counts = self.counts()
+        if not counts:
+            log.info("[OK] Calidad de datos: todos los CUIL son válidos")
+            return
+        log.warning("Calidad de datos: " + ", ".join(f"{reason}: {count}" for reason, count in counts.items()))
+    
+    def as_dict(self, limit=QUALITY_DETAIL_LIMIT):
+        detalle = []
+        for fila, cuil, reason, detail in self.entries():
+            if len(detalle) >= limit:
+                break
+            detalle.append({'fila': fila, 'cuil': cuil, 'motivo': reason, 'detalle': detail})
+        return {'motivos': self.counts(), 'detalle': detalle}
+    
+    def write_csv(self, path):
+        """Escribe el reporte completo (una fila por observación) en CSV"""
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Fila', 'CUIL', 'Motivo', 'Detalle'])
+            writer.writerows(self.entries())
+        return path
@@ -0,0 +1,280 @@
+# =============================================================================
+# LECTURA CON PANDAS Y CONSOLIDACIÓN DE PACIENTES
+# =============================================================================
+
+import logging
+import unicodedata
+
+import pandas as pd
+
+from .metrics import log
+from .quality import validate_cuils, name_conflicts
+
+# Columnas de la fila de empresa: B, G, H, I, J, L, O, Q
+COMPANY_DATA_COLUMNS = [1, 6, 7, 8, 9, 11, 14, 16]
+
+def _infer_like_read_excel(column):
+    """
+    Infiere el tipo de una columna igual que pd.read_excel con encabezado
+    (números en texto a numérico, enteros con vacíos a float).
+    """
+    try:
+        return pd.to_numeric(column)
+    except (ValueError, TypeError):
+        return column.infer_objects()
+
+def load_excel_once(input_file):
+    """
+    Lee el archivo Excel una sola vez y devuelve las dos vistas que usa el proceso:
+    - df_with_header: equivale a pd.read_excel(input_file) para los datos de empresa
+    - df_no_header: equivale a pd.read_excel(input_file, header=None) para los pacientes
+    """
+    df_no_header = pd.read_excel(input_file, header=None)
+
+    # La vista con encabezado comparte los datos: solo se re-infieren los tipos
+    # de las columnas de empresa, igual que lo haría read_excel sin la fila 1
+    df_with_header = df_no_header.iloc[1:].reset_index(drop=True)
+    for col in COMPANY_DATA_COLUMNS:
+        if col < len(df_with_header.columns):
+            df_with_header[col] = _infer_like_read_excel(df_with_header[col])
+
+    return df_with_header, df_no_header
+
+def extract_company_data_fixed_positions(df):
+    """
+    Extrae datos de empresa usando posiciones fijas
+    """
+    try:
+        company_data = {
+            'Empresa': '',
+            'CUIT': '',
+            'Contrato': '',
+            'Domicilio': '',
+            'Localidad': '',
+            'Provincia': '',
+            'Telefono': '',
+            'Email': ''
+        }
+        
+        # Verificar que el DataFrame tenga datos
+        if len(df) == 0:
+            log.warning("DataFrame vacío")
+            return company_data
+            
+        # Extraer datos con verificación de límites
+        if len(df.columns) > 7 and len(df) > 0:
+            empresa_val = df.iloc[0, 7]
+            company_data['Empresa'] = str(empresa_val) if pd.notna(empresa_val) else ''
+            
+        if len(df.columns) > 1 and len(df) > 0:
+            cuit_val = df.iloc[0, 1]
+            company_data['CUIT'] = str(cuit_val) if pd.notna(cuit_val) else ''
+            
+        if len(df.columns) > 6 and len(df) > 0:
+            contrato_val = df.iloc[0, 6]
+            company_data['Contrato'] = str(contrato_val) if pd.notna(contrato_val) else ''
+            
+        if len(df.columns) > 9 and len(df) > 0:
+            domicilio_val = df.iloc[0, 9]
+            company_data['Domicilio'] = str(domicilio_val) if pd.notna(domicilio_val) else ''
+            
+        if len(df.columns) > 16 and len(df) > 0:
+            localidad_val = df.iloc[0, 16]
+            company_data['Localidad'] = str(localidad_val) if pd.notna(localidad_val) else ''
+            
+        if len(df.columns) > 11 and len(df) > 0:
+            provincia_val = df.iloc[0, 11]
+            company_data['Provincia'] = str(provincia_val) if pd.notna(provincia_val) else ''
+            
+        if len(df.columns) > 14 and len(df) > 0:
+            telefono_val = df.iloc[0, 14]
+            company_data['Telefono'] = str(telefono_val) if pd.notna(telefono_val) else ''
+            
+        if len(df.columns) > 8 and len(df) > 0:
+            email_val = df.iloc[0, 8]
+            company_data['Email'] = str(email_val) if pd.notna(email_val) else ''
+        
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Datos de empresa extraídos (posiciones fijas):")
+            for key, value in company_data.items():
+                log.debug(f"   {key}: {value}")
+        
+        return company_data
+        
+    except Exception as e:
+        log.error(f"Error extrayendo datos de empresa: {e}")
+        return {
+            'Empresa': '',
+            'CUIT': '',
+            'Contrato': '',
+            'Domicilio': '',
+            'Localidad': '',
+            'Provincia': '',
+            'Telefono': '',
+            'Email': ''
+        }
+
+def _text_column(column):
+    """
+    Convierte una columna a texto sin espacios; los valores vacíos quedan como ''
+    (mismo resultado que str(valor).strip() celda por celda)
+    """
+    mask = column.notna()
+    text = pd.Series('', index=column.index, dtype=object)
+    if mask.any():
+        text[mask] = column[mask].astype(object).astype(str).str.strip()
+    return text
+
+def consolidate_patient_columns(cuils, nombres, descripciones, metrics=None):
+    """
+    Motor columnar de consolidación: recibe las columnas CUIL, nombre y
+    descripción ya convertidas a texto y devuelve patient_info en el orden
+    de primera aparición de cada CUIL (normalizado), con sus estudios únicos
+    en orden.
+    """
+    frame = pd.DataFrame({
+        'cuil': pd.Series(cuils, dtype=object),
+        'nombre': pd.Series(nombres, dtype=object),
+        'descripcion': pd.Series(descripciones, dtype=object)
+    })
+    
+    # Validar y normalizar los CUIL (vacíos, encabezados repetidos y valores
+    # que no son un CUIL se descartan; ver quality.py)
+    normalized, valid = validate_cuils(frame['cuil'], metrics)
+    frame['cuil'] = normalized
+    frame = frame[valid]
+    
+    if metrics is not None:
+        metrics.count('filas_leidas', len(valid))
+        metrics.quality.add_conflicts(name_conflicts(frame['cuil'], frame['nombre']))
+    
+    # Primer nombre de cada CUIL (drop_duplicates conserva el orden de aparición)
+    first_rows = frame.drop_duplicates('cuil')
+    
+    # Estudios únicos por CUIL en orden de aparición
+    with_study = frame[frame['descripcion'] != '']
+    studies = (with_study.drop_duplicates(['cuil', 'descripcion'])
+               .groupby('cuil', sort=False)['descripcion']
+               .agg(list)
+               .to_dict())
+    
+    patient_info = {}
+    for cuil_value, nombre in zip(first_rows['cuil'], first_rows['nombre']):
+        patient_info[cuil_value] = {
+            "nombre": nombre,
+            "estudios": studies.get(cuil_value, [])
+        }
+    return patient_info
+
+def process_all_patients(df, metrics=None, recorder=None):
+    """
+    Procesa todos los pacientes en el Excel y asigna números únicos
+    MISMA LÓGICA que fix_de_id.py - MÉTODO PRINCIPAL DE EXTRACCIÓN
+    recorder: ColumnRecorder opcional que recibe las columnas leídas (caché)
+    """
+    try:
+        # COLUMNAS:
+        # CUIL: C (índice 2)
+        # Apellido y Nombre: P (índice 15)
+        # Descripción: E (índice 4)
+        
+        cuil_col = 2  # Columna C
+        apellido_nombre_col = 15  # Columna P
+        descripcion_col = 4  # Columna E
+        
+        # Diccionario para almacenar información
+        patient_info = {}
+        
+        log.info(f"Procesando {len(df)} filas...")
+        
+        # Verificamos que los índices estén dentro de los límites
+        if (cuil_col < len(df.columns) and 
+            apellido_nombre_col < len(df.columns) and 
+            descripcion_col < len(df.columns)):
+            
+            # Todas las filas excepto la primera (encabezado), por columnas
+            data = df.iloc[1:]
+            columns = (
+                _text_column(data.iloc[:, cuil_col]),
+                _text_column(data.iloc[:, apellido_nombre_col]),
+                _text_column(data.iloc[:, descripcion_col])
+            )
+            if recorder is not None:
+                recorder.extend(*columns)
+            patient_info = consolidate_patient_columns(*columns, metrics)
+        
+        if recorder is not None:
+            recorder.total_rows = max(len(df) - 1, 0)
+        
+        patient_numbers = assign_patient_numbers(patient_info, len(df) - 1)
+        
+        return patient_info, patient_numbers
+        
+    except Exception as e:
+        log.error(f"Error procesando pacientes: {e}")
+        return {}, {}
+
+def _collation_table():
+    """
+    Tabla de str.translate para la clave de orden: letras latinas acentuadas
+    (ya en mayúsculas) -> letra base, Ñ -> N seguida del último carácter del
+    plano básico (ordena después de cualquier N...) y marcas combinantes sueltas
+    eliminadas.
+    """
+    table = {}
+    for code in range(0xC0, 0x250):
+        char = chr(code)
+        base = ''.join(c for c in unicodedata.normalize('NFD', char) if not unicodedata.combining(c))
+        if base and base != char:
+            table[code] = base
+    table[ord('Ñ')] = 'N\uffff'
+    table.update(dict.fromkeys(range(0x300, 0x370)))
+    return table
+
+_COLLATION_TABLE = _collation_table()
+
+def collation_key(nombre):
+    """
+    Clave de orden alfabético en español: sin distinguir mayúsculas ni acentos
+    (Á = A, Ü = U) y con la Ñ entre la N y la O.
+    """
+    if nombre.isascii():
+        return nombre.upper()
+    return unicodedata.normalize('NFC', nombre).upper().translate(_COLLATION_TABLE)
+
+def log_numbering_summary(total_rows, patients):
+    """Informa las filas leídas y los pacientes numerados en orden alfabético"""
+    log.info("Información de procesamiento:")
+    log.info(f"   - Total de filas procesadas: {total_rows}")
+    log.info(f"   - Pacientes únicos encontrados: {patients}")
+    log.info("   - Ordenados alfabéticamente por nombre")
+
+def assign_patient_numbers(patient_info, total_rows):
+    """
+    Ordena los pacientes alfabéticamente por nombre y les asigna números desde 1.
+    El dict devuelto está en ese orden: es el orden de salida que usan todos
+    los escritores, sin volver a ordenar.
+    """
+    patient_numbers = {}
+    
+    # Ordenar pacientes alfabéticamente por nombre antes de asignar números
+    # (una clave de orden por paciente, calculada una sola vez)
+    cuil_nombre_pairs = [(cuil, info["nombre"]) for cuil, info in patient_info.items()]
+    cuil_nombre_pairs.sort(key=lambda x: collation_key(x[1]))
+    
+    # Asignar números a los CUILs ordenados alfabéticamente, empezando desde 1
+    for i, (cuil, nombre) in enumerate(cuil_nombre_pairs):
+        patient_numbers[cuil] = i + 1
+    
+    log_numbering_summary(total_rows, len(patient_numbers))
+    
+    # Mostrar algunos ejemplos para verificación
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Primeros 5 pacientes (ordenados A-Z):")
+        for i, (cuil, nombre) in enumerate(cuil_nombre_pairs[:5]):
+            num = patient_numbers[cuil]
+            info = patient_info[cuil]
+            estudios = ", ".join(info["estudios"]) if info["estudios"] else "Sin estudios"
+            log.debug(f"   {num}. {nombre} (CUIL: {cuil}) - Estudios: {estudios}")
+    
+    return patient_numbers
@@ -0,0 +1,223 @@
+# =============================================================================
+# REGISTRO HISTÓRICO DE PACIENTES Y EXÁMENES (SQLITE)
+# =============================================================================
+#
+# Base SQLite local que cada corrida completa con los pacientes y estudios de
+# los archivos que lee, para responder consultas históricas sin volver a leer
+# los .xlsx: qué exámenes tuvo un CUIL en todas las empresas, o qué pacientes
+# de una empresa no tienen un examen.
+#
+# Tablas:
+# - archivos: un registro por archivo de entrada (nombre, hash, empresa, CUIT
+#   y fecha del archivo); al volver a registrar un archivo con el mismo nombre
+#   y otro contenido se reemplazan sus datos
+# - pacientes: nombre más reciente de cada CUIL
+# - apariciones: pacientes de cada archivo (incluye los que no tienen estudios)
+# - estudios: estudios de cada paciente en cada archivo
+# Índices por CUIL, por examen (sin distinguir mayúsculas) y por CUIT de la
+# empresa. Cada archivo se carga en una sola transacción con inserciones por
+# lote; varios procesos pueden escribir a la vez (modo WAL y espera por bloqueo).
+
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+from .metrics import log
+
+# Versión del esquema guardada en PRAGMA user_version
+REGISTRY_SCHEMA_VERSION = 1
+
+# Segundos de espera si otro proceso tiene la base bloqueada
+REGISTRY_TIMEOUT = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    id INTEGER PRIMARY KEY,
+    archivo TEXT NOT NULL UNIQUE,
+    sha256 TEXT,
+    empresa TEXT,
+    cuit TEXT,
+    fecha TEXT NOT NULL,
+    registrado TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pacientes (
+    cuil TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS apariciones (
+    archivo_id INTEGER NOT NULL,
+    cuil TEXT NOT NULL,
+    PRIMARY KEY (archivo_id, cuil)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS estudios (
+    archivo_id INTEGER NOT NULL,
+    cuil TEXT NOT NULL,
+    examen TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (archivo_id, cuil, examen)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_archivos_cuit ON archivos (cuit);
+CREATE INDEX IF NOT EXISTS idx_apariciones_cuil ON apariciones (cuil);
+CREATE INDEX IF NOT EXISTS idx_estudios_cuil ON estudios (cuil, examen);
+CREATE INDEX IF NOT EXISTS idx_estudios_examen ON estudios (examen, cuil);
+"""
+
+# Un estudio de un paciente: en qué archivo, empresa y fecha aparece
+ExamRecord = namedtuple('ExamRecord', ['examen', 'empresa', 'cuit', 'archivo', 'fecha'])
+
+# Un paciente: CUIL y nombre más reciente
+PatientRecord = namedtuple('PatientRecord', ['cuil', 'nombre'])
+
+def _file_date(input_file):
+    """Fecha de modificación del archivo (la de la exportación), en formato ISO"""
+    try:
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(os.path.getmtime(input_file)))
+    except OSError:
+        return time.strftime('%Y-%m-%dT%H:%M:%S')
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+class PatientRegistry:
+    """
+    Registro SQLite de pacientes y estudios por archivo de entrada.
+    Se usa como context manager o cerrando la conexión con close().
+    """
+    
+    def __init__(self, path, timeout=REGISTRY_TIMEOUT):
+        self.path = path
+        # Transacciones explícitas (BEGIN IMMEDIATE): una por archivo registrado
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, REGISTRY_SCHEMA_VERSION):
+            self._connection.close()
+            raise sqlite3.DatabaseError(f"Registro con esquema de otra versión ({version}): {path}")
+        if version == 0:
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {REGISTRY_SCHEMA_VERSION}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        self._connection.close()
+    
+    def recorded_files(self):
+        """{archivo: sha256} de los archivos registrados"""
+        return dict(self._connection.execute("SELECT archivo, sha256 FROM archivos"))
+    
+    def record_file(self, input_file, company_data, patient_info, content_hash=None):
+        """
+        Registra los pacientes y estudios de un archivo de entrada (por su
+        nombre, sin la carpeta). Si ya estaba registrado con el mismo hash no
+        se hace nada; con otro contenido, se reemplazan sus datos.
+        Devuelve True si se registró, False si no hacía falta o si falló
+        (un error del registro no impide generar la salida).
+        """
+        archivo = os.path.basename(input_file)
+        connection = self._connection
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute("SELECT id, sha256 FROM archivos WHERE archivo = ?", (archivo,)).fetchone()
+                if row is not None and content_hash and row[1] == content_hash:
+                    connection.execute("ROLLBACK")
+                    log.debug(f"Registro: {archivo} ya está registrado con el mismo contenido")
+                    return False
+                if row is not None:
+                    connection.execute("DELETE FROM estudios WHERE archivo_id = ?", (row[0],))
+                    connection.execute("DELETE FROM apariciones WHERE archivo_id = ?", (row[0],))
+                    connection.execute("DELETE FROM archivos WHERE id = ?", (row[0],))
+                
+                archivo_id = connection.execute(
+                    "INSERT INTO archivos (archivo, sha256, empresa, cuit, fecha, registrado) VALUES (?, ?, ?, ?, ?, ?)",
+                    (archivo, content_hash, _text(company_data.get('Empresa')), _text(company_data.get('CUIT')),
+                     _file_date(input_file), time.strftime('%Y-%m-%dT%H:%M:%S'))
+                ).lastrowid
+                
+                # Nombre más reciente por CUIL (un nombre vacío no pisa uno conocido)
+                connection.executemany(
+                    "INSERT INTO pacientes (cuil, nombre) VALUES (?, ?) "
+                    "ON CONFLICT (cuil) DO UPDATE SET nombre = excluded.nombre WHERE excluded.nombre != ''",
+                    ((cuil, _text(info["nombre"])) for cuil, info in patient_info.items()))
+                connection.executemany(
+                    "INSERT INTO apariciones (archivo_id, cuil) VALUES (?, ?)",
+                    ((archivo_id, cuil) for cuil in patient_info))
+                connection.executemany(
+                    "INSERT OR IGNORE INTO estudios (archivo_id, cuil, examen) VALUES (?, ?, ?)",
+                    ((archivo_id, cuil, examen)
+                     for cuil, info in patient_info.items()
+                     for examen in map(_text, info["estudios"]) if examen))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            log.warning(f"No se pudo registrar {archivo} en el registro de exámenes: {e}")
+            return False
+        log.debug(f"Registro: {archivo} registrado con {len(patient_info)} pacientes")
+        return True
+    
+    def _scope(self, cuit=None, since=None):
+        """Condición y parámetros para filtrar archivos por CUIT de empresa y fecha mínima"""
+        conditions, params = [], []
+        if cuit:
+            conditions.append("a.cuit = ?")
+            params.append(_text(cuit))
+        if since:
+            conditions.append("a.fecha >= ?")
+            params.append(_text(since))
+        return (" AND ".join(conditions) or "1"), params
+    
+    def exams_for_cuil(self, cuil, cuit=None, since=None):
+        """
+        Estudios de un CUIL en todos los archivos registrados (opcionalmente,
+        solo de una empresa y desde una fecha 'AAAA-MM-DD'), por fecha.
+        Devuelve una lista de ExamRecord.
+        """
+        condition, params = self._scope(cuit, since)
+        rows = self._connection.execute(
+            "SELECT e.examen, a.empresa, a.cuit, a.archivo, a.fecha "
+            "FROM estudios e JOIN archivos a ON a.id = e.archivo_id "
+            f"WHERE e.cuil = ? AND {condition} "
+            "ORDER BY a.fecha, e.examen", [_text(cuil)] + params)
+        return [ExamRecord(*row) for row in rows]
+    
+    def patients_with_exam(self, examen, cuit=None, since=None):
+        """Pacientes que tienen el examen (sin distinguir mayúsculas), por nombre"""
+        condition, params = self._scope(cuit, since)
+        rows = self._connection.execute(
+            "SELECT p.cuil, p.nombre FROM pacientes p WHERE p.cuil IN ("
+            "SELECT e.cuil FROM estudios e JOIN archivos a ON a.id = e.archivo_id "
+            f"WHERE e.examen = ? AND {condition}) "
+            "ORDER BY p.nombre, p.cuil", [_text(examen)] + params)
+        return [PatientRecord(*row) for row in rows]
+    
+    def patients_missing_exam(self, examen, cuit=None, since=None):
+        """
+        Pacientes que aparecen en los archivos registrados (de la empresa y
+        desde la fecha indicadas) y no tienen el examen en ninguno de esos
+        archivos, por nombre.
+        """
+        condition, params = self._scope(cuit, since)
+        rows = self._connection.execute(
+            "SELECT p.cuil, p.nombre FROM pacientes p WHERE p.cuil IN ("
+            "SELECT ap.cuil FROM apariciones ap JOIN archivos a ON a.id = ap.archivo_id "
+            f"WHERE {condition}) AND p.cuil NOT IN ("
+            "SELECT e.cuil FROM estudios e JOIN archivos a ON a.id = e.archivo_id "
+            f"WHERE e.examen = ? AND {condition}) "
+            "ORDER BY p.nombre, p.cuil", params + [_text(examen)] + params)
+        return [PatientRecord(*row) for row in rows]
+
+def open_registry(path):
+    """PatientRegistry en path, o None (con un aviso) si la base no se puede abrir"""
+    try:
+        return PatientRegistry(path)
+    except sqlite3.Error as e:
+        log.warning(f"No se pudo abrir el registro de exámenes {path}: {e}")
+        return None
@@ -0,0 +1,178 @@
+# =============================================================================
+# MODO SERVIDOR HTTP
+# =============================================================================
+#
+# Servidor local que recibe un libro por POST y responde con la salida .xlsx,
+# sin archivos intermedios (ver buffers.py):
+#
+#   curl --data-binary @entrada.xlsx -o salida.xlsx \
+#        "http://127.0.0.1:8765/procesar?nombre=entrada.xlsx"
+#
+# Las conexiones se atienden en hilos y el procesamiento en un pool de `jobs`
+# procesos. Como mucho hay `jobs` libros en proceso y otros tantos en espera;
+# con el pool lleno el servidor responde 503 en lugar de encolar sin límite.
+
+import io
+import json
+import logging
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .batch import capture_log, output_file_name, write_captured_output
+from .buffers import process_excel_bytes
+from .metrics import log, RunMetrics
+from .watch import _ignore_termination_signals
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Tamaño máximo de un libro recibido
+DEFAULT_MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def process_upload_job(data, nombre, log_level=logging.INFO, exam_catalog=None):
+    """
+    Procesa un libro recibido capturando su salida (corre en el pool).
+    Devuelve (bytes de la salida o None, salida capturada, métricas).
+    """
+    buffer = io.StringIO()
+    metrics = RunMetrics()
+    with capture_log(buffer, log_level):
+        log.info(f"Procesando archivo recibido: {nombre}")
+        output = process_excel_bytes(data, metrics=metrics, exam_catalog=exam_catalog)
+    return output, buffer.getvalue(), metrics.as_dict()
+
+class ExamServer(ThreadingHTTPServer):
+    """Servidor HTTP con un pool acotado de procesos para el conversor"""
+    
+    # Al cerrar se espera a los pedidos en curso (HTTP/1.0: una conexión por pedido)
+    daemon_threads = False
+    
+    def __init__(self, address, jobs, max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES,
+                 log_level=logging.INFO, exam_catalog=None):
+        super().__init__(address, _ExamRequestHandler)
+        self.jobs = max(1, jobs)
+        self.max_upload_bytes = max_upload_bytes
+        self.log_level = log_level
+        self.exam_catalog = exam_catalog
+        self.slots = threading.BoundedSemaphore(2 * self.jobs)
+        self._executor_lock = threading.Lock()
+        self.executor = self._new_executor()
+    
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.jobs, initializer=_ignore_termination_signals)
+    
+    def process(self, data, nombre):
+        """Procesa un libro en el pool; si el pool se rompe, se reemplaza y se informa el error"""
+        executor = self.executor
+        try:
+            return executor.submit(process_upload_job, data, nombre, self.log_level,
+                                   self.exam_catalog).result()
+        except BrokenProcessPool as e:
+            with self._executor_lock:
+                if self.executor is executor:
+                    self.executor = self._new_executor()
+            return None, f"[ERROR] El proceso terminó inesperadamente: {e}\n", {'ok': False}
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+class _ExamRequestHandler(BaseHTTPRequestHandler):
+    """POST /procesar: libro en el cuerpo, salida .xlsx en la respuesta; GET /salud"""
+    
+    server_version = "GestorExamenes"
+    
+    def log_message(self, format, *args):
+        log.debug(f"{self.address_string()} - {format % args}")
+    
+    def _send(self, status, body, content_type="application/json; charset=utf-8", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_json(self, status, data, headers=()):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), headers=headers)
+    
+    def do_GET(self):
+        if urlsplit(self.path).path != '/salud':
+            self._send_json(404, {'error': "Ruta desconocida"})
+            return
+        self._send_json(200, {'estado': 'ok', 'procesos': self.server.jobs})
+    
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/procesar':
+            self._send_json(404, {'error': "Ruta desconocida"})
+            return
+        nombre = os.path.basename(parse_qs(url.query).get('nombre', ['entrada.xlsx'])[0]) or 'entrada.xlsx'
+        
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self._send_json(411, {'error': "Falta Content-Length"})
+            return
+        if length <= 0:
+            self._send_json(400, {'error': "El cuerpo está vacío"})
+            return
+        if length > self.server.max_upload_bytes:
+            self.close_connection = True
+            self._send_json(413, {'error': f"El archivo supera {self.server.max_upload_bytes} bytes"})
+            return
+        
+        # Pool lleno: se rechaza sin leer el cuerpo
+        if not self.server.slots.acquire(blocking=False):
+            self.close_connection = True
+            self._send_json(503, {'error': "Servidor ocupado, reintente más tarde"}, headers=[('Retry-After', '5')])
+            return
+        try:
+            data = self.rfile.read(length)
+            if len(data) != length:
+                self.close_connection = True
+                self._send_json(400, {'error': "Cuerpo incompleto"})
+                return
+            output, salida, _ = self.server.process(data, nombre)
+        finally:
+            self.server.slots.release()
+        
+        write_captured_output(salida)
+        if output is None:
+            self._send_json(422, {'error': "No se pudo procesar el archivo", 'detalle': salida})
+            return
+        self._send(200, output, XLSX_CONTENT_TYPE,
+                   headers=[('Content-Disposition', f'attachment; filename="{output_file_name(nombre)}"')])
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=1, max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES,
+          log_level=logging.INFO, exam_catalog=None):
+    """
+    Atiende pedidos hasta recibir SIGTERM/SIGINT; los libros en proceso se
+    terminan antes de cerrar.
+    """
+    server = ExamServer((host, port), jobs, max_upload_bytes, log_level, exam_catalog)
+    
+    def request_stop(signum, frame):
+        log.warning(f"Señal {signum} recibida: se termina al completar los pedidos en curso")
+        # shutdown() espera al bucle de serve_forever: se llama desde otro hilo
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, request_stop)
+    
+    log.info(f"Servidor escuchando en http://{host}:{server.server_address[1]}")
+    log.info(f"Procesos en paralelo: {server.jobs} | tamaño máximo: {max_upload_bytes // (1024 * 1024)} MiB")
+    log.info("POST /procesar?nombre=archivo.xlsx con el libro en el cuerpo | GET /salud")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
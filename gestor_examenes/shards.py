@@ -0,0 +1,260 @@
+# =============================================================================
+# SALIDA DIVIDIDA EN PARTES (matrices muy grandes)
+# =============================================================================
+#
+# Con muchos pacientes una sola hoja es lenta de generar y de abrir, y al
+# unir varias exportaciones puede pasar el máximo de filas de una hoja. La
+# matriz se divide en partes, en el orden de salida:
+# - por filas: una cantidad fija de pacientes por parte
+# - por letra: pacientes agrupados por la inicial de su nombre (la de
+#   collation_key: Á con la A, Ñ con la N); con un máximo de pacientes, las
+#   iniciales seguidas se juntan mientras entren ("A-C") y una inicial más
+#   grande se parte en varias ("M 1", "M 2")
+# Cada parte repite el bloque de empresa y los encabezados de examen (las
+# mismas columnas y anchos en todas), conserva los Id de la matriz completa y
+# lleva el recuento por examen de sus pacientes. Las partes van en hojas de
+# la salida o en archivos aparte (<salida>_parte_01.xlsx, ...), que se
+# escriben en paralelo. La hoja "Resumen" de la salida tiene el índice de
+# partes y el recuento global por examen.
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from .metrics import log, RunMetrics
+from .pipeline import is_path
+
+# openpyxl, writers.py y reader.py (pandas) se importan recién al usarlos:
+# la línea de comandos importa ShardLayout al arrancar
+
+SHARD_BY = ('filas', 'letra')
+SHARD_TARGETS = ('hojas', 'archivos')
+
+# Pacientes por parte como máximo: una hoja de Excel admite 1.048.576 filas,
+# menos el bloque de empresa, los encabezados y el recuento por examen
+MAX_SHARD_ROWS = 1_000_000
+
+SUMMARY_SHEET = "Resumen"
+SUMMARY_HEADERS = ['Parte', 'Hoja', 'Desde', 'Hasta', 'Id desde', 'Id hasta', 'Pacientes']
+SUMMARY_COLUMN_WIDTHS = [10, 38, 38, 38, 10, 10, 11]
+
+# Inicial de los nombres que no empiezan con una letra
+OTHER_INITIAL = '#'
+
+# Caracteres que Excel no admite en el nombre de una hoja, y su largo máximo
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+MAX_SHEET_TITLE = 31
+
+class ShardLayout:
+    """
+    Cómo dividir la matriz de salida en partes.
+    rows_per_shard: pacientes por parte (obligatorio por filas; por letra,
+    el máximo de una parte, o None para una parte por inicial)
+    by: 'filas' o 'letra'
+    target: 'hojas' (una hoja por parte en la salida) o 'archivos'
+    jobs: procesos que escriben archivos a la vez (las hojas de un mismo
+    libro se escriben de a una)
+    """
+    
+    def __init__(self, rows_per_shard=None, by='filas', target='hojas', jobs=1):
+        if by not in SHARD_BY:
+            raise ValueError(f"División desconocida: {by}")
+        if target not in SHARD_TARGETS:
+            raise ValueError(f"Destino de las partes desconocido: {target}")
+        if rows_per_shard is None and by == 'filas':
+            raise ValueError("La división por filas necesita la cantidad de pacientes por parte")
+        if rows_per_shard is not None and not 1 <= rows_per_shard <= MAX_SHARD_ROWS:
+            raise ValueError(f"Los pacientes por parte deben estar entre 1 y {MAX_SHARD_ROWS}")
+        self.rows_per_shard = rows_per_shard
+        self.by = by
+        self.target = target
+        self.jobs = max(1, jobs)
+    
+    def fingerprint(self):
+        """Huella de la división (cambia si cambia la salida que genera)"""
+        return f"{self.by}:{self.rows_per_shard or ''}:{self.target}"
+    
+    def plan(self, store):
+        """Partes de store en el orden de salida: [(etiqueta, inicio, fin)]"""
+        if self.by == 'filas':
+            count = len(store)
+            digits = len(str(max(1, -(-count // self.rows_per_shard))))
+            return [(f"Parte {index:0{digits}d}", start, min(start + self.rows_per_shard, count))
+                    for index, start in enumerate(range(0, count, self.rows_per_shard), start=1)]
+        return _letter_shards(_initial_runs(store), self.rows_per_shard)
+
+def _initial(nombre, collation_key):
+    initial = collation_key(nombre or '')[:1]
+    return initial if initial.isalpha() else OTHER_INITIAL
+
+def _initial_runs(store):
+    """[(inicial, inicio, fin)] de los pacientes seguidos con la misma inicial"""
+    from .reader import collation_key
+    
+    runs = []
+    for position, record in enumerate(store.records):
+        initial = _initial(record.nombre, collation_key)
+        if runs and runs[-1][0] == initial:
+            runs[-1][2] = position + 1
+        else:
+            runs.append([initial, position, position + 1])
+    return runs
+
+def _letter_shards(runs, limit):
+    """Agrupa las iniciales seguidas mientras entren en limit pacientes"""
+    shards = []
+    group = []
+    
+    def close_group():
+        if group:
+            label = group[0][0] if len(group) == 1 else f"{group[0][0]}-{group[-1][0]}"
+            shards.append((label, group[0][1], group[-1][2]))
+            group.clear()
+    
+    for initial, start, stop in runs:
+        if limit is None:
+            shards.append((initial, start, stop))
+        elif stop - start > limit:
+            close_group()
+            parts = -(-(stop - start) // limit)
+            for index in range(parts):
+                shards.append((f"{initial} {index + 1}", start + index * limit, min(stop, start + (index + 1) * limit)))
+        else:
+            if group and stop - group[0][1] > limit:
+                close_group()
+            group.append((initial, start, stop))
+    close_group()
+    return shards
+
+def _sheet_title(label, used):
+    """Nombre de hoja válido y distinto de los de `used` (que se actualiza)"""
+    base = _INVALID_SHEET_CHARS.sub('_', label)[:MAX_SHEET_TITLE] or "Parte"
+    title = base
+    copy = 2
+    while title.casefold() in used:
+        suffix = f" ({copy})"
+        title = base[:MAX_SHEET_TITLE - len(suffix)] + suffix
+        copy += 1
+    used.add(title.casefold())
+    return title
+
+def shard_path(output_file, index, digits=2):
+    """Ruta del archivo de la parte index (desde 1), junto a la salida"""
+    return f"{os.path.splitext(output_file)[0]}_parte_{index:0{digits}d}.xlsx"
+
+def _remove_stale_shards(output_file, keep):
+    """Borra los archivos de partes de una corrida anterior que ya no corresponden"""
+    directory, name = os.path.split(os.path.abspath(output_file))
+    pattern = re.compile(re.escape(os.path.splitext(name)[0]) + r"_parte_\d+\.xlsx$")
+    keep = {os.path.abspath(path) for path in keep}
+    for archivo in os.listdir(directory):
+        path = os.path.join(directory, archivo)
+        if pattern.match(archivo) and path not in keep:
+            os.remove(path)
+            log.info(f"Parte de una corrida anterior eliminada: {archivo}")
+
+def _shard_exam_count(part, exam_count):
+    """Recuento por examen de una parte, en el orden del recuento global (sin los ceros)"""
+    counts = part.exam_count()
+    return {exam: counts[exam] for exam in exam_count if counts.get(exam)}
+
+def _write_shard_sheet(wb, title, company_data, part, exams_list, exam_count, column_widths):
+    from .writers import write_matrix_sheet
+    
+    ws = wb.create_sheet(title)
+    return write_matrix_sheet(ws, company_data, part, exams_list, _shard_exam_count(part, exam_count), column_widths)
+
+def write_shard_file(output_file, title, company_data, part, exams_list, exam_count, column_widths):
+    """
+    Escribe una parte como libro propio (en un proceso del pool).
+    Devuelve la última fila de empleados.
+    """
+    from openpyxl import Workbook
+    from .writers import _register_output_styles
+    
+    wb = Workbook(write_only=True)
+    _register_output_styles(wb)
+    last_employee_row = _write_shard_sheet(wb, title, company_data, part, exams_list, exam_count, column_widths)
+    wb.save(output_file)
+    return last_employee_row
+
+def _write_summary_sheet(wb, company_data, index, exam_count, target):
+    """Hoja "Resumen": empresa, índice de partes y recuento global por examen"""
+    from openpyxl.utils import get_column_letter
+    from .writers import _styled_cell, write_company_block
+    
+    ws = wb.create_sheet(SUMMARY_SHEET)
+    for idx, width in enumerate(SUMMARY_COLUMN_WIDTHS, start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+    write_company_block(ws, company_data)
+    ws.append([])
+    headers = list(SUMMARY_HEADERS)
+    if target == 'archivos':
+        headers[1] = 'Archivo'
+    ws.append([_styled_cell(ws, header, 'encabezado') for header in headers])
+    for row in index:
+        ws.append([_styled_cell(ws, value, 'celda') for value in row])
+    ws.append([])
+    for exam, count in exam_count.items():
+        ws.append([count, exam])
+
+def write_sharded_output(output_file, company_data, store, exams_list, exam_count, layout, column_widths, provenance=None, metrics=None):
+    """
+    Escribe la matriz dividida según layout (ShardLayout): la salida tiene la
+    hoja "Resumen" y, con destino 'hojas', una hoja por parte; con
+    'archivos', cada parte es un libro junto a la salida.
+    provenance: filas opcionales de la hoja "Origen" (en la salida)
+    Devuelve (True, última_fila_de_empleados de la última parte) o (False, None).
+    """
+    from openpyxl import Workbook
+    from .writers import PROVENANCE_SHEET, _register_output_styles, write_provenance_sheet
+    
+    metrics = metrics if metrics is not None else RunMetrics()
+    try:
+        if layout.target == 'archivos' and not is_path(output_file):
+            raise ValueError("Las partes en archivos aparte necesitan una ruta de salida")
+        shards = layout.plan(store)
+        metrics.count('partes', len(shards))
+        log.info(f"Matriz dividida en {len(shards)} partes ({layout.by}, en {layout.target})")
+        
+        # Hoja o archivo de cada parte, para el índice del resumen (la primera hoja)
+        if layout.target == 'hojas':
+            used = {SUMMARY_SHEET.casefold(), PROVENANCE_SHEET.casefold()}
+            locations = [_sheet_title(label, used) for label, _, _ in shards]
+        else:
+            digits = max(2, len(str(len(shards))))
+            locations = [shard_path(output_file, number, digits) for number in range(1, len(shards) + 1)]
+        index = [[label, os.path.basename(location), store.records[start].nombre, store.records[stop - 1].nombre,
+                  store.id_offset + start + 1, store.id_offset + stop, stop - start]
+                 for location, (label, start, stop) in zip(locations, shards)]
+        
+        wb = Workbook(write_only=True)
+        _register_output_styles(wb)
+        _write_summary_sheet(wb, company_data, index, exam_count, layout.target)
+        
+        last_employee_row = None
+        if layout.target == 'hojas':
+            # Un libro de openpyxl se escribe desde un solo proceso: las hojas van de a una
+            for title, (_, start, stop) in zip(locations, shards):
+                last_employee_row = _write_shard_sheet(wb, title, company_data, store.slice(start, stop),
+                                                       exams_list, exam_count, column_widths)
+        else:
+            _remove_stale_shards(output_file, locations)
+            jobs = [(path, _sheet_title(label, set()), company_data, store.slice(start, stop), exams_list,
+                     exam_count, column_widths) for path, (label, start, stop) in zip(locations, shards)]
+            if layout.jobs <= 1 or len(jobs) <= 1:
+                rows = [write_shard_file(*job) for job in jobs]
+            else:
+                with ProcessPoolExecutor(max_workers=min(layout.jobs, len(jobs))) as executor:
+                    rows = list(executor.map(write_shard_file, *zip(*jobs)))
+            if rows:
+                last_employee_row = rows[-1]
+        
+        if provenance is not None:
+            write_provenance_sheet(wb, provenance)
+        wb.save(output_file)
+        return True, last_employee_row
+    
+    except Exception as e:
+        log.error(f"Error creando la salida dividida en partes: {e}")
+        return False, None
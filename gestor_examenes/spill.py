@@ -0,0 +1,239 @@
+# =============================================================================
+# CONSOLIDACIÓN CON MEMORIA ACOTADA (particiones en disco)
+# =============================================================================
+#
+# Para archivos cuya consolidación no entra en la memoria disponible:
+# 1. la hoja se lee en streaming y cada fila válida se reparte, según un hash
+#    de su CUIL, en una de N particiones que se guardan en disco de a bloques
+#    (todas las filas de un CUIL quedan en la misma partición)
+# 2. cada partición se consolida por separado (en paralelo con partition_jobs)
+#    con las mismas reglas que consolidate_patient_rows, y sus pacientes se
+#    guardan en disco ordenados por nombre
+# 3. las particiones ordenadas se intercalan en el orden alfabético de
+#    assign_patient_numbers y llenan el PatientStore de los escritores
+# La salida es la misma que la del proceso en memoria: ante nombres iguales
+# decide la primera fila de cada paciente, y los ids de examen siguen la
+# primera aparición de cada descripción. Lo que queda en memoria es el
+# almacén compacto (ver store.py); N se elige para que la consolidación de
+# las particiones en curso entre en memory_cap.
+
+import heapq
+import math
+import os
+import pickle
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress, count, islice
+
+from .metrics import log, RunMetrics
+from .pipeline import OPENPYXL_AVAILABLE, _is_xlsx, _source_size
+from .quality import FIRST_DATA_ROW, VALIDATION_CHUNK_ROWS, validate_cuils
+from .reader import collation_key, log_numbering_summary
+from .store import PatientStore
+
+# Memoria por defecto para la consolidación (--memory-cap-mb)
+DEFAULT_MEMORY_CAP_BYTES = 512 * 1024 * 1024
+
+# Bytes de consolidación en memoria por byte del .xlsx (comprimido), medido
+# con libros sintéticos (benchmarks/run_benchmarks.py, etapa read_spilled)
+CONSOLIDATION_BYTES_PER_INPUT_BYTE = 4
+
+# Bytes aproximados de una fila en los bloques pendientes de escribir
+SPILL_ROW_BYTES = 400
+
+# Parte de memory_cap para las filas pendientes de escribir en disco (y
+# mínimo de filas por escritura, para no escribir de a una)
+SPILL_BUFFER_SHARE = 4
+MIN_SPILL_BUFFER_ROWS = 1024
+
+MAX_PARTITIONS = 256
+
+# Pacientes por bloque al guardar una partición ordenada
+RUN_BATCH_ROWS = 4096
+
+SPILL_DIR_PREFIX = "particiones_examenes_"
+
+def partition_count(input_size, memory_cap, partition_jobs=1):
+    """
+    Particiones necesarias para que partition_jobs consolidaciones a la vez
+    entren en memory_cap (1 si el archivo entero entra)
+    """
+    estimate = input_size * CONSOLIDATION_BYTES_PER_INPUT_BYTE * max(1, partition_jobs)
+    return max(1, min(MAX_PARTITIONS, math.ceil(estimate / max(1, memory_cap))))
+
+def _write_batch(path, batch):
+    with open(path, 'ab') as f:
+        pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _read_batches(path):
+    """Bloques guardados con _write_batch, en orden"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def _iter_run(path):
+    for batch in _read_batches(path):
+        yield from batch
+
+class SpillPartitions:
+    """
+    Reparte las filas de pacientes en `partitions` archivos de `directory`
+    según el CRC32 de su CUIL ya normalizado. Las filas se acumulan en memoria
+    y se escriben todas juntas al llegar a buffer_rows.
+    """
+    
+    def __init__(self, directory, partitions, buffer_rows):
+        self.paths = [os.path.join(directory, f"particion_{i:03d}.pkl") for i in range(partitions)]
+        self.buffer_rows = max(MIN_SPILL_BUFFER_ROWS, buffer_rows)
+        self.total_rows = 0
+        self._buffers = [[] for _ in range(partitions)]
+        self._buffered = 0
+    
+    def write_rows(self, rows, metrics=None):
+        """
+        Valida los CUIL de rows (cuil, nombre, descripción) como
+        consolidate_patient_rows y guarda las filas válidas como
+        (fila, cuil, nombre, descripción) en su partición
+        """
+        partitions = len(self.paths)
+        chunk_rows = min(VALIDATION_CHUNK_ROWS, self.buffer_rows)
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                break
+            first_row = FIRST_DATA_ROW + self.total_rows
+            cuils, valid = validate_cuils([row[0] for row in chunk], metrics, first_row)
+            self.total_rows += len(chunk)
+            for fila, cuil, (_, nombre, descripcion) in compress(zip(count(first_row), cuils.tolist(), chunk),
+                                                                  valid.tolist()):
+                self._buffers[zlib.crc32(cuil.encode()) % partitions].append((fila, cuil, nombre, descripcion))
+            self._buffered += int(valid.sum())
+            if self._buffered >= self.buffer_rows:
+                self.flush()
+        self.flush()
+        
+        if metrics is not None:
+            metrics.count('filas_leidas', self.total_rows)
+        return self
+    
+    def flush(self):
+        for path, buffer in zip(self.paths, self._buffers):
+            if buffer:
+                _write_batch(path, buffer)
+                buffer.clear()
+        self._buffered = 0
+
+def consolidate_partition(spill_path, run_path):
+    """
+    Consolida las filas de una partición y guarda sus pacientes en run_path,
+    ordenados por (clave alfabética, primera fila), como
+    (clave, fila, cuil, nombre, estudios).
+    Devuelve (pacientes, {descripción: (fila, posición)} con la primera
+    aparición de cada estudio, conflictos como en merge_patient_rows).
+    """
+    from .streaming import merge_patient_rows
+    
+    patient_info = {}
+    conflicts = {}
+    first_rows = {}
+    for batch in _read_batches(spill_path):
+        merge_patient_rows(patient_info, conflicts, batch)
+        for fila, cuil, _, _ in batch:
+            if cuil not in first_rows:
+                first_rows[cuil] = fila
+    if os.path.exists(spill_path):
+        os.remove(spill_path)
+    
+    # patient_info está en orden de primera fila: la primera vez que se ve
+    # una descripción es su primera aparición en el archivo
+    first_seen = {}
+    run = []
+    for cuil, info in patient_info.items():
+        fila = first_rows[cuil]
+        estudios = list(info["estudios"])
+        for position, descripcion in enumerate(estudios):
+            first_seen.setdefault(descripcion, (fila, position))
+        run.append((collation_key(info["nombre"]), fila, cuil, info["nombre"], estudios))
+    del patient_info, first_rows
+    
+    run.sort(key=lambda patient: patient[:2])
+    for start in range(0, len(run), RUN_BATCH_ROWS):
+        _write_batch(run_path, run[start:start + RUN_BATCH_ROWS])
+    return len(run), first_seen, conflicts
+
+def _consolidate_partitions(spill_paths, run_paths, partition_jobs):
+    """Resultados de consolidate_partition de cada partición, en orden"""
+    jobs = max(1, min(partition_jobs, len(spill_paths)))
+    if jobs == 1:
+        return [consolidate_partition(spill_path, run_path) for spill_path, run_path in zip(spill_paths, run_paths)]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(consolidate_partition, spill_paths, run_paths))
+
+def read_input_spilled(input_file, memory_cap=DEFAULT_MEMORY_CAP_BYTES, metrics=None, exam_catalog=None,
+                       partition_jobs=1, partitions=None, spill_dir=None):
+    """
+    Lee y consolida un .xlsx (ruta o buffer binario con seek) con la
+    consolidación acotada a memory_cap bytes. Devuelve (company_data, store),
+    con store el PatientStore en el orden de salida.
+    partition_jobs: procesos que consolidan particiones a la vez
+    partitions: cantidad de particiones (por defecto según el tamaño del
+    archivo y memory_cap; con 1 se consolida en memoria, sin disco)
+    spill_dir: carpeta de los archivos temporales (por defecto, la del sistema)
+    """
+    from .streaming import named_conflicts, read_rows_streaming
+    
+    metrics = metrics if metrics is not None else RunMetrics()
+    if not (OPENPYXL_AVAILABLE and _is_xlsx(input_file)):
+        raise ValueError("La consolidación con memoria acotada requiere un archivo .xlsx y openpyxl")
+    if partitions is None:
+        partitions = partition_count(_source_size(input_file), memory_cap, partition_jobs)
+    
+    if partitions == 1:
+        # La consolidación entera entra en memory_cap: lectura en streaming sin disco
+        from .streaming import process_excel_streaming
+        log.info("Leyendo archivo Excel en streaming (la consolidación entra en el límite de memoria)...")
+        company_data, patient_info, patient_numbers = process_excel_streaming(input_file, metrics)
+        metrics.quality.log_summary()
+        with metrics.stage('matriz_examenes'):
+            store = PatientStore.from_patient_info(patient_info, patient_numbers, catalog=exam_catalog)
+        return company_data, store
+    
+    buffer_rows = memory_cap // SPILL_BUFFER_SHARE // SPILL_ROW_BYTES
+    metrics.count('particiones', partitions)
+    with tempfile.TemporaryDirectory(prefix=SPILL_DIR_PREFIX, dir=spill_dir) as directory:
+        log.info(f"Leyendo archivo Excel en streaming con {partitions} particiones en disco...")
+        spill = SpillPartitions(directory, partitions, buffer_rows)
+        company_data, _, total_rows = read_rows_streaming(input_file, spill.write_rows, metrics,
+                                                          stage='lectura_y_particion')
+        
+        run_paths = [os.path.join(directory, f"ordenada_{i:03d}.pkl") for i in range(partitions)]
+        with metrics.stage('consolidacion_particiones'):
+            results = _consolidate_partitions(spill.paths, run_paths, partition_jobs)
+        
+        # Primera aparición de cada descripción y conflictos de nombres de todo el archivo
+        first_seen = {}
+        conflicts = {}
+        for _, partition_first_seen, partition_conflicts in results:
+            for descripcion, seen in partition_first_seen.items():
+                if descripcion not in first_seen or seen < first_seen[descripcion]:
+                    first_seen[descripcion] = seen
+            conflicts.update(partition_conflicts)
+        if total_rows is not None:
+            log_numbering_summary(total_rows, sum(patients for patients, _, _ in results))
+        metrics.quality.add_conflicts(named_conflicts(conflicts))
+        metrics.quality.log_summary()
+        
+        # Las particiones ordenadas se intercalan por (clave alfabética, primera
+        # fila): el orden estable de assign_patient_numbers
+        with metrics.stage('fusion_particiones'):
+            merged = heapq.merge(*(_iter_run(path) for path in run_paths), key=lambda patient: patient[:2])
+            store = PatientStore.from_patients(((cuil, nombre, estudios) for _, _, cuil, nombre, estudios in merged),
+                                               sorted(first_seen, key=first_seen.get), catalog=exam_catalog)
+    return company_data, store
@@ -0,0 +1,197 @@
+# =============================================================================
+# ALMACÉN COMPACTO DE PACIENTES
+# =============================================================================
+#
+# Una sola estructura, en el orden de salida, de la que leen los escritores,
+# los totales y los resúmenes (en lugar de copiar patient_info en
+# final_employees_data y armar aparte la matriz paciente x examen):
+# - un registro con __slots__ por paciente: nombre e ids de sus exámenes
+# - nombres internados: una sola copia de cada nombre repetido
+# - CUILs como enteros de 64 bits en un array; los que no son un número que
+#   se pueda reconstruir igual (ceros a la izquierda, guiones) se guardan
+#   como texto aparte
+# - exámenes como enteros chicos en un array por paciente; el nombre de cada
+#   examen está una sola vez en la tabla de exámenes
+# El Id de cada paciente es su posición + 1 (el orden de patient_numbers).
+# Una parte del almacén (slice()) conserva los Id del almacén completo.
+
+import sys
+from array import array
+
+import numpy as np
+
+from .catalog import default_exam_catalog
+
+# Mayor CUIL que se guarda como entero (int64)
+INT64_MAX = 2 ** 63 - 1
+
+# CUIL guardado como texto: en el array queda este valor
+TEXT_CUIL = -1
+
+def _compact_cuil(cuil):
+    """CUIL como entero si str() lo reconstruye igual; si no, TEXT_CUIL"""
+    if (isinstance(cuil, str) and cuil.isascii() and cuil.isdigit()
+            and (cuil[0] != '0' or cuil == '0')):
+        value = int(cuil)
+        if value <= INT64_MAX:
+            return value
+    return TEXT_CUIL
+
+class PatientRecord:
+    """Un paciente del almacén: nombre e ids de sus exámenes (sin repetidos)"""
+    
+    __slots__ = ('nombre', 'examenes')
+    
+    def __init__(self, nombre, examenes):
+        self.nombre = nombre
+        self.examenes = examenes
+
+class PatientStore:
+    """
+    Pacientes consolidados en el orden de salida, con sus CUILs, nombres y
+    exámenes codificados. Se arma con from_patient_info() o from_patients().
+    exams: nombres de examen por id (known_exams primero y después en orden
+    de primera aparición, el orden del bloque de totales)
+    """
+    
+    def __init__(self, exams=()):
+        self.exams = []
+        self.records = []
+        self._exam_ids = {}
+        self._counts = []
+        self._cuils = array('q')
+        self._text_cuils = {}
+        self._positions = None
+        # Id del primer paciente - 1 (distinto de 0 en las partes de slice())
+        self.id_offset = 0
+        for exam in exams:
+            self.exam_id(exam)
+    
+    @classmethod
+    def from_patient_info(cls, patient_info, patient_numbers, known_exams=(), catalog=None):
+        """
+        Arma el almacén con los pacientes de patient_info en el orden de
+        patient_numbers. Los ids de examen siguen known_exams y después la
+        primera aparición en patient_info.
+        catalog: ver from_patients
+        """
+        descriptions = (description for info in patient_info.values() for description in info['estudios'])
+        patients = ((cuil, patient_info[cuil]['nombre'], patient_info[cuil]['estudios'])
+                    for cuil in patient_numbers)
+        return cls.from_patients(patients, descriptions, known_exams, catalog)
+    
+    @classmethod
+    def from_patients(cls, patients, descriptions=(), known_exams=(), catalog=None):
+        """
+        Arma el almacén con patients: (cuil, nombre, descripciones de sus
+        estudios), ya en el orden de salida (puede ser un iterador).
+        descriptions: descripciones en el orden en que reciben id de examen,
+        después de known_exams; las que no están reciben id al aparecer
+        catalog: ExamCatalog que da el nombre canónico de cada estudio (cada
+        descripción distinta se normaliza una sola vez)
+        """
+        store = cls(known_exams)
+        canonical = (catalog or default_exam_catalog()).canonical
+        ids = {}
+        
+        def exam_id(description):
+            exam = ids.get(description)
+            if exam is None:
+                name = canonical(description) if description else ''
+                exam = ids[description] = store.exam_id(name) if name else -1
+            return exam
+        
+        for description in descriptions:
+            exam_id(description)
+        
+        for cuil, nombre, estudios in patients:
+            exams = []
+            for description in estudios:
+                exam = exam_id(description)
+                if exam >= 0 and exam not in exams:
+                    exams.append(exam)
+            store.append(cuil, nombre, exams)
+        return store
+    
+    def exam_id(self, exam):
+        """Id del examen (lo agrega a la tabla si es nuevo)"""
+        exam_id = self._exam_ids.get(exam)
+        if exam_id is None:
+            exam_id = self._exam_ids[exam] = len(self.exams)
+            self.exams.append(exam)
+            self._counts.append(0)
+        return exam_id
+    
+    def append(self, cuil, nombre, exam_ids):
+        """Agrega un paciente al final (exam_ids: ids de exam_id(), sin repetidos)"""
+        value = _compact_cuil(cuil)
+        if value == TEXT_CUIL:
+            self._text_cuils[len(self.records)] = cuil
+        self._cuils.append(value)
+        if isinstance(nombre, str):
+            nombre = sys.intern(nombre)
+        for exam in exam_ids:
+            self._counts[exam] += 1
+        self.records.append(PatientRecord(nombre, array('H', exam_ids)))
+        self._positions = None
+    
+    def slice(self, start, stop):
+        """
+        Almacén con los pacientes start:stop: mismos exámenes e ids de examen,
+        Id de paciente del almacén completo y recuento por examen de la parte
+        """
+        part = PatientStore(self.exams)
+        part.records = self.records[start:stop]
+        part._cuils = self._cuils[start:stop]
+        part._text_cuils = {position - start: cuil for position, cuil in self._text_cuils.items()
+                            if start <= position < stop}
+        part.id_offset = self.id_offset + start
+        for record in part.records:
+            for exam in record.examenes:
+                part._counts[exam] += 1
+        return part
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def cuil(self, position):
+        """CUIL (texto) del paciente en position"""
+        value = self._cuils[position]
+        return self._text_cuils[position] if value == TEXT_CUIL else str(value)
+    
+    def position(self, cuil):
+        """Posición del paciente con ese CUIL (el índice se arma al primer uso)"""
+        if self._positions is None:
+            self._positions = {self.cuil(i): i for i in range(len(self.records))}
+        return self._positions[cuil]
+    
+    def rows(self, start=0, stop=None):
+        """(Id, nombre, CUIL, ids de examen) de cada paciente, en el orden de salida"""
+        stop = len(self.records) if stop is None else stop
+        for position in range(start, stop):
+            record = self.records[position]
+            yield self.id_offset + position + 1, record.nombre, self.cuil(position), record.examenes
+    
+    def exam_count(self):
+        """{examen: pacientes con ese examen}, en el orden de los ids"""
+        return dict(zip(self.exams, self._counts))
+    
+    def study_count(self):
+        """Total de estudios (pares paciente-examen)"""
+        return sum(self._counts)
+    
+    def exam_columns(self, exams_list):
+        """Columna de cada id de examen según el orden de exams_list"""
+        position = {exam: col for col, exam in enumerate(exams_list)}
+        return [position[exam] for exam in self.exams]
+    
+    def marks(self, exams_list, start=0, stop=None):
+        """Matriz booleana paciente x examen de las filas start:stop, con las columnas de exams_list"""
+        records = self.records[start:stop]
+        marks = np.zeros((len(records), len(exams_list)), dtype=bool)
+        lengths = [len(record.examenes) for record in records]
+        if records and sum(lengths):
+            ids = np.frombuffer(b''.join(record.examenes.tobytes() for record in records), dtype=np.uint16)
+            rows = np.repeat(np.arange(len(records)), lengths)
+            marks[rows, np.asarray(self.exam_columns(exams_list))[ids]] = True
+        return marks
@@ -0,0 +1,247 @@
+# =============================================================================
+# LECTURA EN STREAMING (archivos muy grandes)
+# =============================================================================
+
+from itertools import compress, count, islice
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+
+from .metrics import log, RunMetrics
+from .quality import FIRST_DATA_ROW, VALIDATION_CHUNK_ROWS, validate_cuils
+from .reader import COMPANY_DATA_COLUMNS, extract_company_data_fixed_positions, assign_patient_numbers
+
+# Última columna que usa el proceso (Q); el resto de la fila no se convierte
+STREAMING_MAX_COL = 17
+
+# Textos que pd.read_excel interpreta como vacíos por defecto
+PANDAS_NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None',
+    'n/a', 'nan', 'null'
+])
+
+def _cell_value_like_pandas(value):
+    """
+    Normaliza un valor leído con openpyxl igual que pd.read_excel:
+    vacíos, errores y textos NA quedan como None; los float enteros pasan a int.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        if value in PANDAS_NA_VALUES or value in ERROR_CODES:
+            return None
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _text_value(value):
+    """Equivalente por celda de _text_column"""
+    return str(value).strip() if value is not None else ""
+
+def _as_number(value):
+    """Devuelve el valor como float si read_excel lo consideraría numérico, o None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+class _CompanyColumnTypes:
+    """
+    Reproduce, fila a fila, la inferencia de tipos que hace pd.read_excel (con
+    encabezado) sobre las columnas de empresa: una columna solo numérica con
+    vacíos o decimales queda como float ("123.0"), igual que en el modo pandas.
+    """
+    
+    def __init__(self, columns):
+        self.columns = columns
+        self.numeric = dict.fromkeys(columns, True)
+        self.has_float = dict.fromkeys(columns, False)
+        self.first_na_row = dict.fromkeys(columns, None)
+        self.first_row = None
+        self.last_data_row = -1
+    
+    def update(self, row_idx, row):
+        if self.first_row is None:
+            self.first_row = row
+        if any(value is not None for value in row):
+            self.last_data_row = row_idx
+        for col in self.columns:
+            value = row[col] if col < len(row) else None
+            if value is None:
+                if self.first_na_row[col] is None:
+                    self.first_na_row[col] = row_idx
+            elif self.numeric[col]:
+                number = _as_number(value)
+                if number is None:
+                    self.numeric[col] = False
+                elif not number.is_integer():
+                    self.has_float[col] = True
+    
+    def company_frame(self):
+        """DataFrame de una fila con los valores ya tipados para extract_company_data_fixed_positions"""
+        first_row = list(self.first_row or [])
+        first_row += [None] * (STREAMING_MAX_COL - len(first_row))
+        for col in self.columns:
+            value = first_row[col]
+            if value is None or not self.numeric[col]:
+                continue
+            na_row = self.first_na_row[col]
+            # read_excel descarta las filas vacías del final antes de inferir tipos
+            has_na = na_row is not None and na_row <= self.last_data_row
+            number = _as_number(value)
+            first_row[col] = number if (has_na or self.has_float[col]) else int(number)
+        return pd.DataFrame([first_row], dtype=object)
+
+def merge_patient_rows(patient_info, conflicts, rows):
+    """
+    Agrega a patient_info filas ya validadas (fila, cuil, nombre, descripción):
+    un registro por CUIL con el nombre de su primera fila y sus estudios sin
+    repetir (en un dict, para deduplicar sin perder el orden).
+    conflicts: {cuil: (fila, {nombres})} de los CUIL que aparecen con otro
+    nombre, con la fila donde aparece el segundo nombre
+    """
+    for fila, cuil, nombre, descripcion in rows:
+        info = patient_info.get(cuil)
+        if info is None:
+            info = patient_info[cuil] = {"nombre": nombre, "estudios": {}}
+        elif nombre and nombre != info["nombre"]:
+            conflicts.setdefault(cuil, (fila, {info["nombre"]: None}))[1][nombre] = None
+        if descripcion:
+            info["estudios"][descripcion] = None
+
+def named_conflicts(conflicts):
+    """
+    {cuil: [nombres]} de conflicts (ver merge_patient_rows), en el orden de
+    sus filas. Igual que name_conflicts: los nombres vacíos no cuentan.
+    """
+    named = {}
+    for cuil, (_, nombres) in sorted(conflicts.items(), key=lambda item: item[1][0]):
+        nombres = [nombre for nombre in nombres if nombre]
+        if len(nombres) > 1:
+            named[cuil] = nombres
+    return named
+
+def consolidate_patient_rows(rows, metrics=None):
+    """
+    Consolidación fila por fila para la lectura en streaming: mismas reglas que
+    consolidate_patient_columns, guardando solo un registro por CUIL. Los CUIL
+    se validan de a bloques de VALIDATION_CHUNK_ROWS filas (ver quality.py).
+    """
+    patient_info = {}
+    conflicts = {}
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, VALIDATION_CHUNK_ROWS))
+        if not chunk:
+            break
+        first_row = FIRST_DATA_ROW + total
+        cuils, valid = validate_cuils([row[0] for row in chunk], metrics, first_row)
+        total += len(chunk)
+        merge_patient_rows(patient_info, conflicts, compress(
+            ((fila, cuil, nombre, descripcion) for fila, cuil, (_, nombre, descripcion)
+             in zip(count(first_row), cuils.tolist(), chunk)), valid.tolist()))
+    
+    for info in patient_info.values():
+        info["estudios"] = list(info["estudios"])
+    
+    if metrics is not None:
+        metrics.count('filas_leidas', total)
+        metrics.quality.add_conflicts(named_conflicts(conflicts))
+    return patient_info
+
+def iter_sheet_rows_streaming(ws):
+    """
+    Recorre la hoja con openpyxl en modo solo lectura y devuelve cada fila
+    recortada a las columnas que usa el proceso, con valores normalizados.
+    """
+    for row in ws.iter_rows(max_col=STREAMING_MAX_COL, values_only=True):
+        yield tuple(_cell_value_like_pandas(value) for value in row)
+
+def read_rows_streaming(input_file, consolidate, metrics=None, recorder=None, stage='lectura_y_consolidacion'):
+    """
+    Lee la hoja en streaming y pasa sus filas de pacientes (cuil, nombre y
+    descripción como texto) a consolidate(rows, metrics), mientras se leen.
+    Devuelve (company_data, resultado de consolidate, total_rows); con la hoja
+    vacía consolidate recibe cero filas y total_rows es None.
+    recorder: ColumnRecorder opcional que recibe las columnas leídas (caché)
+    stage: etapa de las métricas para la lectura junto con consolidate
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    wb = load_workbook(input_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        rows = iter_sheet_rows_streaming(ws)
+        
+        # La primera fila es el encabezado
+        if next(rows, None) is None:
+            log.warning("Hoja vacía")
+            return extract_company_data_fixed_positions(pd.DataFrame()), consolidate((), None), None
+        
+        company_types = _CompanyColumnTypes(COMPANY_DATA_COLUMNS)
+        
+        def patient_rows():
+            # Las filas vacías se entregan recién cuando aparece una fila con
+            # datos: read_excel descarta las del final de la hoja
+            empty_rows = 0
+            for row_idx, row in enumerate(rows):
+                company_types.update(row_idx, row)
+                if company_types.last_data_row != row_idx:
+                    empty_rows += 1
+                    continue
+                for _ in range(empty_rows):
+                    yield '', '', ''
+                empty_rows = 0
+                yield _text_value(row[2]), _text_value(row[15]), _text_value(row[4])
+        
+        def recorded(rows):
+            for row in rows:
+                recorder.append(*row)
+                yield row
+        
+        log.info("Procesando filas en streaming...")
+        # Lectura y consolidación ocurren juntas, fila por fila
+        with metrics.stage(stage):
+            # Igual que en modo pandas: sin columna P no hay pacientes
+            if ws.max_column is not None and ws.max_column <= 15:
+                for _ in patient_rows():
+                    pass
+                result = consolidate((), None)
+            else:
+                rows_to_consolidate = patient_rows() if recorder is None else recorded(patient_rows())
+                result = consolidate(rows_to_consolidate, metrics)
+        
+        total_rows = company_types.last_data_row + 1
+        if recorder is not None:
+            recorder.total_rows = total_rows
+        log.info(f"Archivo leído en streaming: {total_rows} filas")
+        
+        with metrics.stage('empresa'):
+            company_data = extract_company_data_fixed_positions(company_types.company_frame())
+        return company_data, result, total_rows
+    finally:
+        wb.close()
+
+def process_excel_streaming(input_file, metrics=None, recorder=None):
+    """
+    Lee el archivo en streaming y devuelve (company_data, patient_info, patient_numbers)
+    La memoria usada depende de la cantidad de pacientes únicos, no de filas.
+    recorder: ColumnRecorder opcional que recibe las columnas leídas (caché)
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    company_data, patient_info, total_rows = read_rows_streaming(input_file, consolidate_patient_rows,
+                                                                 metrics, recorder)
+    if total_rows is None:
+        return company_data, patient_info, {}
+    with metrics.stage('numeracion'):
+        patient_numbers = assign_patient_numbers(patient_info, total_rows)
+    return company_data, patient_info, patient_numbers
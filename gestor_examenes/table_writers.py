@@ -0,0 +1,134 @@
+# =============================================================================
+# SALIDAS TABULARES (CSV / PARQUET)
+# =============================================================================
+#
+# Los mismos datos que la matriz .xlsx, sin formato, para análisis y clientes
+# muy grandes. Se escriben por bloques de filas, sin armar la hoja en memoria:
+# - ancho ('csv', 'parquet'): Id, Empleado, CUIL y una columna por examen
+#   (en CSV la marca es "X" como en el .xlsx; en Parquet, booleana)
+# - largo ('csv-long', 'parquet-long'): una fila por paciente y examen
+#   (Id, Empleado, CUIL, Examen), solo los estudios asignados
+# Los datos de empresa y el recuento por examen van en dos archivos chicos
+# aparte, <salida>_empresa y <salida>_totales, en el mismo formato.
+
+import csv
+import os
+
+import numpy as np
+
+from .metrics import log
+from .pipeline import company_fields, output_path
+
+# Filas de pacientes por bloque de escritura
+TABLE_BATCH_ROWS = 65536
+
+def _patient_batches(store, exams_list, batch_rows=TABLE_BATCH_ROWS):
+    """
+    Pacientes en el orden de la matriz, por bloques: (ids, nombres, cuils,
+    marcas), con marcas la submatriz booleana del bloque (columnas en el
+    orden de exams_list).
+    """
+    for start in range(0, len(store), batch_rows):
+        stop = min(start + batch_rows, len(store))
+        ids, names, cuils, _ = zip(*store.rows(start, stop))
+        yield list(ids), list(names), list(cuils), store.marks(exams_list, start, stop)
+
+def _write_csv_rows(path, header, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def _write_csv_wide(path, batches, exams_list):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Id', 'Empleado', 'CUIL'] + exams_list)
+        for ids, names, cuils, marks in batches:
+            marks = np.where(marks, 'X', '').tolist()
+            writer.writerows([patient_id, name, cuil, *row]
+                             for patient_id, name, cuil, row in zip(ids, names, cuils, marks))
+
+def _write_csv_long(path, batches, exams_list):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Id', 'Empleado', 'CUIL', 'Examen'])
+        for ids, names, cuils, marks in batches:
+            # Solo las celdas marcadas, por paciente y en el orden de columnas
+            rows, cols = np.nonzero(marks)
+            writer.writerows([ids[row], names[row], cuils[row], exams_list[col]]
+                             for row, col in zip(rows.tolist(), cols.tolist()))
+
+def _write_parquet_table(path, batches, exams_list, long_format):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    fields = [pa.field('Id', pa.int64()), pa.field('Empleado', pa.string()), pa.field('CUIL', pa.string())]
+    if long_format:
+        fields.append(pa.field('Examen', pa.string()))
+    else:
+        fields.extend(pa.field(exam, pa.bool_()) for exam in exams_list)
+    schema = pa.schema(fields)
+    
+    with pq.ParquetWriter(path, schema) as writer:
+        for ids, names, cuils, marks in batches:
+            if long_format:
+                rows, cols = np.nonzero(marks)
+                arrays = [pa.array(np.asarray(ids, dtype=np.int64)[rows]),
+                          pa.array(np.asarray(names, dtype=object)[rows], pa.string()),
+                          pa.array(np.asarray(cuils, dtype=object)[rows], pa.string()),
+                          pa.array(np.asarray(exams_list, dtype=object)[cols], pa.string())]
+            else:
+                arrays = [pa.array(ids, pa.int64()), pa.array(names, pa.string()), pa.array(cuils, pa.string())]
+                arrays.extend(pa.array(marks[:, col]) for col in range(len(exams_list)))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+def _write_parquet_rows(path, header, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    columns = list(zip(*rows)) if rows else [()] * len(header)
+    pq.write_table(pa.table({name: list(values) for name, values in zip(header, columns)}), path)
+
+def write_table_outputs(formats, output_file, company_data, store, exams_list, exam_count):
+    """
+    Escribe las salidas CSV/Parquet pedidas en formats a partir de la misma
+    consolidación que la matriz .xlsx (store: PatientStore en el orden de
+    salida, ver store.py). Devuelve la lista de archivos
+    escritos, o None si alguna salida no se pudo escribir.
+    """
+    written = []
+    families = []
+    try:
+        for fmt in formats:
+            if fmt == 'xlsx':
+                continue
+            family = fmt.split('-')[0]
+            path = output_path(output_file, fmt)
+            batches = _patient_batches(store, exams_list)
+            if fmt == 'csv':
+                _write_csv_wide(path, batches, exams_list)
+            elif fmt == 'csv-long':
+                _write_csv_long(path, batches, exams_list)
+            else:
+                _write_parquet_table(path, batches, exams_list, long_format=(fmt == 'parquet-long'))
+            written.append(path)
+            log.info(f"[OK] Salida {fmt} guardada como: {path}")
+            if family not in families:
+                families.append(family)
+        
+        # Datos de empresa y recuento por examen, una vez por familia de formatos
+        base = os.path.splitext(output_file)[0]
+        company_rows = [(field, '' if value is None else str(value)) for field, value in company_fields(company_data)]
+        total_rows = list(exam_count.items())
+        for family in families:
+            write_rows = _write_csv_rows if family == 'csv' else _write_parquet_rows
+            company_path = f"{base}_empresa.{family}"
+            totals_path = f"{base}_totales.{family}"
+            write_rows(company_path, ['Campo', 'Valor'], company_rows)
+            write_rows(totals_path, ['Examen', 'Cantidad'], total_rows)
+            written.extend([company_path, totals_path])
+        return written
+    
+    except Exception as e:
+        log.error(f"Error escribiendo las salidas tabulares: {e}")
+        return None
@@ -0,0 +1,484 @@
+# =============================================================================
+# ACTUALIZACIÓN INCREMENTAL DE UNA SALIDA EXISTENTE
+# =============================================================================
+#
+# Agrega a un output_sorted_*.xlsx ya generado los pacientes y estudios de uno
+# o más archivos nuevos, sin volver a leer ni consolidar la entrada original:
+# la matriz existente (datos de empresa, filas Id/Empleado/CUIL y columnas de
+# examen) se lee de vuelta y se une con los archivos nuevos como en
+# merge_patients. Los pacientes se renumeran alfabéticamente (como
+# assign_patient_numbers) y el bloque de totales se recalcula conservando el
+# orden de los exámenes que ya tenía.
+#
+# Si la salida la generó el escritor de solo escritura y no cambian las
+# columnas de examen ni los datos de empresa, la hoja se reescribe a nivel de
+# XML: las filas de pacientes sin cambios se copian tal cual (solo cambian su
+# número de fila y el Id) y se generan únicamente las filas nuevas o con
+# estudios nuevos. En cualquier otro caso se escribe la salida completa con
+# write_store_output, a partir del almacén ya armado.
+
+import os
+import re
+import shutil
+import time
+import zipfile
+from collections import namedtuple
+
+from openpyxl.utils import get_column_letter
+
+from .metrics import log, RunMetrics
+from .pipeline import read_input_file, write_store_output
+from .xlsx_reader import SheetXmlReader, UnsupportedSheetError, iter_sheet_blocks
+
+# Campos del bloque de empresa de la salida (Proceso y Contacto se escriben vacíos)
+COMPANY_FIELDS = ['Empresa', 'CUIT', 'Contrato', 'Domicilio', 'Localidad', 'Provincia', 'Telefono', 'Email']
+
+# Caracteres acumulados antes de escribir un bloque de la hoja reescrita
+WRITE_BUFFER_CHARS = 1024 * 1024
+
+# Matriz leída de una salida: datos de empresa, exámenes en el orden de las
+# columnas, recuento del bloque de totales {examen: cantidad} en su orden,
+# patient_info en el orden de las filas, si tiene hoja "Origen" y la
+# estructura para reescribir la hoja por filas (None si no se puede)
+OutputMatrix = namedtuple('OutputMatrix', ['company_data', 'exams', 'exam_totals', 'patient_info',
+                                           'has_provenance', 'layout'])
+
+# Estructura de la hoja: fila del encabezado, última fila de pacientes, CUILs
+# en el orden de las filas, estilos de celda normal y marcada y el elemento
+# <cols> tal como se leyó
+SheetLayout = namedtuple('SheetLayout', ['sheet_path', 'header_row', 'last_patient_row', 'cuils',
+                                         'cell_style', 'marked_style', 'cols'])
+
+class _LayoutMismatch(Exception):
+    """La hoja no tiene la estructura esperada para reescribirla por filas"""
+
+_ROW_RE = re.compile(r'<row r="(\d+)"[^>]*?(?:/>|>(.*?)</row>)', re.S)
+_CELL_REF_RE = re.compile(r'(<c r="[A-Z]+)\d+"')
+_COLS_RE = re.compile(r'<cols>.*?</cols>', re.S)
+_DIMENSION_RE = re.compile(r'<dimension ref="[^"]*"\s*/>')
+_CELL_STYLE_RE = re.compile(r'<c r="A\d+" s="(\d+)" t="n">')
+_MARKED_STYLE_RE = re.compile(r'<c r="[A-Z]+\d+" s="(\d+)" t="inlineStr"><is><t>X</t></is></c>')
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+def _number(value):
+    return "%.16g" % value
+
+def _text_cell(ref, text, style=None):
+    """Celda de texto en línea, con el mismo XML que escribe openpyxl"""
+    style = f' s="{style}"' if style is not None else ''
+    if text == '':
+        return f'<c r="{ref}"{style} t="inlineStr" />'
+    stripped = text.strip()
+    space = ' xml:space="preserve"' if stripped and stripped != text else ''
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return f'<c r="{ref}"{style} t="inlineStr"><is><t{space}>{text}</t></is></c>'
+
+def _render_patient_row(row, patient_number, name, cuil, marks, layout):
+    """Fila de un paciente como la escribe process_excel_file_with_openpyxl_streaming"""
+    cells = [f'<row r="{row}"><c r="A{row}" s="{layout.cell_style}" t="n"><v>{_number(patient_number)}</v></c>',
+             _text_cell(f'B{row}', name, layout.cell_style),
+             _text_cell(f'C{row}', cuil, layout.cell_style)]
+    for col, marked in enumerate(marks, start=4):
+        if marked:
+            cells.append(_text_cell(f'{get_column_letter(col)}{row}', 'X', layout.marked_style))
+        else:
+            cells.append(f'<c r="{get_column_letter(col)}{row}" s="{layout.cell_style}" t="n" />')
+    cells.append('</row>')
+    return ''.join(cells)
+
+def _render_totals(first_row, exam_count):
+    """Fila en blanco y recuento por examen, desde first_row"""
+    rows = [f'<row r="{first_row}"></row>']
+    for row, (exam, count) in enumerate(exam_count.items(), start=first_row + 1):
+        rows.append(f'<row r="{row}"><c r="A{row}" t="n"><v>{_number(count)}</v></c>{_text_cell(f"B{row}", exam)}</row>')
+    return ''.join(rows)
+
+def _render_cols(widths):
+    return '<cols>' + ''.join(f'<col width="{_number(width)}" customWidth="1" min="{idx}" max="{idx}" />'
+                              for idx, width in enumerate(widths, start=1)) + '</cols>'
+
+def read_output_matrix(output_file):
+    """
+    Lee de vuelta una salida generada por este conversor (con cualquiera de
+    los escritores) y devuelve OutputMatrix. Lanza UnsupportedSheetError si la
+    primera hoja no tiene el encabezado Id/Empleado/CUIL.
+    """
+    from .writers import PROVENANCE_SHEET
+    
+    company_data = {field: '' for field in COMPANY_FIELDS}
+    exams, exam_columns = [], {}
+    exam_totals = {}
+    patient_info = {}
+    cuils = []
+    state = 'empresa'
+    header_row = next_row = None
+    first_row = cell_style = marked_style = None
+    cols = ''
+    
+    with zipfile.ZipFile(output_file) as zf:
+        sheet = SheetXmlReader(zf)
+        for block in sheet.blocks():
+            if header_row is None and not cols:
+                match = _COLS_RE.search(block)
+                cols = match.group(0) if match else ''
+            
+            for row, values, xml, content in sheet.rows(block):
+                if state == 'empresa':
+                    if (values.get(1), values.get(2), values.get(3)) == ('Id', 'Empleado', 'CUIL'):
+                        exam_columns = {col: _text(value).strip() for col, value in values.items() if col >= 4}
+                        exams = [exam_columns[col] for col in sorted(exam_columns)]
+                        state, header_row, next_row = 'pacientes', row, row + 1
+                    elif _text(values.get(2)) in company_data:
+                        company_data[_text(values.get(2))] = _text(values.get(3))
+                    continue
+                
+                if state == 'pacientes':
+                    # Filas de pacientes: contiguas desde el encabezado hasta la primera sin Id
+                    if row == next_row and 1 in values:
+                        cuil = _text(values.get(3))
+                        patient_info[cuil] = {
+                            'nombre': _text(values.get(2)),
+                            'estudios': [exam_columns[col] for col in sorted(values)
+                                         if values[col] == 'X' and col in exam_columns]
+                        }
+                        cuils.append(cuil)
+                        next_row += 1
+                        if first_row is None:
+                            first_row = (row, values[1], xml)
+                            style = _CELL_STYLE_RE.match(content)
+                            cell_style = style.group(1) if style else None
+                        if marked_style is None:
+                            style = _MARKED_STYLE_RE.search(content)
+                            marked_style = style.group(1) if style else None
+                        continue
+                    state = 'totales'
+                
+                # Bloque de totales: recuento en A y examen en B
+                if 1 in values and 2 in values:
+                    exam_totals[_text(values[2]).strip()] = values[1]
+        
+        if header_row is None:
+            raise UnsupportedSheetError("no se encontró el encabezado Id/Empleado/CUIL")
+        has_provenance = PROVENANCE_SHEET in sheet.sheet_names
+    
+    layout = None
+    if not sheet.prefix and first_row is not None and cell_style is not None and marked_style is not None:
+        layout = SheetLayout(sheet.sheet_path, header_row, next_row - 1, cuils, cell_style, marked_style, cols)
+        # Solo se reescribe por filas si la primera fila de pacientes tiene
+        # exactamente el XML que generaría el escritor de solo escritura
+        row, patient_number, xml = first_row
+        info = patient_info[cuils[0]]
+        estudios = set(info['estudios'])
+        marks = [exam in estudios for exam in exams]
+        if not isinstance(patient_number, int) or xml != _render_patient_row(row, patient_number, info['nombre'], cuils[0], marks, layout):
+            layout = None
+    
+    return OutputMatrix(company_data, exams, exam_totals, patient_info, has_provenance, layout)
+
+def read_provenance(output_file):
+    """Hoja "Origen" de una salida como {(cuil, estudio): [(archivo, empresa, cuit), ...]}"""
+    from openpyxl import load_workbook
+    from .writers import PROVENANCE_SHEET
+    
+    provenance = {}
+    wb = load_workbook(output_file, read_only=True)
+    try:
+        rows = wb[PROVENANCE_SHEET].iter_rows(values_only=True)
+        next(rows, None)
+        for row in rows:
+            _, _, cuil, estudio, archivo, empresa, cuit = [_text(value) for value in (list(row) + [None] * 7)[:7]]
+            if not cuil or not estudio:
+                continue
+            sources = provenance.setdefault((cuil, estudio), [])
+            if (archivo, empresa, cuit) not in sources:
+                sources.append((archivo, empresa, cuit))
+    finally:
+        wb.close()
+    return provenance
+
+def merge_into_output(patient_info, delta_patients, exam_catalog=None):
+    """
+    Agrega a patient_info (leído de una salida) los pacientes de los archivos
+    nuevos, con los estudios por su nombre canónico (ver catalog.py).
+    Devuelve (CUILs nuevos, CUILs existentes con estudios nuevos, CUILs
+    existentes que tenían el nombre vacío y ahora lo tienen).
+    """
+    from .catalog import default_exam_catalog
+    
+    canonical = (exam_catalog or default_exam_catalog()).canonical
+    new, changed, renamed = [], set(), set()
+    for cuil, info in delta_patients.items():
+        estudios = list(dict.fromkeys(name for name in (canonical(estudio) for estudio in info['estudios'] if estudio) if name))
+        current = patient_info.get(cuil)
+        if current is None:
+            patient_info[cuil] = {'nombre': info['nombre'], 'estudios': estudios}
+            new.append(cuil)
+            continue
+        # Como en merge_patients: se conserva el primer nombre no vacío
+        if not current['nombre'] and info['nombre']:
+            current['nombre'] = info['nombre']
+            renamed.add(cuil)
+        known = set(current['estudios'])
+        for estudio in estudios:
+            if estudio not in known:
+                current['estudios'].append(estudio)
+                changed.add(cuil)
+    return new, changed, renamed
+
+def _splice_sheet(zin, out, layout, order, patient_numbers, patient_info, generated_cuils, exams_list, exam_count, cols):
+    """
+    Reescribe la hoja en el stream binario `out`: copia las filas hasta el
+    encabezado y las de pacientes que no están en generated_cuils (con su
+    nuevo número de fila e Id) y genera las demás filas de pacientes, en el
+    orden de `order`, y el bloque de totales.
+    Devuelve (filas copiadas, filas generadas, última fila de pacientes).
+    """
+    parts = []
+    size = 0
+    copied = generated = 0
+    pending = iter(order)
+    existing = iter(layout.cuils)
+    next_row = layout.header_row + 1
+    last_patient_row = None
+    # El escritor completo declara el rango de la hoja y openpyxl en modo de
+    # solo lectura no lee más allá: se declara el rango de la hoja nueva
+    last_row = layout.header_row + len(order) + 1 + len(exam_count)
+    dimension = f'<dimension ref="A1:{get_column_letter(3 + len(exams_list))}{last_row}" />'
+    
+    def emit(text):
+        nonlocal size
+        parts.append(text)
+        size += len(text)
+        if size >= WRITE_BUFFER_CHARS:
+            out.write(''.join(parts).encode('utf-8'))
+            parts.clear()
+            size = 0
+    
+    def emit_generated_until(cuil):
+        # Filas generadas que van antes de la fila existente `cuil` (o todas las que quedan)
+        nonlocal next_row, generated
+        for target in pending:
+            if target == cuil:
+                return
+            if target not in generated_cuils:
+                raise _LayoutMismatch(f"orden de pacientes inesperado en la fila {next_row}")
+            info = patient_info[target]
+            estudios = set(info['estudios'])
+            emit(_render_patient_row(next_row, patient_numbers[target], info['nombre'], target,
+                                     [exam in estudios for exam in exams_list], layout))
+            next_row += 1
+            generated += 1
+        if cuil is not None:
+            raise _LayoutMismatch("paciente existente fuera de orden")
+    
+    def finish_patients():
+        nonlocal last_patient_row
+        emit_generated_until(None)
+        last_patient_row = next_row - 1
+        emit(_render_totals(next_row, exam_count))
+    
+    with zin.open(layout.sheet_path) as stream:
+        blocks = iter_sheet_blocks(stream)
+        next(blocks)
+        for block in blocks:
+            position = 0
+            for row_match in _ROW_RE.finditer(block):
+                text = block[position:row_match.start()]
+                position = row_match.end()
+                if text and layout.cols and layout.cols in text:
+                    # Encabezado del XML: anchos de columna recalculados
+                    text = text.replace(layout.cols, cols, 1)
+                if text and '<dimension ' in text:
+                    text = _DIMENSION_RE.sub(dimension, text, 1)
+                emit(text)
+                
+                row = int(row_match.group(1))
+                xml = row_match.group(0)
+                if row <= layout.header_row:
+                    emit(xml)
+                elif row <= layout.last_patient_row:
+                    cuil = next(existing)
+                    if cuil in generated_cuils:
+                        continue
+                    emit_generated_until(cuil)
+                    head = re.match(rf'<row r="{row}"><c r="A{row}" s="{layout.cell_style}" t="n"><v>[^<]*</v></c>', xml)
+                    if head is None:
+                        raise _LayoutMismatch(f"la fila {row} tiene una estructura distinta")
+                    emit(f'<row r="{next_row}"><c r="A{next_row}" s="{layout.cell_style}" t="n">'
+                         f'<v>{_number(patient_numbers[cuil])}</v></c>')
+                    emit(_CELL_REF_RE.sub(rf'\g<1>{next_row}"', xml[head.end():]))
+                    next_row += 1
+                    copied += 1
+                elif last_patient_row is None:
+                    # Primera fila después de los pacientes: se reemplaza el bloque de totales
+                    finish_patients()
+            
+            text = block[position:]
+            if last_patient_row is None and '</sheetData>' in text:
+                finish_patients()
+            emit(text)
+    
+    if next(existing, None) is not None or last_patient_row is None:
+        raise _LayoutMismatch("la hoja terminó antes de lo esperado")
+    out.write(''.join(parts).encode('utf-8'))
+    return copied, generated, last_patient_row
+
+def _write_spliced_workbook(source_file, target_file, layout, *splice_args):
+    """
+    Copia el libro de source_file en target_file reemplazando la primera hoja
+    por la versión reescrita. Se escribe en un archivo temporal y se reemplaza
+    al final, así una falla no deja la salida a medio escribir.
+    """
+    tmp_file = target_file + ".tmp"
+    try:
+        with zipfile.ZipFile(source_file) as zin, zipfile.ZipFile(tmp_file, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                if info.filename == layout.sheet_path:
+                    sheet_info = zipfile.ZipInfo(info.filename, date_time=time.localtime()[:6])
+                    sheet_info.compress_type = zipfile.ZIP_DEFLATED
+                    with zout.open(sheet_info, 'w', force_zip64=True) as out:
+                        result = _splice_sheet(zin, out, layout, *splice_args)
+                else:
+                    with zin.open(info) as src, zout.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst)
+        os.replace(tmp_file, target_file)
+        return result
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+def update_output_file(output_file, input_files, updated_file=None, read_mode='auto', write_mode='streaming',
+                       metrics=None, cache=None, registry=None, exam_catalog=None):
+    """
+    Actualiza una salida existente con los pacientes y estudios de input_files.
+    Devuelve (True, última_fila_de_empleados) o False, como process_excel_file.
+    updated_file: dónde se escribe el resultado (por defecto, la misma salida)
+    read_mode, write_mode, metrics y cache: ver process_excel_file (write_mode
+    solo se usa si hay que escribir la salida completa)
+    registry: PatientRegistry opcional donde se registran los archivos nuevos
+    exam_catalog: orden y sinónimos de los exámenes, como en process_excel_file
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    updated_file = updated_file or output_file
+    log.info(f"Actualizando la salida: {output_file}")
+    
+    try:
+        if not os.path.exists(output_file):
+            log.error(f"La salida {output_file} no existe")
+            return False
+        
+        with metrics.stage('lectura_salida'):
+            matrix = read_output_matrix(output_file)
+        patient_info = matrix.patient_info
+        existing_patients = len(patient_info)
+        log.info(f"[OK] Salida existente: {existing_patients} pacientes, {len(matrix.exams)} exámenes")
+        
+        # Archivos nuevos: se leen y consolidan como en la matriz maestra
+        from .merge import merge_patients
+        
+        parsed_files = []
+        total_rows = 0
+        with metrics.stage('lectura_nuevos'):
+            for input_file in input_files:
+                file_metrics = RunMetrics()
+                company_data, delta_patients, _ = read_input_file(input_file, read_mode, metrics=file_metrics, cache=cache)
+                parsed_files.append((os.path.basename(input_file), company_data, delta_patients))
+                if registry is not None:
+                    registry.record_file(input_file, company_data, delta_patients)
+                total_rows += file_metrics.counters.get('filas_leidas', 0)
+        metrics.count('filas_leidas', total_rows)
+        
+        with metrics.stage('union'):
+            delta_patients, delta_provenance = merge_patients(parsed_files)
+            new, changed, renamed = merge_into_output(patient_info, delta_patients, exam_catalog)
+            
+            # Datos de empresa: se completan solo los campos vacíos
+            company_data = dict(matrix.company_data)
+            for _, delta_company, _ in parsed_files:
+                for field in COMPANY_FIELDS:
+                    if not company_data[field] and delta_company.get(field):
+                        company_data[field] = delta_company[field]
+            company_changed = company_data != matrix.company_data
+        metrics.count('pacientes_nuevos', len(new))
+        metrics.count('pacientes_con_estudios_nuevos', len(changed))
+        log.info(f"[OK] Pacientes nuevos: {len(new)} | con estudios nuevos: {len(changed - renamed)}"
+                 f" | con nombre completado: {len(renamed)}")
+        
+        if not (new or changed or renamed or company_changed):
+            log.info("[OK] La salida ya tiene todos los pacientes y estudios: no se reescribe")
+            if os.path.abspath(updated_file) != os.path.abspath(output_file):
+                shutil.copyfile(output_file, updated_file)
+            return True, (matrix.layout.last_patient_row if matrix.layout else None)
+        
+        from .reader import assign_patient_numbers
+        patient_numbers = assign_patient_numbers(patient_info, total_rows)
+        
+        provenance = None
+        if matrix.has_provenance:
+            # Matriz maestra: el origen de los estudios nuevos se agrega a la hoja "Origen"
+            provenance = read_provenance(output_file)
+            for key, sources in delta_provenance.items():
+                known = provenance.setdefault((key[0], key[1].strip()), [])
+                known.extend(source for source in sources if source not in known)
+        
+        from .catalog import default_exam_catalog
+        from .exams import order_exams
+        from .store import PatientStore
+        from .widths import compute_column_widths
+        
+        # Totales: primero los exámenes que ya tenía la salida, en su orden, y
+        # después los nuevos en el orden en que aparecen en los archivos nuevos
+        canonical = (exam_catalog or default_exam_catalog()).canonical
+        known_exams = list(matrix.exam_totals)
+        known_exams.extend(dict.fromkeys(name for info in delta_patients.values()
+                                         for name in map(canonical, info['estudios'])
+                                         if name and name not in matrix.exam_totals))
+        with metrics.stage('matriz_examenes'):
+            store = PatientStore.from_patient_info(patient_info, patient_numbers, known_exams, exam_catalog)
+            exam_count = store.exam_count()
+            exams_list = order_exams(store.exams, catalog=exam_catalog)
+        
+        layout = matrix.layout
+        if layout is not None:
+            old_widths = compute_column_widths(matrix.exams, existing_patients if layout.cuils else 0, matrix.exam_totals)
+            if layout.cols != _render_cols(old_widths):
+                layout = None
+        if layout is None or provenance is not None or company_changed or exams_list != matrix.exams:
+            # Cambian las columnas o la estructura no es la del escritor de
+            # solo escritura: se escribe la salida completa
+            log.info("Se reescribe la salida completa (cambian las columnas de examen o el formato)")
+            return write_store_output(output_file, updated_file, company_data, store, write_mode, metrics,
+                                      provenance, exam_catalog=exam_catalog)
+        
+        # Solo se generan las filas de pacientes nuevos o con cambios; el resto se copia
+        with metrics.stage('escritura'):
+            order = list(patient_numbers)
+            generated_cuils = set(new) | changed | renamed
+            widths = compute_column_widths(exams_list, len(store), exam_count)
+            copied, generated, last_patient_row = _write_spliced_workbook(
+                output_file, updated_file, layout, order, patient_numbers, patient_info,
+                generated_cuils, exams_list, exam_count, _render_cols(widths))
+        metrics.count('filas_copiadas', copied)
+        metrics.count('filas_generadas', generated)
+        metrics.count('pacientes', len(patient_info))
+        metrics.count('examenes', len(exams_list))
+        
+        log.info(f"[OK] Filas copiadas: {copied} | filas generadas: {generated}")
+        log.info(f"[OK] Archivo guardado como: {updated_file}")
+        log.info(f"   Cantidad de empleados: {len(patient_info)} ({len(new)} nuevos)")
+        log.info(f"   Cantidad de exámenes: {len(exams_list)}")
+        return True, last_patient_row
+    
+    except _LayoutMismatch as e:
+        log.warning(f"No se pudo reescribir la hoja por filas ({e}), se escribe la salida completa")
+        return write_store_output(output_file, updated_file, company_data, store, write_mode, metrics,
+                                  provenance, exam_catalog=exam_catalog)
+    except Exception as e:
+        log.exception(f"Error al actualizar la salida: {str(e)}")
+        return False
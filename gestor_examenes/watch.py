@@ -0,0 +1,163 @@
+# =============================================================================
+# MODO VIGILANCIA (servicio)
+# =============================================================================
+
+import json
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .metrics import log
+from .pipeline import DEFAULT_OUTPUT_FORMATS
+from .batch import (list_input_files, load_manifest, save_manifest, is_up_to_date,
+                    process_file_job, write_captured_output)
+
+def _ignore_termination_signals():
+    """
+    Los procesos del pool ignoran SIGINT/SIGTERM para terminar el archivo en
+    curso: el proceso principal decide cuándo cerrar el pool.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+def watch_folder(carpeta, jobs, poll_interval=2.0, debounce=5.0, force=False,
+                 log_level=logging.INFO, metrics_path=None, cache_dir=None, cache_max_bytes=None,
+                 output_formats=DEFAULT_OUTPUT_FORMATS, registry_path=None, exam_catalog=None,
+                 quality_report=False, memory_cap=None, partition_jobs=1, shards=None):
+    """
+    Vigila la carpeta y procesa los archivos nuevos o modificados hasta recibir
+    SIGTERM/SIGINT. Un archivo se encola recién cuando su tamaño y fecha no
+    cambian durante `debounce` segundos (evita leer archivos a medio copiar).
+    Como mucho hay `jobs` archivos en proceso y otros tantos en espera en el
+    pool; el resto queda pendiente. Se informa la latencia desde la llegada del
+    archivo hasta que se escribe su salida. Con metrics_path, las métricas de
+    cada archivo se agregan a ese archivo como una línea JSON. output_formats:
+    salidas a generar por archivo (ver process_excel_file). registry_path: base
+    SQLite donde se registran los pacientes y estudios de cada archivo.
+    exam_catalog: orden y sinónimos de los exámenes (ver process_excel_file).
+    quality_report: guardar el reporte de calidad de cada archivo en CSV.
+    memory_cap y partition_jobs: consolidación con memoria acotada por
+    particiones en disco (ver process_excel_file).
+    shards: división de la matriz de cada salida en partes (ver process_excel_file).
+    """
+    jobs = max(1, jobs)
+    stop = {'requested': False}
+    
+    def request_stop(signum, frame):
+        log.warning(f"Señal {signum} recibida: se termina al completar los archivos en curso")
+        stop['requested'] = True
+    
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, request_stop)
+    
+    manifest = load_manifest(carpeta)
+    entries = manifest['archivos']
+    
+    # archivo -> {'firma': (tamaño, mtime), 'llegada': t, 'estable_desde': t}
+    observed = {}
+    ready = []
+    # archivo -> (future, firma del archivo entregado al pool)
+    in_flight = {}
+    
+    log.info(f"Vigilando la carpeta: {carpeta}")
+    log.info(f"Procesos en paralelo: {jobs} | intervalo: {poll_interval}s | espera de estabilidad: {debounce}s")
+    log.info("Presione Ctrl+C (o envíe SIGTERM) para detener")
+    
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=_ignore_termination_signals)
+    try:
+        while not stop['requested'] or in_flight:
+            now = time.time()
+            
+            if not stop['requested']:
+                try:
+                    archivos = list_input_files(carpeta)
+                except OSError as e:
+                    log.error(f"Error listando archivos: {e}")
+                    archivos = []
+                
+                for archivo in archivos:
+                    try:
+                        stat = os.stat(os.path.join(carpeta, archivo))
+                    except OSError:
+                        continue
+                    firma = (stat.st_size, stat.st_mtime_ns)
+                    info = observed.get(archivo)
+                    if info is None or info['firma'] != firma:
+                        # Archivo nuevo o que sigue cambiando: reiniciar la espera
+                        llegada = info['llegada'] if info and not info['procesado'] else now
+                        observed[archivo] = {'firma': firma, 'llegada': llegada,
+                                             'estable_desde': now, 'procesado': False}
+                        continue
+                    if (info['procesado'] or archivo in in_flight or archivo in ready
+                            or now - info['estable_desde'] < debounce):
+                        continue
+                    if not force and is_up_to_date(carpeta, archivo, entries.get(archivo), output_formats,
+                                                    exam_catalog, shards):
+                        info['procesado'] = True
+                        continue
+                    ready.append(archivo)
+                
+                for archivo in list(observed):
+                    if archivo not in archivos:
+                        del observed[archivo]
+                
+                # Cola acotada: como mucho 2 * jobs archivos entregados al pool
+                while ready and len(in_flight) < 2 * jobs:
+                    archivo = ready.pop(0)
+                    future = executor.submit(process_file_job, carpeta, archivo,
+                                             log_level, metrics_path is not None,
+                                             cache_dir, cache_max_bytes, output_formats,
+                                             registry_path, exam_catalog, quality_report,
+                                             memory_cap, partition_jobs, shards)
+                    in_flight[archivo] = (future, observed[archivo]['firma'])
+            
+            pool_broken = False
+            for archivo, (future, firma) in list(in_flight.items()):
+                if not future.done():
+                    continue
+                del in_flight[archivo]
+                try:
+                    archivo, ok, salida, entry, run_metrics = future.result()
+                except BrokenProcessPool as e:
+                    ok, entry, run_metrics = False, None, {'ok': False}
+                    salida = f"[ERROR] El proceso terminó inesperadamente: {e}\n"
+                    pool_broken = True
+                
+                log.info(f"\nProcesado: {archivo}")
+                log.info("-" * 40)
+                write_captured_output(salida)
+                info = observed.get(archivo)
+                latency = time.time() - info['llegada'] if info else 0.0
+                if ok:
+                    entries[archivo] = entry
+                    log.info(f"[OK] {archivo}: salida escrita {latency:.2f} s después de su llegada")
+                else:
+                    entries.pop(archivo, None)
+                    log.error(f"{archivo}: falló {latency:.2f} s después de su llegada")
+                # Si el archivo cambió mientras se procesaba, la versión nueva
+                # queda pendiente y se procesa cuando se estabilice
+                if info and info['firma'] == firma:
+                    info['procesado'] = True
+                save_manifest(carpeta, manifest)
+                
+                if metrics_path:
+                    run_metrics.update({'archivo': archivo, 'latencia_segundos': round(latency, 4),
+                                        'fin': time.strftime('%Y-%m-%dT%H:%M:%S')})
+                    with open(metrics_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(run_metrics, ensure_ascii=False) + "\n")
+            
+            # Un proceso caído deja el pool inutilizable: se reemplaza
+            if pool_broken:
+                executor.shutdown(wait=False)
+                executor = ProcessPoolExecutor(max_workers=jobs, initializer=_ignore_termination_signals)
+            
+            time.sleep(poll_interval if not in_flight else min(poll_interval, 0.2))
+    finally:
+        executor.shutdown(wait=True)
+        save_manifest(carpeta, manifest)
+        log.info("Vigilancia detenida")
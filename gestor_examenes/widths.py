@@ -0,0 +1,41 @@
+# =============================================================================
+# ANCHO DE COLUMNAS
+# =============================================================================
+
+import textwrap
+
+# Anchos fijos de las columnas B (Empleado) y C (CUIL)
+FIXED_COLUMN_WIDTHS = {2: 38, 3: 11}
+
+# Margen que agrega Excel al autoajustar una columna (en caracteres)
+AUTOFIT_PADDING = 1.7
+
+# Encabezados de examen rotados 90° con ajuste de texto en una fila de 120 pt:
+# cada renglón admite unos 20 caracteres y ocupa ~2.9 caracteres de ancho
+ROTATED_CHARS_PER_LINE = 20
+ROTATED_LINE_WIDTH = 2.9
+
+def _autofit_width(text_length):
+    return round(text_length + AUTOFIT_PADDING, 2)
+
+def _rotated_header_width(text):
+    lines = len(textwrap.wrap(text, ROTATED_CHARS_PER_LINE)) or 1
+    return round(lines * ROTATED_LINE_WIDTH + AUTOFIT_PADDING, 2)
+
+def compute_column_widths(exams_list, patient_count, exam_count):
+    """
+    Calcula el ancho de cada columna a partir del largo de los textos que se
+    van a escribir (reemplaza el autoajuste que hacía Excel vía xlwings).
+    Columna A: Id, números de paciente (hasta patient_count) y totales; B y
+    C: anchos fijos; exámenes: encabezado rotado o "X", lo que sea más ancho.
+    """
+    id_length = len('Id')
+    if patient_count:
+        id_length = max(id_length, len(str(patient_count)))
+    if exam_count:
+        id_length = max(id_length, len(str(max(exam_count.values()))))
+    
+    widths = [_autofit_width(id_length), FIXED_COLUMN_WIDTHS[2], FIXED_COLUMN_WIDTHS[3]]
+    for exam in exams_list:
+        widths.append(max(_rotated_header_width(exam), _autofit_width(len("X"))))
+    return widths
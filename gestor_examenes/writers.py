@@ -0,0 +1,253 @@
+# =============================================================================
+# ESCRITORES CON OPENPYXL
+# =============================================================================
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font, Border, Side, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+from .metrics import log
+from .pipeline import company_fields
+from .widths import compute_column_widths
+
+# Hoja con el archivo y la empresa de origen de cada estudio
+PROVENANCE_SHEET = "Origen"
+
+# Fuente del encabezado de la hoja "Origen" (la misma en los dos escritores)
+PROVENANCE_HEADER_FONT = Font(bold=True)
+
+def process_excel_file_with_openpyxl(input_file, output_file, company_data, store, exams_list, exam_count, column_widths=None, provenance=None):
+    """
+    Crea el archivo Excel con formato profesional usando openpyxl
+    ORDENANDO ALFABÉTICAMENTE POR NOMBRE (store, el PatientStore de
+    store.py, ya viene en el orden de salida, el de patient_numbers)
+    provenance: filas opcionales (la primera es el encabezado) de la hoja "Origen"
+    """
+    try:
+        # Create a new workbook
+        wb = Workbook()
+        ws = wb.active
+        
+        # Write company data
+        fields = company_fields(company_data)
+        for i, (field, value) in enumerate(fields, start=2):
+            ws.cell(row=i, column=2, value=field).alignment = Alignment(horizontal='center', vertical='center')
+            ws.cell(row=i, column=3, value=value).alignment = Alignment(horizontal='left', vertical='center')
+        
+        # Leave a blank row
+        current_row = len(fields) + 3
+        
+        # Define border style (thin black border)
+        thin_border = Border(
+            left=Side(style='thin', color='000000'),
+            right=Side(style='thin', color='000000'),
+            top=Side(style='thin', color='000000'),
+            bottom=Side(style='thin', color='000000')
+        )
+        
+        # Write headers
+        headers = ['Id', 'Empleado', 'CUIL'] + exams_list
+        for col_idx, header in enumerate(headers, start=1):
+            cell = ws.cell(row=current_row, column=col_idx, value=header)
+            if col_idx > 3:  # For exams
+                cell.alignment = Alignment(text_rotation=90, vertical='bottom', horizontal='center', wrap_text=True)
+            else:
+                cell.alignment = Alignment(vertical='bottom', horizontal='center', wrap_text=True)
+            cell.font = Font(bold=True)
+            cell.border = thin_border
+        
+        # Adjust column widths
+        if column_widths is None:
+            column_widths = compute_column_widths(exams_list, len(store), exam_count)
+        for idx, width in enumerate(column_widths, start=1):
+            col_letter = ws.cell(row=1, column=idx).column_letter
+            ws.column_dimensions[col_letter].width = width
+        
+        # Adjust header row height
+        ws.row_dimensions[current_row].height = 120
+        
+        # Write employee data - ya ordenado alfabéticamente por nombre
+        row_idx = current_row + 1
+        last_employee_row = row_idx
+        
+        exam_columns = store.exam_columns(exams_list)
+        
+        for patient_number, name, cuil, exam_ids in store.rows():
+            ws.cell(row=row_idx, column=1, value=patient_number).border = thin_border
+            ws.cell(row=row_idx, column=2, value=name).border = thin_border
+            ws.cell(row=row_idx, column=3, value=cuil).border = thin_border
+            
+            # Mark exams with X
+            marked_columns = {exam_columns[exam_id] for exam_id in exam_ids}
+            for col_idx in range(4, 4 + len(exams_list)):
+                cell = ws.cell(row=row_idx, column=col_idx)
+                cell.border = thin_border
+                
+                if col_idx - 4 in marked_columns:
+                    cell.value = "X"
+                    cell.alignment = Alignment(horizontal='center', vertical='center')
+            
+            row_idx += 1
+            last_employee_row = row_idx - 1
+        
+        # Add blank row
+        row_idx += 1
+        
+        # Add exam count
+        for exam, count in exam_count.items():
+            ws.cell(row=row_idx, column=1, value=count)
+            ws.cell(row=row_idx, column=2, value=exam)
+            row_idx += 1
+        
+        # Origen de cada estudio (consolidación de varios archivos)
+        if provenance is not None:
+            ws_origen = wb.create_sheet(PROVENANCE_SHEET)
+            for row in provenance:
+                ws_origen.append(row)
+            for cell in ws_origen[1]:
+                cell.font = PROVENANCE_HEADER_FONT
+        
+        # Save the file
+        wb.save(output_file)
+        return True, last_employee_row
+        
+    except Exception as e:
+        log.error(f"Error creando archivo con openpyxl: {e}")
+        return False, None
+
+def _register_output_styles(wb):
+    """
+    Registra en el libro los estilos con nombre que comparten todas las celdas
+    de la matriz (un único estilo por tipo de celda en lugar de uno por celda).
+    """
+    thin_border = Border(
+        left=Side(style='thin', color='000000'),
+        right=Side(style='thin', color='000000'),
+        top=Side(style='thin', color='000000'),
+        bottom=Side(style='thin', color='000000')
+    )
+    styles = [
+        NamedStyle(name='empresa_campo', font=DEFAULT_FONT, border=DEFAULT_BORDER,
+                   alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(name='empresa_valor', font=DEFAULT_FONT, border=DEFAULT_BORDER,
+                   alignment=Alignment(horizontal='left', vertical='center')),
+        NamedStyle(name='encabezado', font=Font(bold=True), border=thin_border,
+                   alignment=Alignment(vertical='bottom', horizontal='center', wrap_text=True)),
+        NamedStyle(name='encabezado_examen', font=Font(bold=True), border=thin_border,
+                   alignment=Alignment(text_rotation=90, vertical='bottom', horizontal='center', wrap_text=True)),
+        NamedStyle(name='celda', font=DEFAULT_FONT, border=thin_border),
+        NamedStyle(name='celda_marcada', font=DEFAULT_FONT, border=thin_border,
+                   alignment=Alignment(horizontal='center', vertical='center')),
+    ]
+    for style in styles:
+        wb.add_named_style(style)
+
+def _styled_cell(ws, value, style):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+def write_company_block(ws, company_data):
+    """Escribe el bloque de empresa (fila 1 en blanco) en una hoja de solo escritura"""
+    ws.append([])
+    for field, value in company_fields(company_data):
+        ws.append([None, _styled_cell(ws, field, 'empresa_campo'), _styled_cell(ws, value, 'empresa_valor')])
+
+def write_matrix_sheet(ws, company_data, store, exams_list, exam_count, column_widths):
+    """
+    Escribe la matriz en una hoja de solo escritura de un libro con los estilos
+    de _register_output_styles: empresa, encabezados, una fila por paciente de
+    store (con sus Id) y recuento por examen. Devuelve la última fila de empleados.
+    """
+    header_row = len(company_fields(company_data)) + 3
+    
+    # En modo solo escritura las dimensiones se definen antes de escribir filas
+    for idx, width in enumerate(column_widths, start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+    ws.row_dimensions[header_row].height = 120
+    
+    # Datos de empresa
+    write_company_block(ws, company_data)
+    
+    # Fila en blanco y encabezados
+    ws.append([])
+    headers = [_styled_cell(ws, header, 'encabezado') for header in ['Id', 'Empleado', 'CUIL']]
+    headers += [_styled_cell(ws, exam, 'encabezado_examen') for exam in exams_list]
+    ws.append(headers)
+    
+    # Celdas de examen compartidas: se serializan al escribir cada fila
+    empty_cell = _styled_cell(ws, None, 'celda')
+    marked_cell = _styled_cell(ws, "X", 'celda_marcada')
+    
+    # Write employee data - ya ordenado alfabéticamente por nombre
+    row_idx = header_row + 1
+    last_employee_row = row_idx
+    
+    exam_columns = store.exam_columns(exams_list)
+    empty_exam_cells = [empty_cell] * len(exams_list)
+    
+    for patient_number, name, cuil, exam_ids in store.rows():
+        exam_cells = list(empty_exam_cells)
+        for exam_id in exam_ids:
+            exam_cells[exam_columns[exam_id]] = marked_cell
+        row = [
+            _styled_cell(ws, patient_number, 'celda'),
+            _styled_cell(ws, name, 'celda'),
+            _styled_cell(ws, cuil, 'celda')
+        ]
+        row.extend(exam_cells)
+        ws.append(row)
+        
+        last_employee_row = row_idx
+        row_idx += 1
+    
+    # Fila en blanco y recuento de exámenes
+    ws.append([])
+    for exam, count in exam_count.items():
+        ws.append([count, exam])
+    return last_employee_row
+
+def process_excel_file_with_openpyxl_streaming(input_file, output_file, company_data, store, exams_list, exam_count, column_widths=None, provenance=None):
+    """
+    Crea el archivo Excel con el mismo formato que process_excel_file_with_openpyxl
+    usando openpyxl en modo solo escritura: las filas se escriben a medida que se
+    generan y todas las celdas comparten estilos con nombre.
+    ORDENANDO ALFABÉTICAMENTE POR NOMBRE (store, el PatientStore de
+    store.py, ya viene en el orden de salida, el de patient_numbers)
+    provenance: filas opcionales (la primera es el encabezado) de la hoja "Origen"
+    """
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        _register_output_styles(wb)
+        
+        if column_widths is None:
+            column_widths = compute_column_widths(exams_list, len(store), exam_count)
+        last_employee_row = write_matrix_sheet(ws, company_data, store, exams_list, exam_count, column_widths)
+        
+        # Origen de cada estudio (consolidación de varios archivos)
+        if provenance is not None:
+            write_provenance_sheet(wb, provenance)
+        
+        wb.save(output_file)
+        return True, last_employee_row
+        
+    except Exception as e:
+        log.error(f"Error creando archivo con openpyxl (solo escritura): {e}")
+        return False, None
+
+def write_provenance_sheet(wb, provenance):
+    """Agrega la hoja "Origen" a un libro de solo escritura (la primera fila es el encabezado)"""
+    ws_origen = wb.create_sheet(PROVENANCE_SHEET)
+    rows = iter(provenance)
+    headers = []
+    for header in next(rows):
+        cell = WriteOnlyCell(ws_origen, value=header)
+        cell.font = PROVENANCE_HEADER_FONT
+        headers.append(cell)
+    ws_origen.append(headers)
+    for row in rows:
+        ws_origen.append(row)
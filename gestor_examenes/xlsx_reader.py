@@ -0,0 +1,576 @@
+# =============================================================================
+# LECTURA DIRECTA DEL XLSX (XML de la hoja)
+# =============================================================================
+#
+# Lee la primera hoja directamente del zip del .xlsx y decodifica solo las
+# columnas que usa el proceso (B, C, E, G, H, I, J, L, O, P y Q). El XML de la
+# hoja se procesa por bloques con expresiones regulares sobre las celdas de
+# esas columnas; las demás celdas no se convierten. sharedStrings, styles
+# (formatos de fecha) y workbook (sistema de fechas 1904) se leen aparte.
+#
+# Los valores quedan igual que con pd.read_excel(header=None): vacíos, errores
+# y textos NA como None, float enteros como int, fechas como datetime; y las
+# filas vacías del final se descartan. Si la hoja tiene una estructura que
+# este lector no reconoce se lanza UnsupportedSheetError y el proceso vuelve
+# al lector de pandas.
+
+import codecs
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+import pandas as pd
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import from_excel, from_ISO8601, WINDOWS_EPOCH, MAC_EPOCH
+
+from .metrics import log, RunMetrics
+from .reader import (COMPANY_DATA_COLUMNS, _infer_like_read_excel, extract_company_data_fixed_positions,
+                     consolidate_patient_columns, assign_patient_numbers)
+from .streaming import PANDAS_NA_VALUES, STREAMING_MAX_COL, _as_number, _text_value
+
+# Columnas que se decodifican: letra -> índice (0 = A)
+NEEDED_COLUMNS = {'B': 1, 'C': 2, 'E': 4, 'G': 6, 'H': 7, 'I': 8, 'J': 9, 'L': 11, 'O': 14, 'P': 15, 'Q': 16}
+
+# Columnas de pacientes: CUIL (C), apellido y nombre (P), descripción (E)
+CUIL_COL, NOMBRE_COL, DESCRIPCION_COL = 2, 15, 4
+
+# Rango de int64: read_excel pasa a float las columnas con enteros mayores
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# Columnas P y Q: si tienen datos, read_excel tiene la columna de nombres
+PATIENT_LETTERS = frozenset('PQ')
+
+# Máximo de celdas distintas decodificadas que se recuerdan
+MEMO_MAX_CELLS = 1_000_000
+
+# Tamaño de cada bloque del XML de la hoja que se procesa de una vez
+CHUNK_SIZE = 8 * 1024 * 1024
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+# Columnas leídas (índice -> lista de valores por fila, desde la fila 1 de la
+# hoja), cantidad de filas hasta la última con datos y si la hoja llega a la
+# columna P (sin ella read_excel no tiene la columna de nombres)
+SheetColumns = namedtuple('SheetColumns', ['columns', 'rows', 'has_patient_columns'])
+
+class UnsupportedSheetError(ValueError):
+    """La hoja usa una estructura XML que la lectura directa no reconoce"""
+
+_ENTITY_RE = re.compile(r'&(?:#(\d+)|#x([0-9a-fA-F]+)|(amp|lt|gt|quot|apos));')
+_ENTITIES = {'amp': '&', 'lt': '<', 'gt': '>', 'quot': '"', 'apos': "'"}
+
+def _replace_entity(match):
+    decimal, hexadecimal, name = match.groups()
+    if name:
+        return _ENTITIES[name]
+    return chr(int(decimal) if decimal else int(hexadecimal, 16))
+
+def _xml_text(text):
+    """Texto de un nodo XML tal como lo entrega un parser (fines de línea y entidades)"""
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if '&' in text:
+        text = _ENTITY_RE.sub(_replace_entity, text)
+    return text
+
+class _SheetPatterns:
+    """Expresiones regulares para un prefijo de espacio de nombres dado ('' o 'x:')"""
+    
+    def __init__(self, prefix):
+        p = re.escape(prefix)
+        letters = '|'.join(sorted(NEEDED_COLUMNS, key=len, reverse=True))
+        self.cell_start = f'<{prefix}c '
+        self.cell_with_ref = f'<{prefix}c r="'
+        self.bare_cell = f'<{prefix}c>'
+        self.cell_end = f'</{prefix}c>'
+        self.row_end = f'</{prefix}row>'
+        self.value_open = f'<{prefix}v>'
+        self.value_close = f'</{prefix}v>'
+        self.inline_open = f'<{prefix}is>'
+        self.inline_close = f'</{prefix}is>'
+        self.text_open = f'<{prefix}t>'
+        self.text_close = f'</{prefix}t>'
+        # Celdas de las columnas que se usan: (columna, fila, atributos y contenido)
+        self.needed_cell = re.compile(
+            rf'<{p}c r="({letters})(\d+)"([^>]*?(?:/>|>.*?</{p}c>))', re.S)
+        # Fila completa: (número, contenido; None si es <row/>)
+        self.row = re.compile(rf'<{p}row r="(\d+)"[^>]*?(?:/>|>(.*?)</{p}row>)', re.S)
+        # Cualquier celda con contenido que empieza en una posición dada
+        self.any_cell = re.compile(rf'<{p}c r="([A-Z]+)(\d+)"([^>]*)(?<!/)>(.*?)</{p}c>', re.S)
+        # Celdas con contenido de columnas posteriores a Q
+        self.cell_after_q = re.compile(
+            rf'<{p}c r="(?:[R-Z]|[A-Z]{{2,3}})\d+"([^>]*)(?<!/)>(.*?)</{p}c>', re.S)
+        self.value = re.compile(rf'<{p}v(?:\s[^>]*)?(?<!/)>(.*?)</{p}v>', re.S)
+        self.inline = re.compile(rf'<{p}is(?:\s[^>]*)?(?<!/)>(.*?)</{p}is>', re.S)
+        self.phonetic = re.compile(rf'<{p}rPh\b.*?</{p}rPh>', re.S)
+        self.text = re.compile(rf'<{p}t(?:\s[^>]*)?(?<!/)>(.*?)</{p}t>', re.S)
+    
+    def rich_text(self, content):
+        """Texto de un <si>/<is>: el <t> directo más los <t> de cada tramo, sin fonética"""
+        if '<' not in content:
+            return ''
+        content = self.phonetic.sub('', content)
+        return ''.join(_xml_text(text) for text in self.text.findall(content))
+
+class _Workbook:
+    """Partes del libro que necesita la lectura: hoja, textos compartidos, estilos y fechas"""
+    
+    def __init__(self, zf):
+        self.zf = zf
+        names = set(zf.namelist())
+        workbook_path = self._office_document(names)
+        base = posixpath.dirname(workbook_path)
+        rels = self._relationships(posixpath.join(base, '_rels', posixpath.basename(workbook_path) + '.rels'), base)
+        
+        root = ET.fromstring(zf.read(workbook_path))
+        sheets = root.findall(f'{{{MAIN_NS}}}sheets/{{{MAIN_NS}}}sheet')
+        if not sheets:
+            raise UnsupportedSheetError("el libro no tiene hojas")
+        self.sheet_names = [sheet.get('name') for sheet in sheets]
+        sheet = sheets[0]
+        self.sheet_path = rels.get(sheet.get(f'{{{REL_NS}}}id'), (None, None))[1]
+        if self.sheet_path not in names:
+            raise UnsupportedSheetError("no se encontró la primera hoja")
+        
+        properties = root.find(f'{{{MAIN_NS}}}workbookPr')
+        date1904 = properties.get('date1904') if properties is not None else None
+        self.epoch = MAC_EPOCH if date1904 not in (None, 'false', 'f', '0') else WINDOWS_EPOCH
+        
+        by_type = {rel_type.rsplit('/', 1)[-1]: target for rel_type, target in rels.values()}
+        self.shared_strings_path = by_type.get('sharedStrings')
+        self.date_formats, self.timedelta_formats = self._date_styles(by_type.get('styles'), names)
+    
+    def _office_document(self, names):
+        try:
+            root = ET.fromstring(self.zf.read('_rels/.rels'))
+            for rel in root.iter(f'{{{PKG_REL_NS}}}Relationship'):
+                if rel.get('Type', '').endswith('/officeDocument'):
+                    return rel.get('Target').lstrip('/')
+        except KeyError:
+            pass
+        if 'xl/workbook.xml' in names:
+            return 'xl/workbook.xml'
+        raise UnsupportedSheetError("no se encontró workbook.xml")
+    
+    def _relationships(self, path, base):
+        """Id -> (tipo, ruta dentro del zip)"""
+        rels = {}
+        try:
+            root = ET.fromstring(self.zf.read(path))
+        except KeyError:
+            return rels
+        for rel in root.iter(f'{{{PKG_REL_NS}}}Relationship'):
+            target = rel.get('Target', '')
+            target = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(base, target))
+            rels[rel.get('Id')] = (rel.get('Type', ''), target)
+        return rels
+    
+    def _date_styles(self, styles_path, names):
+        """Índices de estilos de celda con formato de fecha y de duración (como openpyxl)"""
+        date_formats, timedelta_formats = set(), set()
+        if styles_path not in names:
+            return date_formats, timedelta_formats
+        root = ET.fromstring(self.zf.read(styles_path))
+        custom = {int(fmt.get('numFmtId')): fmt.get('formatCode')
+                  for fmt in root.iter(f'{{{MAIN_NS}}}numFmt')}
+        cell_xfs = root.find(f'{{{MAIN_NS}}}cellXfs')
+        for idx, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+            fmt_id = int(xf.get('numFmtId', 0))
+            fmt = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+            if is_date_format(fmt):
+                date_formats.add(idx)
+            if is_timedelta_format(fmt):
+                timedelta_formats.add(idx)
+        return date_formats, timedelta_formats
+    
+    def shared_strings(self):
+        """Tabla de textos compartidos (mismo contenido que entrega openpyxl)"""
+        if not self.shared_strings_path:
+            return []
+        xml = self.zf.read(self.shared_strings_path).decode('utf-8')
+        prefix = _namespace_prefix(xml, 'sst')
+        patterns = _SheetPatterns(prefix)
+        p = re.escape(prefix)
+        items = re.findall(rf'<{p}si(?:\s[^>]*)?(?<!/)>(.*?)</{p}si>|<{p}si\s*/>', xml, re.S)
+        plain_open, plain_close = patterns.text_open, patterns.text_close
+        strings = []
+        for item in items:
+            # Caso más común: un único <t> sin formato
+            if item.startswith(plain_open) and item.endswith(plain_close) and '<' not in item[len(plain_open):-len(plain_close)]:
+                text = _xml_text(item[len(plain_open):-len(plain_close)])
+            else:
+                text = patterns.rich_text(item)
+            strings.append(text.replace('x005F_', '') if 'x005F_' in text else text)
+        return strings
+
+def _namespace_prefix(head, root_tag):
+    match = re.search(rf'<(\w+:)?{root_tag}\b', head)
+    if match is None:
+        raise UnsupportedSheetError(f"no se encontró el elemento {root_tag}")
+    return match.group(1) or ''
+
+def _attribute(attrs, name):
+    start = attrs.find(f' {name}="')
+    if start < 0:
+        return None
+    start += len(name) + 3
+    return attrs[start:attrs.index('"', start)]
+
+def _cast_number(text):
+    if '.' in text or 'E' in text or 'e' in text:
+        return float(text)
+    return int(text)
+
+def _normalize(raw):
+    """Valor de openpyxl -> (valor como pd.read_excel, la celda cuenta como dato)"""
+    if raw is None or raw == '':
+        return None, False
+    if isinstance(raw, str):
+        return (None if raw in PANDAS_NA_VALUES else raw), True
+    if isinstance(raw, float) and raw.is_integer():
+        return int(raw), True
+    return raw, True
+
+class _CellDecoder:
+    """Convierte una celda (atributos + contenido XML) en el valor que lee pandas"""
+    
+    ERROR = object()
+    
+    def __init__(self, workbook, shared_strings, patterns):
+        self.epoch = workbook.epoch
+        self.date_formats = workbook.date_formats
+        self.timedelta_formats = workbook.timedelta_formats
+        self.shared_strings = shared_strings
+        self.patterns = patterns
+        # Textos compartidos ya normalizados (se usan en casi todas las celdas)
+        self.shared_values = [_normalize(text) for text in shared_strings]
+        # Atributos de celda -> (tipo, estilo): se repiten en toda la hoja
+        self.kinds = {}
+        self.inline_open = f'{patterns.inline_open}{patterns.text_open}'
+        self.inline_close = f'{patterns.text_close}{patterns.inline_close}'
+    
+    def kind(self, attrs):
+        kind = self.kinds.get(attrs)
+        if kind is None:
+            data_type = _attribute(attrs, 't') or 'n'
+            style = _attribute(attrs, 's')
+            style = int(style) if style else 0
+            if data_type == 'n' and style in self.date_formats:
+                data_type = 'fecha'
+            kind = self.kinds[attrs] = (data_type, style)
+        return kind
+    
+    def raw(self, attrs, content):
+        """Valor como lo entrega openpyxl (data_only), o ERROR para celdas de error"""
+        data_type, style = self.kind(attrs)
+        if data_type == 'inlineStr':
+            match = self.patterns.inline.search(content)
+            return self.patterns.rich_text(match.group(1)) if match else None
+        if not content:
+            return None
+        if content.startswith(self.patterns.value_open) and content.endswith(self.patterns.value_close):
+            text = content[len(self.patterns.value_open):-len(self.patterns.value_close)]
+        else:
+            match = self.patterns.value.search(content)
+            text = match.group(1) if match else None
+        if not text:
+            return None
+        if data_type == 'n':
+            return _cast_number(text)
+        if data_type == 'fecha':
+            try:
+                return from_excel(_cast_number(text), self.epoch, timedelta=style in self.timedelta_formats)
+            except (OverflowError, ValueError):
+                return self.ERROR
+        if data_type == 's':
+            return self.shared_strings[int(text)]
+        if data_type == 'b':
+            return bool(int(text))
+        if data_type == 'e':
+            return self.ERROR
+        if data_type == 'd':
+            return from_ISO8601(text)
+        return _xml_text(text)
+    
+    def cell(self, cell):
+        """Valor de una celda a partir del texto que sigue a su referencia"""
+        if cell.endswith('/>'):
+            return None, False
+        attrs, _, content = cell.partition('>')
+        return self.value(attrs, content[:-len(self.patterns.cell_end)])
+    
+    def value(self, attrs, content):
+        """Valor normalizado como pd.read_excel: (valor, la celda cuenta como dato)"""
+        data_type = self.kinds[attrs][0] if attrs in self.kinds else self.kind(attrs)[0]
+        patterns = self.patterns
+        # Casos frecuentes sin pasar por raw(): texto compartido, número y texto en línea
+        if data_type in ('s', 'n') and content.startswith(patterns.value_open) and content.endswith(patterns.value_close):
+            text = content[len(patterns.value_open):-len(patterns.value_close)]
+            if text and '<' not in text:
+                if data_type == 's':
+                    return self.shared_values[int(text)]
+                if '.' in text or 'E' in text or 'e' in text:
+                    number = float(text)
+                    return (int(number) if number.is_integer() else number), True
+                return int(text), True
+        elif data_type == 'inlineStr' and content.startswith(self.inline_open) and content.endswith(self.inline_close):
+            text = content[len(self.inline_open):-len(self.inline_close)]
+            if '<' not in text:
+                return _normalize(_xml_text(text))
+        raw = self.raw(attrs, content)
+        if raw is self.ERROR:
+            return None, True
+        return _normalize(raw)
+
+def iter_sheet_blocks(stream):
+    """
+    Devuelve el XML de una hoja (stream abierto desde el zip) en bloques que
+    terminan en un fin de fila. El primer valor es el prefijo de espacio de
+    nombres de los elementos ('' o 'x:').
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    row_end = None
+    while True:
+        data = stream.read(CHUNK_SIZE)
+        text = pending + decoder.decode(data, final=not data)
+        if row_end is None:
+            head = text[:4096]
+            encoding = re.match(r'<\?xml[^>]*encoding="([^"]+)"', head)
+            if encoding and encoding.group(1).lower().replace('-', '') != 'utf8':
+                raise UnsupportedSheetError(f"codificación no soportada: {encoding.group(1)}")
+            prefix = _namespace_prefix(head, 'worksheet')
+            row_end = f'</{prefix}row>'
+            yield prefix
+        if not data:
+            if text:
+                yield text
+            return
+        cut = text.rfind(row_end)
+        if cut < 0:
+            pending = text
+            continue
+        cut += len(row_end)
+        pending = text[cut:]
+        yield text[:cut]
+
+# Fila de la hoja con todas sus columnas: número de fila, {columna (desde 1):
+# valor}, XML completo de la fila y XML de sus celdas
+SheetRow = namedtuple('SheetRow', ['row', 'values', 'xml', 'content'])
+
+class SheetXmlReader:
+    """
+    Recorre la primera hoja de un .xlsx abierto (zf) por bloques de XML y
+    decodifica todas las columnas de cada fila, para quien además necesita el
+    XML de la hoja (ver update.py). Los valores son los de openpyxl
+    (data_only); las celdas vacías y las de error se omiten.
+    sheet_path y sheet_names: ruta de la hoja en el zip y nombres de las hojas
+    del libro; prefix: prefijo de espacio de nombres de la hoja (se conoce al
+    leer el primer bloque)
+    """
+    
+    def __init__(self, zf):
+        self.zf = zf
+        self._workbook = _Workbook(zf)
+        self.sheet_path = self._workbook.sheet_path
+        self.sheet_names = self._workbook.sheet_names
+        self.prefix = None
+        self._patterns = self._decoder = None
+        self._memo = {}
+    
+    def blocks(self):
+        """Bloques del XML de la hoja que terminan en un fin de fila"""
+        with self.zf.open(self.sheet_path) as stream:
+            blocks = iter_sheet_blocks(stream)
+            self.prefix = next(blocks)
+            self._patterns = patterns = _SheetPatterns(self.prefix)
+            self._decoder = _CellDecoder(self._workbook, self._workbook.shared_strings(), patterns)
+            for block in blocks:
+                # Solo se reconocen celdas con la referencia como primer atributo
+                if block.count(patterns.cell_start) + block.count(patterns.bare_cell) != block.count(patterns.cell_with_ref):
+                    raise UnsupportedSheetError("celdas sin referencia (r) como primer atributo")
+                yield block
+    
+    def rows(self, block):
+        """SheetRow de cada fila de un bloque de blocks()"""
+        memo, decoder = self._memo, self._decoder
+        for row_match in self._patterns.row.finditer(block):
+            content = row_match.group(2) or ''
+            values = {}
+            for cell in self._patterns.any_cell.finditer(content):
+                # Las celdas con el mismo XML se decodifican una vez
+                key = (cell.group(3), cell.group(4))
+                value = memo.get(key)
+                if value is None:
+                    if len(memo) >= MEMO_MAX_CELLS:
+                        memo.clear()
+                    value = memo[key] = decoder.raw(*key)
+                if value is not decoder.ERROR and value is not None and value != '':
+                    values[column_index_from_string(cell.group(1))] = value
+            yield SheetRow(int(row_match.group(1)), values, row_match.group(0), content)
+
+def read_sheet_columns(input_file):
+    """
+    Lee la primera hoja del .xlsx y devuelve SheetColumns con las columnas de
+    NEEDED_COLUMNS como listas de valores (la fila 0 es el encabezado).
+    """
+    with zipfile.ZipFile(input_file) as zf:
+        workbook = _Workbook(zf)
+        shared_strings = workbook.shared_strings()
+        
+        columns = {idx: [] for idx in NEEDED_COLUMNS.values()}
+        by_letter = {letter: columns[idx] for letter, idx in NEEDED_COLUMNS.items()}
+        memo = {}
+        last_data_row = -1
+        has_patient_columns = False
+        
+        with zf.open(workbook.sheet_path) as stream:
+            blocks = iter_sheet_blocks(stream)
+            patterns = _SheetPatterns(next(blocks))
+            decoder = _CellDecoder(workbook, shared_strings, patterns)
+            for block in blocks:
+                # Solo se reconocen celdas con la referencia como primer atributo
+                if block.count(patterns.cell_start) + block.count(patterns.bare_cell) != block.count(patterns.cell_with_ref):
+                    raise UnsupportedSheetError("celdas sin referencia (r) como primer atributo")
+                
+                for letter, row, cell in patterns.needed_cell.findall(block):
+                    # Las celdas con el mismo XML (textos compartidos, datos de
+                    # empresa repetidos en cada fila) se decodifican una vez
+                    decoded = memo.get(cell)
+                    if decoded is None:
+                        if len(memo) >= MEMO_MAX_CELLS:
+                            memo.clear()
+                        decoded = memo[cell] = decoder.cell(cell)
+                    if not decoded[1]:
+                        continue
+                    row = int(row) - 1
+                    values = by_letter[letter]
+                    if len(values) < row:
+                        values.extend([None] * (row - len(values)))
+                    elif len(values) > row:
+                        raise UnsupportedSheetError("filas fuera de orden")
+                    values.append(decoded[0])
+                    if letter in PATIENT_LETTERS:
+                        has_patient_columns = True
+                
+                last_data_row = max(last_data_row, _last_data_row(block, patterns, decoder))
+            
+            if not has_patient_columns and last_data_row >= 0:
+                has_patient_columns = _has_data_after_q(zf, workbook.sheet_path, patterns, decoder)
+        
+        rows = last_data_row + 1
+        for values in columns.values():
+            values.extend([None] * (rows - len(values)))
+        return SheetColumns(columns, rows, has_patient_columns)
+
+def _last_data_row(block, patterns, decoder):
+    """Fila (desde 0) de la última celda con datos del bloque, buscando desde el final"""
+    end = len(block)
+    while True:
+        end = block.rfind(patterns.cell_end, 0, end)
+        if end < 0:
+            return -1
+        start = block.rfind(patterns.cell_with_ref, 0, end)
+        match = patterns.any_cell.match(block, start)
+        if match is None:
+            raise UnsupportedSheetError("celda con estructura no reconocida")
+        _, has_data = decoder.value(match.group(3), match.group(4))
+        if has_data:
+            return int(match.group(2)) - 1
+        end = start
+
+def _has_data_after_q(zf, sheet_path, patterns, decoder):
+    """
+    True si alguna celda posterior a la columna Q tiene datos: en ese caso
+    read_excel tiene la columna P aunque esté vacía (caso poco común, se
+    recorre la hoja otra vez).
+    """
+    with zf.open(sheet_path) as stream:
+        blocks = iter_sheet_blocks(stream)
+        next(blocks)
+        for block in blocks:
+            for attrs, content in patterns.cell_after_q.findall(block):
+                if decoder.value(attrs, content)[1]:
+                    return True
+    return False
+
+def _company_value(column):
+    """
+    Valor de la primera fila de datos con el tipo que infiere read_excel (con
+    encabezado) para la columna: un texto no numérico deja la columna como
+    está; una columna de números con vacíos o decimales pasa a float.
+    """
+    values = column[1:]
+    first = values[0]
+    plain = isinstance(column[0], str)
+    has_float = False
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, str):
+            if _as_number(value) is None:
+                return first
+            plain = False
+        elif isinstance(value, float):
+            if not value.is_integer():
+                has_float = True
+        elif isinstance(value, bool) or not isinstance(value, int) or not INT64_MIN <= value <= INT64_MAX:
+            plain = False
+    if not plain:
+        # Encabezado no textual, números como texto, fechas, booleanos o enteros fuera
+        # de int64 (poco comunes en estas columnas): se infieren los tipos con
+        # pandas, primero sobre la columna completa como read_excel(header=None)
+        series = pd.Series(column, dtype=object).infer_objects()
+        return _infer_like_read_excel(series.iloc[1:]).iloc[0]
+    if first is None:
+        return None
+    number = float(first)
+    return number if (has_float or None in values) else int(number)
+
+def _company_frame(sheet):
+    """
+    Primera fila de datos con los tipos de read_excel en las columnas de
+    empresa, para extract_company_data_fixed_positions.
+    """
+    if sheet.rows <= 1:
+        return pd.DataFrame()
+    first_row = [None] * STREAMING_MAX_COL
+    for col in COMPANY_DATA_COLUMNS:
+        first_row[col] = _company_value(sheet.columns[col])
+    return pd.DataFrame([first_row], dtype=object)
+
+def process_excel_xml(input_file, metrics=None, recorder=None):
+    """
+    Lee el archivo con la lectura directa del XML y devuelve
+    (company_data, patient_info, patient_numbers), igual que el modo pandas.
+    recorder: ColumnRecorder opcional que recibe las columnas leídas (caché)
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+    
+    with metrics.stage('lectura'):
+        sheet = read_sheet_columns(input_file)
+    total_rows = max(sheet.rows - 1, 0)
+    log.info(f"Archivo leído (lectura directa): {total_rows} filas")
+    
+    with metrics.stage('empresa'):
+        company_data = extract_company_data_fixed_positions(_company_frame(sheet))
+    
+    log.info("\nUsando lógica de fix_de_id.py con ordenamiento alfabético...")
+    with metrics.stage('consolidacion'):
+        log.info(f"Procesando {sheet.rows} filas...")
+        patient_info = {}
+        if sheet.has_patient_columns:
+            columns = tuple([_text_value(value) for value in sheet.columns[col][1:]]
+                            for col in (CUIL_COL, NOMBRE_COL, DESCRIPCION_COL))
+            if recorder is not None:
+                recorder.extend(*columns)
+            patient_info = consolidate_patient_columns(*columns, metrics)
+        patient_numbers = assign_patient_numbers(patient_info, sheet.rows - 1)
+        if recorder is not None:
+            recorder.total_rows = total_rows
+    return company_data, patient_info, patient_numbers
@@ -0,0 +1,166 @@
+# =============================================================================
+# LIBROS DE PRUEBA
+# =============================================================================
+#
+# Las pruebas comparan los distintos caminos de lectura y consolidación sobre
+# los mismos libros: el ejemplo del repositorio (EXCEL_EJEMPLO.xlsx, guardado
+# por Excel) y un libro armado acá con openpyxl que junta los casos difíciles:
+# - el mismo CUIL escrito con guiones, puntos, espacios, como número entero
+#   y como decimal ("20123456786.0")
+# - CUIL vacíos, cortos, con letras, con dígito verificador inválido y
+#   encabezados "CUIL" repetidos en medio de la hoja
+# - filas completamente vacías en medio de la hoja (cuentan como CUIL vacío)
+#   y al final (se descartan, como en read_excel)
+# - un CUIL con nombres distintos y pacientes distintos con el mismo nombre
+# - nombres con acentos, Ñ y minúsculas (orden del español)
+# - descripciones vacías, con espacios en los extremos, con mayúsculas
+#   distintas y pares paciente-examen repetidos
+
+import os
+import random
+import sys
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+SAMPLE_WORKBOOK = os.path.join(REPO_DIR, "EXCEL_EJEMPLO.xlsx")
+
+HEADER = [
+    'DATO SIN USO', 'CUIT', 'CUIL', 'Examen', 'Desc_Examen', 'FECHA DERIVACION',
+    'CONTRATO', 'RAZON SOCIAL', 'MAIL', 'DOMICILIO', 'LOCALIDAD', 'PROVINCIA', 'CP',
+    'COLUMNA SIN USO', 'TELEFONO', 'Nombre_Apellido', 'LOCALIDAD', 'PROVINCIA'
+]
+
+COMPANY = {1: '30712345678', 6: 'CONTRATO 001', 7: 'SA DE PRUEBA', 8: 'contacto@prueba.com',
+           9: 'Calle Falsa 123', 11: 'BUENOS AIRES', 14: '1144445555', 16: 'CABA'}
+
+NAMES = ['ÁLVAREZ, JUAN', 'ALVAREZ, ANA', 'álvarez, luis', 'NUÑEZ, MARÍA', 'NUNEZ, JOSÉ', 'ÑANDÚ, SOFÍA',
+         'OJEDA, CARLOS', 'ZAPATA, LUCÍA', 'GARCÍA, JORGE', 'GOMEZ, MARTÍN', 'PÉREZ, ANA', 'PEREZ, ANA']
+
+EXAMS = ['EXAMEN CLINICO', 'AUDIOMETRIA', 'Audiometria', 'ESPIROMETRIA', ' RX DE TORAX ', 'RX DE TORAX',
+         'LABORATORIO BASICO', 'ELECTROCARDIOGRAMA', '']
+
+CUIL_WEIGHTS = [5, 4, 3, 2, 7, 6, 5, 4, 3, 2]
+
+def valid_cuil(dni, prefix=20):
+    """CUIL de 11 dígitos con verificador módulo 11 válido"""
+    base = f"{prefix}{dni:08d}"
+    check = 11 - sum(int(d) * w for d, w in zip(base, CUIL_WEIGHTS)) % 11
+    if check == 10:
+        return valid_cuil(dni, 23)
+    return f"{base}{0 if check == 11 else check}"
+
+def cuil_variants(cuil):
+    """Formas en que aparece el mismo CUIL en las exportaciones"""
+    return [cuil, f"{cuil[:2]}-{cuil[2:10]}-{cuil[10]}", f"{cuil[:2]}.{cuil[2:10]}.{cuil[10]}",
+            f" {cuil} ", int(cuil), float(cuil), f"{cuil}.0"]
+
+def mixed_rows(patients=80, rows=600, seed=7):
+    """Filas (cuil, nombre, descripción) del libro de casos mixtos"""
+    rng = random.Random(seed)
+    people = [(valid_cuil(10_000_000 + i), NAMES[i % len(NAMES)] + ('' if i < len(NAMES) else f' {i}'))
+              for i in range(patients)]
+    # Dos pacientes distintos con el mismo nombre exacto
+    people[-1] = (people[-1][0], people[0][1])
+    
+    data = []
+    for _ in range(rows):
+        cuil, nombre = rng.choice(people)
+        data.append((rng.choice(cuil_variants(cuil)), nombre, rng.choice(EXAMS)))
+    
+    # Un CUIL con dos nombres, filas que se descartan y un verificador inválido
+    data.insert(5, (people[3][0], 'NUÑEZ MARIA', 'AUDIOMETRIA'))
+    data.insert(40, ('CUIL', 'Nombre_Apellido', 'Desc_Examen'))
+    data.insert(41, ('', 'SIN CUIL', 'EXAMEN CLINICO'))
+    data.insert(42, (None, 'SIN CUIL', 'EXAMEN CLINICO'))
+    data.insert(43, ('1234', 'CUIL CORTO', 'EXAMEN CLINICO'))
+    data.insert(44, ('20-ABCDEFGH-1', 'CUIL CON LETRAS', 'EXAMEN CLINICO'))
+    data.insert(45, ('20100000001', 'VERIFICADOR INVALIDO', 'RX DE TORAX'))
+    data.insert(300, ('cuil', 'Nombre_Apellido', 'Desc_Examen'))
+    data[350:350] = [None, None]
+    return data + [None] * 5
+
+def write_workbook(path, data):
+    """Escribe las filas con el diseño de columnas de las exportaciones (None: fila vacía)"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADER)
+    for values in data:
+        row = [None] * len(HEADER)
+        if values is None:
+            # Fila con formato y sin valores, como las que deja Excel al final de la hoja
+            ws.append([WriteOnlyCell(ws, value=None) for _ in row])
+            continue
+        cuil, nombre, descripcion = values
+        for col, value in COMPANY.items():
+            row[col] = value
+        row[2], row[4], row[15] = cuil, descripcion, nombre
+        ws.append(row)
+    wb.save(path)
+    return path
+
+@pytest.fixture(scope='session')
+def mixed_workbook(tmp_path_factory):
+    return write_workbook(str(tmp_path_factory.mktemp('libros') / 'casos_mixtos.xlsx'), mixed_rows())
+
+@pytest.fixture(scope='session', params=['ejemplo', 'casos_mixtos'])
+def workbook(request, mixed_workbook):
+    """Cada libro de prueba (ruta)"""
+    return SAMPLE_WORKBOOK if request.param == 'ejemplo' else mixed_workbook
+
+@pytest.fixture(scope='session')
+def split_workbooks(tmp_path_factory):
+    """
+    (a.xlsx, b.xlsx, completo.xlsx): las filas del libro de casos mixtos en
+    dos mitades y juntas, sin las filas vacías del medio (con ellas read_excel
+    lee el CUIT de la empresa como número decimal y las mitades difieren)
+    """
+    rows = [row for row in mixed_rows() if row is not None]
+    folder = tmp_path_factory.mktemp('partes')
+    return (write_workbook(str(folder / 'a.xlsx'), rows[:300]),
+            write_workbook(str(folder / 'b.xlsx'), rows[300:]),
+            write_workbook(str(folder / 'completo.xlsx'), rows))
+
+def patient_dump(patient_info, patient_numbers):
+    """[(Id, CUIL, nombre, estudios)] en el orden de salida"""
+    return sorted((number, cuil, patient_info[cuil]['nombre'], list(patient_info[cuil]['estudios']))
+                  for cuil, number in patient_numbers.items())
+
+def store_dump(store):
+    """[(Id, nombre, CUIL, exámenes)] de un PatientStore, con los nombres de examen"""
+    return [(number, nombre, cuil, [store.exams[exam_id] for exam_id in exam_ids])
+            for number, nombre, cuil, exam_ids in store.rows()]
+
+def text_columns(path):
+    """Columnas CUIL, nombre y descripción como las recibe el motor columnar"""
+    from gestor_examenes.reader import _text_column, load_excel_once
+    
+    _, df_no_header = load_excel_once(path)
+    data = df_no_header.iloc[1:]
+    return [_text_column(data.iloc[:, col]).tolist() for col in (2, 15, 4)]
+
+def sheet_rows(path, title=None):
+    """Valores de una hoja de un .xlsx (por defecto, la activa) como lista de tuplas"""
+    wb = load_workbook(path, read_only=True)
+    try:
+        ws = wb[title] if title is not None else wb.active
+        return list(ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+def trim_rows(rows):
+    """
+    Filas sin las celdas vacías del final: openpyxl en modo de solo lectura
+    rellena las filas hasta el ancho declarado de la hoja
+    """
+    trimmed = []
+    for row in rows:
+        end = len(row)
+        while end and row[end - 1] is None:
+            end -= 1
+        trimmed.append(row[:end])
+    return trimmed
@@ -0,0 +1,93 @@
+# =============================================================================
+# MANIFIESTO DEL PROCESAMIENTO POR LOTES: QUÉ SE SALTEA Y QUÉ SE REPROCESA
+# =============================================================================
+
+import os
+import shutil
+
+import pytest
+from conftest import mixed_rows, write_workbook
+
+import gestor_examenes.batch as batch
+from gestor_examenes.batch import (MANIFEST_FILENAME, is_up_to_date, list_input_files, load_manifest,
+                                   process_file_job, save_manifest)
+from gestor_examenes.catalog import ExamCatalog
+from gestor_examenes.shards import ShardLayout
+
+ARCHIVO = "lote.xlsx"
+
+@pytest.fixture
+def processed(mixed_workbook, tmp_path):
+    """Carpeta con un archivo ya procesado: (carpeta, entrada del manifiesto)"""
+    carpeta = str(tmp_path)
+    shutil.copy(mixed_workbook, os.path.join(carpeta, ARCHIVO))
+    archivo, ok, _, entry, _ = process_file_job(carpeta, ARCHIVO)
+    assert ok and archivo == ARCHIVO
+    return carpeta, entry
+
+def test_unchanged_file_is_skipped(processed):
+    carpeta, entry = processed
+    assert os.path.exists(os.path.join(carpeta, entry['output']))
+    assert is_up_to_date(carpeta, ARCHIVO, entry)
+
+def test_touched_file_with_same_content_is_skipped(processed):
+    carpeta, entry = processed
+    path = os.path.join(carpeta, ARCHIVO)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    
+    # Solo cambió la fecha: se compara el hash y se guarda la fecha nueva
+    assert is_up_to_date(carpeta, ARCHIVO, entry)
+    assert entry['mtime_ns'] == os.stat(path).st_mtime_ns
+
+def test_changed_content_is_reprocessed(processed):
+    carpeta, entry = processed
+    write_workbook(os.path.join(carpeta, ARCHIVO), mixed_rows(seed=8))
+    assert not is_up_to_date(carpeta, ARCHIVO, entry)
+
+def test_same_size_and_new_content_is_reprocessed(processed):
+    carpeta, entry = processed
+    path = os.path.join(carpeta, ARCHIVO)
+    stat = os.stat(path)
+    with open(path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 1]))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not is_up_to_date(carpeta, ARCHIVO, entry)
+
+def test_missing_output_is_reprocessed(processed):
+    carpeta, entry = processed
+    os.remove(os.path.join(carpeta, entry['output']))
+    assert not is_up_to_date(carpeta, ARCHIVO, entry)
+
+@pytest.mark.parametrize('options', [
+    {'output_formats': ('xlsx', 'csv')},
+    {'exam_catalog': ExamCatalog(['AUDIOMETRIA'])},
+    {'shards': ShardLayout(10)},
+])
+def test_changed_options_are_reprocessed(processed, options):
+    carpeta, entry = processed
+    assert not is_up_to_date(carpeta, ARCHIVO, entry, **options)
+
+def test_new_processing_version_is_reprocessed(processed, monkeypatch):
+    carpeta, entry = processed
+    monkeypatch.setattr(batch, 'PROCESSING_VERSION', batch.PROCESSING_VERSION + '.1')
+    assert not is_up_to_date(carpeta, ARCHIVO, entry)
+
+def test_manifest_round_trip(processed):
+    carpeta, entry = processed
+    save_manifest(carpeta, {'archivos': {ARCHIVO: entry}})
+    assert load_manifest(carpeta) == {'archivos': {ARCHIVO: entry}}
+    
+    # Un manifiesto dañado empieza vacío (se reprocesa todo)
+    with open(os.path.join(carpeta, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        f.write('{"archivos": ')
+    assert load_manifest(carpeta) == {'archivos': {}}
+
+def test_input_files_exclude_outputs_and_temporaries(processed):
+    carpeta, entry = processed
+    for name in ("~$lote.xlsx", "viejo.xls", "notas.txt"):
+        open(os.path.join(carpeta, name), 'wb').close()
+    assert list_input_files(carpeta) == [ARCHIVO, "viejo.xls"]
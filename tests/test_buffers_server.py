@@ -0,0 +1,131 @@
+# =============================================================================
+# PROCESAMIENTO EN MEMORIA Y MODO SERVIDOR
+# =============================================================================
+
+import http.client
+import io
+import json
+import threading
+
+import pytest
+from conftest import sheet_rows
+
+from gestor_examenes.batch import output_file_name
+from gestor_examenes.buffers import process_excel_buffer, process_excel_bytes
+from gestor_examenes.pipeline import process_excel_file
+from gestor_examenes.server import ExamServer
+
+MAX_UPLOAD_BYTES = 1024 * 1024
+
+class _Stream(io.RawIOBase):
+    """Stream binario sin seek (como el cuerpo de un pedido o un pipe)"""
+    
+    def __init__(self, data=b''):
+        super().__init__()
+        self._buffer = io.BytesIO(data)
+    
+    def readable(self):
+        return True
+    
+    def writable(self):
+        return True
+    
+    def readinto(self, target):
+        return self._buffer.readinto(target)
+    
+    def write(self, data):
+        return self._buffer.write(data)
+    
+    def getvalue(self):
+        return self._buffer.getvalue()
+
+@pytest.fixture(scope='module')
+def file_output(mixed_workbook, tmp_path_factory):
+    """Hojas de la salida de process_excel_file para el libro de casos mixtos"""
+    output_file = str(tmp_path_factory.mktemp('salida') / "salida.xlsx")
+    assert process_excel_file(mixed_workbook, output_file)[0]
+    return sheet_rows(output_file)
+
+@pytest.fixture(scope='module')
+def server():
+    server = ExamServer(('127.0.0.1', 0), jobs=1, max_upload_bytes=MAX_UPLOAD_BYTES)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+
+def _post(server, body, path="/procesar?nombre=lote.xlsx", headers=None):
+    """(estado, encabezados, cuerpo) de un POST al servidor"""
+    connection = http.client.HTTPConnection(*server.server_address, timeout=60)
+    try:
+        connection.request('POST', path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+@pytest.mark.parametrize('read_mode', ('pandas', 'xml', 'streaming'))
+def test_bytes_match_file_output(mixed_workbook, file_output, read_mode):
+    with open(mixed_workbook, 'rb') as f:
+        data = f.read()
+    output = process_excel_bytes(data, read_mode=read_mode)
+    assert sheet_rows(io.BytesIO(output)) == file_output
+
+def test_streams_without_seek(mixed_workbook, file_output):
+    with open(mixed_workbook, 'rb') as f:
+        source = _Stream(f.read())
+    sink = _Stream()
+    result = process_excel_buffer(source, sink)
+    assert result and result[0]
+    assert sheet_rows(io.BytesIO(sink.getvalue())) == file_output
+
+def test_unreadable_bytes_return_none():
+    assert process_excel_bytes(b'no es un libro') is None
+    assert process_excel_buffer(b'', io.BytesIO()) is False
+
+def test_server_processes_uploads(server, mixed_workbook, file_output):
+    with open(mixed_workbook, 'rb') as f:
+        status, headers, body = _post(server, f.read())
+    assert status == 200
+    assert headers['Content-Disposition'] == f'attachment; filename="{output_file_name("lote.xlsx")}"'
+    assert sheet_rows(io.BytesIO(body)) == file_output
+    
+    status, _, body = _post(server, b'no es un libro')
+    assert status == 422
+    assert json.loads(body)['error'] == "No se pudo procesar el archivo"
+
+def test_server_rejects_oversized_uploads(server):
+    # Se rechaza por el Content-Length, sin leer el cuerpo
+    status, _, body = _post(server, b'x' * 16, headers={'Content-Length': str(MAX_UPLOAD_BYTES + 1)})
+    assert status == 413
+    assert str(MAX_UPLOAD_BYTES) in json.loads(body)['error']
+
+def test_server_is_busy_when_the_queue_is_full(server, mixed_workbook):
+    # Un proceso: uno en curso y uno en espera ocupan todos los lugares
+    for _ in range(2 * server.jobs):
+        assert server.slots.acquire(blocking=False)
+    try:
+        status, headers, _ = _post(server, b'x' * 16)
+        assert status == 503
+        assert headers['Retry-After'] == '5'
+    finally:
+        for _ in range(2 * server.jobs):
+            server.slots.release()
+    
+    with open(mixed_workbook, 'rb') as f:
+        assert _post(server, f.read())[0] == 200
+
+def test_server_routes(server):
+    assert _post(server, b'x', path="/otra")[0] == 404
+    assert _post(server, b'')[0] == 400
+    connection = http.client.HTTPConnection(*server.server_address, timeout=60)
+    try:
+        connection.request('GET', '/salud')
+        response = connection.getresponse()
+        assert (response.status, json.loads(response.read())) == (200, {'estado': 'ok', 'procesos': 1})
+    finally:
+        connection.close()
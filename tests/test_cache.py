@@ -0,0 +1,91 @@
+# =============================================================================
+# CACHÉ DE LECTURA: ACIERTOS E INVALIDACIÓN
+# =============================================================================
+
+import os
+import shutil
+
+import pytest
+from conftest import patient_dump
+
+import gestor_examenes.cache as cache_module
+from gestor_examenes.batch import file_content_hash
+from gestor_examenes.cache import ParseCache
+from gestor_examenes.metrics import RunMetrics
+from gestor_examenes.pipeline import read_input_file
+
+def _read(path, read_mode, cache, content_hash=None):
+    metrics = RunMetrics()
+    company_data, patient_info, patient_numbers = read_input_file(path, read_mode, metrics=metrics, cache=cache,
+                                                                  content_hash=content_hash)
+    result = (company_data, patient_dump(patient_info, patient_numbers), metrics.quality.counts())
+    return result, metrics.counters.get('lecturas_desde_cache', 0)
+
+@pytest.mark.parametrize('read_mode', ('pandas', 'xml', 'streaming'))
+def test_cached_read_matches_file_read(workbook, tmp_path, read_mode):
+    cache = ParseCache(str(tmp_path / "cache"))
+    expected, hits = _read(workbook, read_mode, cache)
+    assert hits == 0
+    assert len(os.listdir(cache.directory)) == 1
+    
+    cached, hits = _read(workbook, read_mode, cache)
+    assert hits == 1
+    assert cached == expected
+
+def test_hit_does_not_read_the_file(mixed_workbook, tmp_path):
+    path = str(tmp_path / "entrada.xlsx")
+    shutil.copy(mixed_workbook, path)
+    content_hash = file_content_hash(path)
+    cache = ParseCache(str(tmp_path / "cache"))
+    expected, _ = _read(path, 'pandas', cache, content_hash)
+    
+    # Con el mismo hash la lectura sale de la caché aunque el archivo ya no sea un .xlsx
+    with open(path, 'wb') as f:
+        f.write(b'no es un libro')
+    cached, hits = _read(path, 'pandas', cache, content_hash)
+    assert hits == 1
+    assert cached == expected
+
+def test_changed_content_misses(mixed_workbook, tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    _read(mixed_workbook, 'pandas', cache)
+    _, hits = _read(mixed_workbook, 'pandas', cache, content_hash='0' * 64)
+    assert hits == 0
+    assert len(os.listdir(cache.directory)) == 2
+
+def test_other_version_is_discarded(mixed_workbook, tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / "cache"))
+    content_hash = file_content_hash(mixed_workbook)
+    _read(mixed_workbook, 'pandas', cache, content_hash)
+    
+    monkeypatch.setattr(cache_module, 'PARSE_CACHE_VERSION', cache_module.PARSE_CACHE_VERSION + '.1')
+    assert cache.load(content_hash) is None
+    assert not os.path.exists(os.path.join(cache.directory, content_hash))
+
+def test_corrupt_entry_is_discarded(mixed_workbook, tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    content_hash = file_content_hash(mixed_workbook)
+    _read(mixed_workbook, 'pandas', cache, content_hash)
+    
+    os.remove(os.path.join(cache.directory, content_hash, 'nombre.values.npy'))
+    assert cache.load(content_hash) is None
+    assert not os.path.exists(os.path.join(cache.directory, content_hash))
+    # La lectura siguiente vuelve al archivo y guarda la entrada de nuevo
+    _, hits = _read(mixed_workbook, 'pandas', cache, content_hash)
+    assert hits == 0
+    assert cache.load(content_hash) is not None
+
+def test_size_limit_evicts_least_recently_used(mixed_workbook, tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    _read(mixed_workbook, 'pandas', cache, content_hash='a' * 64)
+    entry_size = cache_module._entry_size(os.path.join(cache.directory, 'a' * 64))
+    
+    # Lugar para una sola entrada: la nueva desplaza a la anterior
+    cache.max_bytes = entry_size + entry_size // 2
+    _read(mixed_workbook, 'pandas', cache, content_hash='b' * 64)
+    assert os.listdir(cache.directory) == ['b' * 64]
+    
+    # Una lectura más grande que el límite no se guarda
+    cache.max_bytes = entry_size // 2
+    _read(mixed_workbook, 'pandas', cache, content_hash='c' * 64)
+    assert 'c' * 64 not in os.listdir(cache.directory)
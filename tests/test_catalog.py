@@ -0,0 +1,87 @@
+# =============================================================================
+# CATÁLOGO DE EXÁMENES: SINÓNIMOS Y ORDEN DE LAS COLUMNAS
+# =============================================================================
+
+import json
+import pickle
+
+import pytest
+from conftest import sheet_rows
+
+from gestor_examenes.catalog import PREFERRED_EXAM_ORDER, ExamCatalog, default_exam_catalog, load_exam_catalog
+from gestor_examenes.pipeline import process_excel_file
+
+def _search_order(exams, preferred_order):
+    """Orden de referencia: búsqueda nombre por nombre del orden preferido"""
+    def rank(exam):
+        return next((i for i, name in enumerate(preferred_order) if name.lower() in exam.lower()),
+                    len(preferred_order))
+    return sorted(exams, key=lambda exam: (rank(exam), exam))
+
+def test_only_configured_synonyms_are_folded():
+    catalog = ExamCatalog(synonyms={'Rx  torax': 'RX DE TORAX', 'AUDIOMETRÍA': ' AUDIOMETRIA '})
+    assert catalog.canonical('RX TORAX') == 'RX DE TORAX'
+    assert catalog.canonical(' rx torax ') == 'RX DE TORAX'
+    assert catalog.canonical('audiometría') == 'AUDIOMETRIA'
+    # Lo que no es un sinónimo solo pierde los espacios de los extremos
+    assert catalog.canonical(' Audiometria ') == 'Audiometria'
+    assert catalog.canonical('RX DE  TORAX') == 'RX DE  TORAX'
+    assert catalog.canonical('') == ''
+    assert default_exam_catalog().canonical(' RX TORAX ') == 'RX TORAX'
+
+def test_preferred_order_then_alphabetical():
+    exams = ['LABORATORIO BASICO', 'RX DE TORAX', 'rx de columna', 'Audiometria', 'AUDIOMETRIA TONAL',
+             'EXAMEN CLINICO', 'ELECTROCARDIOGRAMA', 'CUESTIONARIO DE SEGMENTOS COMPROMETIDOS', 'ESPIROMETRIA']
+    ordered = default_exam_catalog().order(exams)
+    assert ordered == _search_order(exams, PREFERRED_EXAM_ORDER)
+    assert ordered[:3] == ['EXAMEN CLINICO', 'AUDIOMETRIA TONAL', 'Audiometria']
+    assert ordered[-2:] == ['ELECTROCARDIOGRAMA', 'LABORATORIO BASICO']
+    
+    # Gana el primer nombre del orden contenido en el examen
+    catalog = ExamCatalog(['TORAX', 'RX'])
+    assert catalog.order(['RX DE COLUMNA', 'RX DE TORAX', 'AUDIOMETRIA']) == ['RX DE TORAX', 'RX DE COLUMNA',
+                                                                              'AUDIOMETRIA']
+    assert ExamCatalog([]).order(['B', 'A']) == ['A', 'B']
+
+def test_fingerprint_and_pickling():
+    catalog = ExamCatalog(['RX'], {'RX TORAX': 'RX DE TORAX'})
+    assert catalog.fingerprint() == ExamCatalog(['RX '], {'RX TORAX': 'RX DE TORAX'}).fingerprint()
+    assert catalog.fingerprint() != ExamCatalog(['RX'], {}).fingerprint()
+    assert catalog.fingerprint() != ExamCatalog(['RX', 'AUDIOMETRIA'], {'RX TORAX': 'RX DE TORAX'}).fingerprint()
+    
+    # Los procesos del lote reciben el catálogo sin sus cachés
+    catalog.canonical('rx torax')
+    copy = pickle.loads(pickle.dumps(catalog))
+    assert copy.fingerprint() == catalog.fingerprint()
+    assert copy.canonical('rx torax') == 'RX DE TORAX'
+
+def test_load_exam_catalog(tmp_path):
+    path = tmp_path / "catalogo_examenes.json"
+    path.write_text(json.dumps({'orden': ['RX'], 'sinonimos': {'Audiometria': 'AUDIOMETRIA'}}), encoding='utf-8')
+    catalog = load_exam_catalog(str(path))
+    assert (catalog.preferred_order, catalog.synonyms) == (['RX'], {'Audiometria': 'AUDIOMETRIA'})
+    
+    path.write_text('{}', encoding='utf-8')
+    assert load_exam_catalog(str(path)).preferred_order == PREFERRED_EXAM_ORDER
+
+@pytest.mark.parametrize('content', ['{"orden": ', '[]', '{"orden": "RX"}', '{"sinonimos": {"RX": 1}}'])
+def test_invalid_catalog_is_rejected(tmp_path, content):
+    path = tmp_path / "catalogo_examenes.json"
+    path.write_text(content, encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_exam_catalog(str(path))
+
+def test_synonyms_merge_output_columns(mixed_workbook, tmp_path):
+    plain, folded = str(tmp_path / "salida.xlsx"), str(tmp_path / "sinonimos.xlsx")
+    catalog = ExamCatalog(['RX DE TORAX', 'AUDIOMETRIA'], {'Audiometria': 'AUDIOMETRIA'})
+    assert process_excel_file(mixed_workbook, plain)[0]
+    assert process_excel_file(mixed_workbook, folded, exam_catalog=catalog)[0]
+    
+    def columns(path):
+        rows = sheet_rows(path)
+        header = next(row for row in rows if row and row[0] == 'Id')
+        return [name for name in header[3:] if name]
+    
+    assert 'Audiometria' in columns(plain)
+    rest = set(columns(plain)) - {'RX DE TORAX', 'AUDIOMETRIA', 'Audiometria'}
+    assert columns(folded) == ['RX DE TORAX', 'AUDIOMETRIA'] + sorted(rest)
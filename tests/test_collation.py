@@ -0,0 +1,37 @@
+# =============================================================================
+# ORDEN ALFABÉTICO EN ESPAÑOL DE LOS PACIENTES
+# =============================================================================
+
+import unicodedata
+
+import pytest
+
+from gestor_examenes.reader import assign_patient_numbers, collation_key
+
+@pytest.mark.parametrize('nombre, igual', [
+    ('pérez, ana', 'PEREZ, ANA'),
+    ('Ángel Müller', 'ANGEL MULLER'),
+    ('GÜEMES, ÍCARO', 'guemes, icaro'),
+    ('Çelik Øster', 'CELIK ØSTER'),
+])
+def test_case_and_accents_are_ignored(nombre, igual):
+    assert collation_key(nombre) == collation_key(igual)
+
+def test_decomposed_accents_match_composed():
+    nombre = 'MUÑOZ, JOSÉ'
+    assert collation_key(unicodedata.normalize('NFD', nombre)) == collation_key(nombre)
+
+def test_enie_sorts_between_n_and_o():
+    nombres = ['OCAMPO', 'ÑANDÚ', 'NUÑEZ', 'NUNEZ', 'NUÑO', 'ñoño', 'NÚÑEZ', 'NZ', 'Ñ']
+    assert sorted(nombres, key=collation_key) == ['NUNEZ', 'NUÑEZ', 'NÚÑEZ', 'NUÑO', 'NZ', 'Ñ', 'ÑANDÚ', 'ñoño',
+                                                  'OCAMPO']
+
+def test_patient_numbers_follow_collation():
+    patient_info = {cuil: {'nombre': nombre, 'estudios': []} for cuil, nombre in [
+        ('1', 'Zapata'), ('2', 'ÑUÑEZ'), ('3', 'álvarez'), ('4', 'NUÑEZ'), ('5', 'Alvarez'), ('6', 'OCAMPO'),
+        ('7', ''),
+    ]}
+    patient_numbers = assign_patient_numbers(patient_info, total_rows=7)
+    # Los nombres iguales para la clave conservan el orden de lectura
+    assert list(patient_numbers) == ['7', '3', '5', '4', '2', '6', '1']
+    assert list(patient_numbers.values()) == list(range(1, 8))
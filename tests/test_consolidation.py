@@ -0,0 +1,67 @@
+# =============================================================================
+# CONSOLIDACIÓN COLUMNAR FRENTE A LA CONSOLIDACIÓN FILA POR FILA
+# =============================================================================
+
+from conftest import mixed_rows, patient_dump, text_columns, write_workbook
+
+from gestor_examenes.reader import (assign_patient_numbers, consolidate_patient_columns, load_excel_once,
+                                    process_all_patients)
+from gestor_examenes.quality import validate_cuils
+from gestor_examenes.streaming import consolidate_patient_rows
+
+def _row_loop(cuils, nombres, descripciones):
+    """
+    Consolidación fila por fila como el bucle original de
+    process_all_patients (primer nombre de cada CUIL y estudios sin repetir,
+    en orden), sobre los CUIL validados
+    """
+    normalized, valid = validate_cuils(cuils)
+    patient_info = {}
+    for cuil, nombre, descripcion, ok in zip(normalized, nombres, descripciones, valid):
+        if not ok:
+            continue
+        if cuil not in patient_info:
+            patient_info[cuil] = {'nombre': nombre, 'estudios': []}
+        if descripcion and descripcion not in patient_info[cuil]['estudios']:
+            patient_info[cuil]['estudios'].append(descripcion)
+    return patient_info
+
+def test_columnar_matches_row_by_row(workbook):
+    columns = text_columns(workbook)
+    columnar = consolidate_patient_columns(*columns)
+    row_by_row = consolidate_patient_rows(zip(*columns))
+    
+    # Mismo orden de primera aparición de los CUIL y de los estudios de cada uno
+    assert list(columnar.items()) == list(row_by_row.items())
+
+def test_columnar_matches_row_loop(workbook, tmp_path):
+    larger = write_workbook(str(tmp_path / "grande.xlsx"), mixed_rows(patients=400, rows=5000, seed=11))
+    for path in (workbook, larger):
+        columns = text_columns(path)
+        columnar = consolidate_patient_columns(*columns)
+        expected = _row_loop(*columns)
+        assert list(columnar.items()) == list(expected.items())
+        assert (patient_dump(columnar, assign_patient_numbers(columnar, len(columns[0])))
+                == patient_dump(expected, assign_patient_numbers(expected, len(columns[0]))))
+
+def test_process_all_patients_numbering(workbook):
+    columns = text_columns(workbook)
+    _, df_no_header = load_excel_once(workbook)
+    patient_info, patient_numbers = process_all_patients(df_no_header)
+    
+    row_by_row = consolidate_patient_rows(zip(*columns))
+    expected = patient_dump(row_by_row, assign_patient_numbers(row_by_row, len(columns[0])))
+    assert patient_dump(patient_info, patient_numbers) == expected
+    assert [number for number, *_ in expected] == list(range(1, len(expected) + 1))
+
+def test_mixed_workbook_cases(mixed_workbook):
+    patient_info = consolidate_patient_columns(*text_columns(mixed_workbook))
+    
+    # Las formas del mismo CUIL quedan en un solo paciente y las filas inválidas se descartan
+    assert len(patient_info) == 81
+    assert all(len(cuil) == 11 and cuil.isdigit() for cuil in patient_info)
+    assert '20100000001' in patient_info
+    assert not any(info['nombre'] in ('SIN CUIL', 'CUIL CORTO', 'CUIL CON LETRAS', 'Nombre_Apellido')
+                   for info in patient_info.values())
+    assert all('' not in info['estudios'] and len(set(info['estudios'])) == len(info['estudios'])
+               for info in patient_info.values())
@@ -0,0 +1,52 @@
+# =============================================================================
+# MATRIZ MAESTRA DE VARIOS ARCHIVOS
+# =============================================================================
+
+import pytest
+from conftest import COMPANY, sheet_rows
+
+from gestor_examenes.merge import merge_company_data, merge_excel_files
+from gestor_examenes.pipeline import process_excel_file
+
+@pytest.mark.parametrize('jobs', (1, 2))
+def test_merge_matches_single_workbook(split_workbooks, tmp_path, jobs):
+    first, second, whole = split_workbooks
+    merged, single = str(tmp_path / "maestra.xlsx"), str(tmp_path / "completo.xlsx")
+    assert merge_excel_files([first, second], merged, jobs=jobs)[0]
+    assert process_excel_file(whole, single)[0]
+    
+    assert sheet_rows(merged) == sheet_rows(single)
+
+def test_provenance_lists_every_source(split_workbooks, tmp_path):
+    first, second, _ = split_workbooks
+    merged = str(tmp_path / "maestra.xlsx")
+    assert merge_excel_files([first, second], merged)[0]
+    
+    header, *rows = sheet_rows(merged, 'Origen')
+    assert header == ('Id', 'Empleado', 'CUIL', 'Estudio', 'Archivo', 'Empresa', 'CUIT')
+    sources = {}
+    for _, _, cuil, estudio, archivo, _, _ in rows:
+        sources.setdefault((cuil, estudio), []).append(archivo)
+    # Cada estudio lista sus archivos de origen sin repetir y en el orden de los archivos
+    assert all(len(files) == len(set(files)) and set(files) <= {'a.xlsx', 'b.xlsx'} for files in sources.values())
+    assert any(files == ['a.xlsx', 'b.xlsx'] for files in sources.values())
+    # Los pacientes van en el orden de la matriz
+    ids = [row[0] for row in rows]
+    assert ids == sorted(ids)
+
+def test_unreadable_files_are_skipped(split_workbooks, tmp_path):
+    first, _, _ = split_workbooks
+    broken = tmp_path / "roto.xlsx"
+    broken.write_bytes(b'no es un libro')
+    merged, single = str(tmp_path / "maestra.xlsx"), str(tmp_path / "a.xlsx")
+    assert merge_excel_files([str(broken), first], merged)[0]
+    assert process_excel_file(first, single)[0]
+    assert sheet_rows(merged) == sheet_rows(single)
+    
+    assert merge_excel_files([str(broken)], str(tmp_path / "vacia.xlsx")) is False
+
+def test_company_data_joins_distinct_values():
+    company = {'Empresa': COMPANY[7], 'CUIT': COMPANY[1], 'Email': ''}
+    other = {'Empresa': 'OTRA SA', 'CUIT': COMPANY[1], 'Email': 'otra@prueba.com'}
+    assert merge_company_data([company, other]) == {'Empresa': f"{COMPANY[7]} / OTRA SA", 'CUIT': COMPANY[1],
+                                                    'Email': 'otra@prueba.com'}
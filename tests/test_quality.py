@@ -0,0 +1,51 @@
+# =============================================================================
+# VALIDACIÓN DE CUIL Y REPORTE DE CALIDAD
+# =============================================================================
+
+import csv
+
+from conftest import cuil_variants, text_columns, valid_cuil
+
+from gestor_examenes.metrics import RunMetrics
+from gestor_examenes.pipeline import process_excel_file
+from gestor_examenes.quality import quality_report_path, validate_cuils
+from gestor_examenes.reader import consolidate_patient_columns
+from gestor_examenes.streaming import consolidate_patient_rows
+
+def test_cuil_forms_normalize_to_one_value():
+    cuil = valid_cuil(12_345_678)
+    variants = [str(value).strip() for value in cuil_variants(cuil)]
+    rejected = ['', 'CUIL', '1234', '20-ABCDEFGH-1']
+    metrics = RunMetrics()
+    
+    normalized, valid = validate_cuils(variants + rejected + ['20100000001'], metrics)
+    
+    assert normalized[:len(variants)].tolist() == [cuil] * len(variants)
+    # El verificador inválido se informa pero la fila se consolida
+    assert valid.tolist() == [True] * len(variants) + [False] * len(rejected) + [True]
+    assert metrics.quality.counts() == {'cuil_vacio': 1, 'encabezado_repetido': 1, 'cuil_corto': 1,
+                                        'cuil_formato_invalido': 1, 'digito_verificador_invalido': 1}
+    # Fila de la hoja de cada observación (la 2 es la primera de datos)
+    assert [fila for fila, *_ in metrics.quality.entries()] == list(range(2 + len(variants), 2 + len(variants) + 5))
+
+def test_quality_report_matches_across_engines(workbook):
+    columns = text_columns(workbook)
+    columnar_metrics, row_metrics = RunMetrics(), RunMetrics()
+    
+    consolidate_patient_columns(*columns, columnar_metrics)
+    consolidate_patient_rows(zip(*columns), row_metrics)
+    
+    assert columnar_metrics.quality.counts() == row_metrics.quality.counts()
+    assert list(columnar_metrics.quality.entries()) == list(row_metrics.quality.entries())
+
+def test_mixed_workbook_quality_report(mixed_workbook, tmp_path):
+    metrics = RunMetrics()
+    output_file = str(tmp_path / "salida.xlsx")
+    assert process_excel_file(mixed_workbook, output_file, metrics=metrics, quality_report=True)[0]
+    
+    assert metrics.quality.counts() == {'digito_verificador_invalido': 1, 'cuil_vacio': 4, 'encabezado_repetido': 2,
+                                        'cuil_corto': 1, 'cuil_formato_invalido': 1, 'nombres_distintos': 1}
+    with open(quality_report_path(output_file), encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['Fila', 'CUIL', 'Motivo', 'Detalle']
+    assert len(rows) - 1 == len(list(metrics.quality.entries()))
@@ -0,0 +1,83 @@
+# =============================================================================
+# REGISTRO HISTÓRICO: CARGA, CONSULTAS Y ARCHIVOS SIN REGISTRAR
+# =============================================================================
+
+import builtins
+import os
+import shutil
+
+import pytest
+from conftest import valid_cuil
+
+from gestor_examenes.batch import REGISTRY_FILENAME, file_content_hash, load_manifest
+from gestor_examenes.cli import main
+from gestor_examenes.pipeline import read_input_file
+from gestor_examenes.registry import PatientRegistry
+
+ARCHIVO = "lote.xlsx"
+
+@pytest.fixture
+def registry(tmp_path):
+    with PatientRegistry(str(tmp_path / REGISTRY_FILENAME)) as registry:
+        yield registry
+
+def _run(carpeta, *argv):
+    """Corrida de la línea de comandos sobre la carpeta, sin esperar Enter al final"""
+    main(['--jobs', '1', '--quiet', *argv], carpeta=carpeta)
+
+def test_record_and_query(mixed_workbook, registry):
+    company_data, patient_info, _ = read_input_file(mixed_workbook)
+    content_hash = file_content_hash(mixed_workbook)
+    assert registry.record_file(mixed_workbook, company_data, patient_info, content_hash)
+    # El mismo contenido no se vuelve a cargar
+    assert not registry.record_file(mixed_workbook, company_data, patient_info, content_hash)
+    assert registry.recorded_files() == {os.path.basename(mixed_workbook): content_hash}
+    
+    cuil = valid_cuil(10_000_003)
+    records = registry.exams_for_cuil(cuil)
+    # Los exámenes no distinguen mayúsculas: 'Audiometria' y 'AUDIOMETRIA' son uno
+    assert sorted(record.examen.upper() for record in records) == sorted({estudio.upper()
+                                                                          for estudio in patient_info[cuil]['estudios']})
+    assert {(record.empresa, record.cuit) for record in records} == {(company_data['Empresa'], company_data['CUIT'])}
+    
+    # Con y sin el examen: cada paciente está en una sola de las dos listas
+    with_exam = {record.cuil for record in registry.patients_with_exam('audiometria')}
+    missing = {record.cuil for record in registry.patients_missing_exam('AUDIOMETRIA')}
+    assert with_exam == {cuil for cuil, info in patient_info.items()
+                         if any(estudio.upper() == 'AUDIOMETRIA' for estudio in info['estudios'])}
+    assert missing == set(patient_info) - with_exam
+    missing_here = registry.patients_missing_exam('AUDIOMETRIA', cuit=company_data['CUIT'], since='2000-01-01')
+    assert {record.cuil for record in missing_here} == missing
+    assert registry.patients_missing_exam('AUDIOMETRIA', cuit='30000000000') == []
+
+def test_new_content_replaces_the_file(mixed_workbook, registry):
+    company_data, patient_info, _ = read_input_file(mixed_workbook)
+    assert registry.record_file(mixed_workbook, company_data, patient_info, 'a' * 64)
+    
+    cuil = next(iter(patient_info))
+    assert registry.record_file(mixed_workbook, company_data, {cuil: {'nombre': '', 'estudios': ['RX DE TORAX']}},
+                                'b' * 64)
+    assert [record.examen for record in registry.exams_for_cuil(cuil)] == ['RX DE TORAX']
+    # Un nombre vacío no pisa el conocido
+    assert registry.patients_with_exam('RX DE TORAX') == [(cuil, patient_info[cuil]['nombre'])]
+    assert registry.patients_missing_exam('RX DE TORAX') == []
+
+def test_unchanged_files_are_backfilled(mixed_workbook, tmp_path, monkeypatch):
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': '')
+    carpeta = str(tmp_path)
+    shutil.copy(mixed_workbook, os.path.join(carpeta, ARCHIVO))
+    _run(carpeta)
+    entry = load_manifest(carpeta)['archivos'][ARCHIVO]
+    output_file = os.path.join(carpeta, entry['output'])
+    written = os.stat(output_file).st_mtime_ns
+    
+    # El archivo no cambió, pero no está en el registro: se vuelve a procesar
+    _run(carpeta, '--registry')
+    with PatientRegistry(os.path.join(carpeta, REGISTRY_FILENAME)) as registry:
+        assert registry.recorded_files() == {ARCHIVO: entry['sha256']}
+    rewritten = os.stat(output_file).st_mtime_ns
+    assert rewritten != written
+    
+    # Ya registrado con el mismo contenido: se omite
+    _run(carpeta, '--registry')
+    assert os.stat(output_file).st_mtime_ns == rewritten
@@ -0,0 +1,126 @@
+# =============================================================================
+# SALIDA DIVIDIDA EN PARTES
+# =============================================================================
+
+import os
+
+import pytest
+from conftest import sheet_rows, trim_rows
+from openpyxl import load_workbook
+
+from gestor_examenes.pipeline import process_excel_file
+from gestor_examenes.reader import collation_key
+from gestor_examenes.shards import (SUMMARY_HEADERS, SUMMARY_SHEET, ShardLayout, _letter_shards, _sheet_title,
+                                    shard_path)
+
+def _matrix_blocks(rows):
+    """(empresa, encabezado, pacientes, {examen: total}) de una hoja con la matriz"""
+    rows = trim_rows(rows)
+    header = next(i for i, row in enumerate(rows) if row and row[0] == 'Id')
+    end = rows.index((), header)
+    return rows[:header], rows[header], rows[header + 1:end], {exam: total for total, exam in rows[end + 1:]}
+
+def _sheet_names(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+def _summary_index(path):
+    """Filas del índice de partes de la hoja "Resumen" (con partes en archivos, la columna Hoja es Archivo)"""
+    rows = trim_rows(sheet_rows(path, SUMMARY_SHEET))
+    header = next(i for i, row in enumerate(rows) if row[:1] == (SUMMARY_HEADERS[0],))
+    return rows[header + 1:rows.index((), header)]
+
+@pytest.fixture(scope='module')
+def unsharded(mixed_workbook, tmp_path_factory):
+    """Bloques de la matriz sin dividir"""
+    output_file = str(tmp_path_factory.mktemp('completa') / "salida.xlsx")
+    assert process_excel_file(mixed_workbook, output_file)[0]
+    return _matrix_blocks(sheet_rows(output_file))
+
+def _check_parts(parts, unsharded, index):
+    """Las partes, en orden, son la matriz completa y coinciden con el índice del resumen"""
+    company, header, patients, totals = unsharded
+    joined = []
+    for rows, (_, _, desde, hasta, id_desde, id_hasta, pacientes) in zip(parts, index):
+        part_company, part_header, part_patients, part_totals = _matrix_blocks(rows)
+        # Mismo bloque de empresa y mismas columnas en todas las partes
+        assert (part_company, part_header) == (company, header)
+        assert [row[0] for row in part_patients] == list(range(id_desde, id_hasta + 1))
+        assert (part_patients[0][1], part_patients[-1][1], len(part_patients)) == (desde, hasta, pacientes)
+        # Recuento de los pacientes de la parte
+        assert part_totals == {exam: count for exam, count in
+                               ((exam, sum(row[col:col + 1] == ('X',) for row in part_patients))
+                                for col, exam in enumerate(header[3:], start=3)) if count}
+        joined.extend(part_patients)
+    assert len(parts) == len(index)
+    assert joined == patients
+
+def test_rows_in_sheets(mixed_workbook, unsharded, tmp_path):
+    output_file = str(tmp_path / "salida.xlsx")
+    assert process_excel_file(mixed_workbook, output_file, shards=ShardLayout(25))[0]
+    
+    patients = len(unsharded[2])
+    labels = [f"Parte {number}" for number in range(1, -(-patients // 25) + 1)]
+    assert _sheet_names(output_file) == [SUMMARY_SHEET] + labels
+    index = _summary_index(output_file)
+    assert [row[:2] for row in index] == [(label, label) for label in labels]
+    assert all(row[6] == 25 for row in index[:-1])
+    _check_parts([sheet_rows(output_file, label) for label in labels], unsharded, index)
+    
+    # El resumen lleva el recuento global
+    summary = trim_rows(sheet_rows(output_file, SUMMARY_SHEET))
+    blank = max(i for i, row in enumerate(summary) if not row)
+    assert {exam: total for total, exam in summary[blank + 1:]} == unsharded[3]
+
+def test_letters_in_files(mixed_workbook, unsharded, tmp_path):
+    output_file = str(tmp_path / "salida.xlsx")
+    layout = ShardLayout(by='letra', target='archivos', jobs=2)
+    assert process_excel_file(mixed_workbook, output_file, shards=layout)[0]
+    
+    assert _sheet_names(output_file) == [SUMMARY_SHEET]
+    index = _summary_index(output_file)
+    paths = [shard_path(output_file, number) for number in range(1, len(index) + 1)]
+    assert [row[1] for row in index] == [os.path.basename(path) for path in paths]
+    parts = [sheet_rows(path) for path in paths]
+    _check_parts(parts, unsharded, index)
+    
+    # Una parte por inicial, con la Ñ junto a la N
+    for (label, *_), rows in zip(index, parts):
+        assert {collation_key(row[1])[0] for row in _matrix_blocks(rows)[2]} == {label}
+    assert 'Ñ' not in [row[0] for row in index]
+
+def test_fewer_files_remove_stale_parts(mixed_workbook, tmp_path):
+    output_file = str(tmp_path / "salida.xlsx")
+    assert process_excel_file(mixed_workbook, output_file, shards=ShardLayout(20, target='archivos'))[0]
+    parts = len(_summary_index(output_file))
+    assert os.path.exists(shard_path(output_file, parts))
+    
+    assert process_excel_file(mixed_workbook, output_file, shards=ShardLayout(50, target='archivos'))[0]
+    assert sorted(name for name in os.listdir(tmp_path) if '_parte_' in name) == [
+        os.path.basename(shard_path(output_file, number)) for number in (1, 2)]
+
+def test_letter_groups_with_limit():
+    runs = [('A', 0, 3), ('B', 3, 5), ('C', 5, 6), ('M', 6, 20), ('N', 20, 22), ('O', 22, 25), ('#', 25, 26)]
+    assert _letter_shards(runs, None) == runs
+    assert _letter_shards(runs, 6) == [('A-C', 0, 6), ('M 1', 6, 12), ('M 2', 12, 18), ('M 3', 18, 20),
+                                       ('N-#', 20, 26)]
+
+def test_sheet_titles_are_valid_and_distinct():
+    used = {SUMMARY_SHEET.casefold()}
+    assert _sheet_title('resumen', used) == 'resumen (2)'
+    assert _sheet_title('A/B: [1]?', used) == 'A_B_ _1__'
+    assert len(_sheet_title('X' * 40, used)) == 31
+    assert _sheet_title('X' * 40, used) == 'X' * 27 + ' (2)'
+
+@pytest.mark.parametrize('options', [
+    {'rows_per_shard': None},
+    {'rows_per_shard': 0},
+    {'rows_per_shard': 10, 'by': 'apellido'},
+    {'rows_per_shard': 10, 'target': 'zip'},
+])
+def test_invalid_layout_is_rejected(options):
+    with pytest.raises(ValueError):
+        ShardLayout(**options)
@@ -0,0 +1,43 @@
+# =============================================================================
+# CONSOLIDACIÓN CON MEMORIA ACOTADA FRENTE A LA CONSOLIDACIÓN EN MEMORIA
+# =============================================================================
+
+import pytest
+from conftest import store_dump
+from openpyxl import load_workbook
+
+from gestor_examenes.metrics import RunMetrics
+from gestor_examenes.pipeline import process_excel_file, read_input_file
+from gestor_examenes.spill import read_input_spilled
+from gestor_examenes.store import PatientStore
+
+def _in_memory(path):
+    metrics = RunMetrics()
+    company_data, patient_info, patient_numbers = read_input_file(path, 'streaming', metrics=metrics)
+    return company_data, PatientStore.from_patient_info(patient_info, patient_numbers), metrics
+
+@pytest.mark.parametrize('partitions, partition_jobs', [(1, 1), (4, 1), (16, 1), (4, 2)])
+def test_spilled_store_matches_in_memory(workbook, tmp_path, partitions, partition_jobs):
+    company_data, store, metrics = _in_memory(workbook)
+    spilled_metrics = RunMetrics()
+    spilled_company, spilled = read_input_spilled(workbook, metrics=spilled_metrics, partitions=partitions,
+                                                  partition_jobs=partition_jobs, spill_dir=str(tmp_path))
+    
+    assert spilled_company == company_data
+    assert store_dump(spilled) == store_dump(store)
+    # Mismos ids de examen (primera aparición) y mismo recuento por examen
+    assert spilled.exams == store.exams
+    assert spilled.exam_count() == store.exam_count()
+    assert spilled_metrics.quality.counts() == metrics.quality.counts()
+    assert list(spilled_metrics.quality.entries()) == list(metrics.quality.entries())
+    # Los archivos temporales de las particiones se borran
+    assert not list(tmp_path.iterdir())
+
+def test_memory_cap_output_matches(workbook, tmp_path):
+    expected_file, capped_file = str(tmp_path / "salida.xlsx"), str(tmp_path / "salida_acotada.xlsx")
+    assert process_excel_file(workbook, expected_file)[0]
+    assert process_excel_file(workbook, capped_file, memory_cap=1024)[0]
+    
+    def rows(path):
+        return list(load_workbook(path, read_only=True).active.iter_rows(values_only=True))
+    assert rows(capped_file) == rows(expected_file)
@@ -0,0 +1,92 @@
+# =============================================================================
+# SALIDAS TABULARES (CSV / PARQUET) FRENTE A LA MATRIZ .XLSX
+# =============================================================================
+
+import csv
+import os
+
+import pytest
+from conftest import sheet_rows
+
+import gestor_examenes.pipeline as pipeline
+from gestor_examenes.pipeline import output_path, process_excel_file, read_input_file, validate_output_formats
+from gestor_examenes.store import PatientStore
+from gestor_examenes.table_writers import _patient_batches
+
+def _csv_rows(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))
+
+def _xlsx_blocks(path):
+    """(empresa, encabezado, pacientes, totales) de la hoja principal, como texto"""
+    rows = [['' if value is None else str(value) for value in row] for row in sheet_rows(path)]
+    header = next(i for i, row in enumerate(rows) if row and row[0] == 'Id')
+    end = rows.index([], header)
+    company = [row[1:3] for row in rows[:header] if row]
+    return company, rows[header], rows[header + 1:end], [row[:2] for row in rows[end + 1:]]
+
+@pytest.fixture(scope='module')
+def table_outputs(mixed_workbook, tmp_path_factory):
+    output_file = str(tmp_path_factory.mktemp('tablas') / "salida.xlsx")
+    assert process_excel_file(mixed_workbook, output_file, output_formats=('xlsx', 'csv', 'csv-long'))[0]
+    return output_file
+
+def test_wide_csv_matches_the_matrix(table_outputs):
+    _, header, patients, _ = _xlsx_blocks(table_outputs)
+    rows = _csv_rows(output_path(table_outputs, 'csv'))
+    assert rows[0] == header
+    assert rows[1:] == patients
+
+def test_long_csv_lists_each_assigned_exam(table_outputs):
+    _, header, patients, _ = _xlsx_blocks(table_outputs)
+    rows = _csv_rows(output_path(table_outputs, 'csv-long'))
+    assert rows[0] == ['Id', 'Empleado', 'CUIL', 'Examen']
+    assert rows[1:] == [row[:3] + [exam] for row in patients
+                        for exam, mark in zip(header[3:], row[3:]) if mark == 'X']
+
+def test_company_and_totals_files(table_outputs):
+    company, _, _, totals = _xlsx_blocks(table_outputs)
+    base = os.path.splitext(table_outputs)[0]
+    # Un solo par de archivos para los dos formatos CSV
+    assert sorted(name for name in os.listdir(os.path.dirname(table_outputs)) if name.endswith('.csv')) == [
+        'salida.csv', 'salida_empresa.csv', 'salida_largo.csv', 'salida_totales.csv']
+    assert _csv_rows(f"{base}_empresa.csv") == [['Campo', 'Valor']] + company
+    assert _csv_rows(f"{base}_totales.csv") == [['Examen', 'Cantidad']] + [[exam, total] for total, exam in totals]
+
+def test_batches_cover_the_store(mixed_workbook):
+    _, patient_info, patient_numbers = read_input_file(mixed_workbook)
+    store = PatientStore.from_patient_info(patient_info, patient_numbers)
+    exams_list = sorted(store.exams)
+    
+    def flatten(batches):
+        return [(patient_id, name, cuil, row.tolist())
+                for ids, names, cuils, marks in batches
+                for patient_id, name, cuil, row in zip(ids, names, cuils, marks)]
+    
+    assert flatten(_patient_batches(store, exams_list, batch_rows=7)) == flatten(_patient_batches(store, exams_list))
+
+def test_parquet_requires_pyarrow(mixed_workbook, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'PYARROW_AVAILABLE', False)
+    with pytest.raises(ValueError, match='pyarrow'):
+        validate_output_formats(['xlsx', 'parquet'])
+    with pytest.raises(ValueError):
+        validate_output_formats(['xlsx', 'json'])
+    assert validate_output_formats(['csv', 'xlsx', 'csv']) == ['csv', 'xlsx']
+    
+    # La corrida falla antes de escribir nada
+    output_file = str(tmp_path / "salida.xlsx")
+    assert process_excel_file(mixed_workbook, output_file, output_formats=('xlsx', 'parquet-long')) is False
+    assert os.listdir(tmp_path) == []
+
+def test_parquet_matches_csv(mixed_workbook, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    output_file = str(tmp_path / "salida.xlsx")
+    assert process_excel_file(mixed_workbook, output_file, output_formats=('csv', 'csv-long', 'parquet',
+                                                                           'parquet-long'))[0]
+    
+    wide = pq.read_table(output_path(output_file, 'parquet')).to_pylist()
+    assert [[str(row['Id']), row['Empleado'], row['CUIL']] + ['X' if row[exam] else '' for exam in list(row)[3:]]
+            for row in wide] == _csv_rows(output_path(output_file, 'csv'))[1:]
+    long = pq.read_table(output_path(output_file, 'parquet-long')).to_pylist()
+    assert [[str(row['Id']), row['Empleado'], row['CUIL'], row['Examen']]
+            for row in long] == _csv_rows(output_path(output_file, 'csv-long'))[1:]
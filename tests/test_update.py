@@ -0,0 +1,97 @@
+# =============================================================================
+# ACTUALIZACIÓN INCREMENTAL DE UNA SALIDA EXISTENTE
+# =============================================================================
+
+import os
+
+import pytest
+from conftest import sheet_rows, trim_rows
+
+from gestor_examenes.catalog import ExamCatalog
+from gestor_examenes.merge import merge_excel_files
+from gestor_examenes.metrics import RunMetrics
+from gestor_examenes.pipeline import process_excel_file
+from gestor_examenes.update import update_output_file
+
+def _matrix_and_totals(path):
+    """
+    (filas hasta la última de pacientes, {examen: total}) de la hoja principal.
+    La actualización deja primero los totales que ya tenía la salida, así que
+    los totales se comparan sin orden.
+    """
+    rows = trim_rows(sheet_rows(path))
+    header = next(i for i, row in enumerate(rows) if row and row[0] == 'Id')
+    end = rows.index((), header)
+    return rows[:end], {name: total for total, name in rows[end + 1:]}
+
+@pytest.fixture(scope='module')
+def single_output(split_workbooks, tmp_path_factory):
+    """Salida de procesar el libro completo de una vez"""
+    output_file = str(tmp_path_factory.mktemp('completo') / "completo.xlsx")
+    assert process_excel_file(split_workbooks[2], output_file)[0]
+    return output_file
+
+def test_streaming_output_is_spliced(split_workbooks, single_output, tmp_path):
+    first, second, _ = split_workbooks
+    output_file, updated_file = str(tmp_path / "salida.xlsx"), str(tmp_path / "actualizada.xlsx")
+    assert process_excel_file(first, output_file)[0]
+    
+    metrics = RunMetrics()
+    assert update_output_file(output_file, [second], updated_file, metrics=metrics)[0]
+    assert _matrix_and_totals(updated_file) == _matrix_and_totals(single_output)
+    # Las filas sin cambios se copian de la salida anterior
+    assert metrics.counters['filas_copiadas'] > 0
+    assert metrics.counters['filas_generadas'] > 0
+    matrix, _ = _matrix_and_totals(single_output)
+    assert metrics.counters['pacientes'] == sum(bool(row) and isinstance(row[0], int) for row in matrix)
+
+def test_full_output_is_spliced(split_workbooks, single_output, tmp_path):
+    first, second, _ = split_workbooks
+    output_file = str(tmp_path / "salida.xlsx")
+    assert process_excel_file(first, output_file, write_mode='full')[0]
+    
+    # Las filas del escritor completo son iguales: también se reescribe por
+    # filas, y el rango declarado de la hoja incluye los totales nuevos
+    metrics = RunMetrics()
+    assert update_output_file(output_file, [second], metrics=metrics)[0]
+    assert metrics.counters['filas_copiadas'] > 0
+    assert _matrix_and_totals(output_file) == _matrix_and_totals(single_output)
+
+def test_new_column_order_rewrites_the_output(split_workbooks, tmp_path):
+    first, second, whole = split_workbooks
+    output_file, single = str(tmp_path / "salida.xlsx"), str(tmp_path / "completo.xlsx")
+    catalog = ExamCatalog(['RX DE TORAX', 'ESPIROMETRIA'])
+    assert process_excel_file(first, output_file)[0]
+    assert process_excel_file(whole, single, exam_catalog=catalog)[0]
+    
+    metrics = RunMetrics()
+    assert update_output_file(output_file, [second], metrics=metrics, exam_catalog=catalog)[0]
+    assert 'filas_copiadas' not in metrics.counters
+    assert _matrix_and_totals(output_file) == _matrix_and_totals(single)
+
+def test_nothing_new_keeps_the_output(split_workbooks, tmp_path):
+    first, _, _ = split_workbooks
+    output_file, updated_file = str(tmp_path / "salida.xlsx"), str(tmp_path / "actualizada.xlsx")
+    last_row = process_excel_file(first, output_file)[1]
+    stat = os.stat(output_file)
+    
+    metrics = RunMetrics()
+    assert update_output_file(output_file, [first], updated_file, metrics=metrics) == (True, last_row)
+    assert metrics.counters['pacientes_nuevos'] == 0
+    assert 'filas_generadas' not in metrics.counters
+    with open(output_file, 'rb') as original, open(updated_file, 'rb') as copy:
+        assert original.read() == copy.read()
+    assert os.stat(output_file).st_mtime_ns == stat.st_mtime_ns
+
+def test_master_matrix_keeps_provenance(split_workbooks, tmp_path):
+    first, second, _ = split_workbooks
+    master, merged = str(tmp_path / "maestra.xlsx"), str(tmp_path / "completa.xlsx")
+    assert merge_excel_files([first], master)[0]
+    assert merge_excel_files([first, second], merged)[0]
+    
+    assert update_output_file(master, [second])[0]
+    assert sheet_rows(master, 'Origen') == sheet_rows(merged, 'Origen')
+    assert _matrix_and_totals(master) == _matrix_and_totals(merged)
+
+def test_missing_output_fails(split_workbooks, tmp_path):
+    assert update_output_file(str(tmp_path / "no_existe.xlsx"), [split_workbooks[1]]) is False